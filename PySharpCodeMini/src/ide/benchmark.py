@@ -0,0 +1,275 @@
+"""高亮器与模糊匹配微基准
+
+在无界面环境（QT_QPA_PLATFORM=offscreen）下用 QTextDocument 运行高亮器，
+统计整篇高亮的行/秒和单次按键的重新高亮延迟；
+另用 10 万个生成的符号名和文件路径测模糊匹配的单次查询耗时（目标为一帧，约 16 ms）。
+
+    python -m ide.benchmark --output result.json
+    python -m ide.benchmark --baseline result.json --tolerance 0.1
+    python -m ide.benchmark --only fuzzy
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtGui import QGuiApplication, QTextDocument, QTextCursor
+from .highlighter import PythonHighlighter, CSharpHighlighter
+from .lexer import SPAN_CACHE
+from .fuzzy import FuzzyMatcher
+
+PY_SNIPPET = '''import os
+from collections import OrderedDict
+
+class Cache(object):
+    """简单的 LRU 缓存
+
+    用于基准测试的示例代码。
+    """
+    def __init__(self, size=128):
+        self.size = size
+        self.items = OrderedDict()  # 按访问顺序保存
+
+    def get(self, key, default=None):
+        if key in self.items:
+            self.items.move_to_end(key)
+            return self.items[key]
+        return default
+
+    def put(self, key, value):
+        self.items[key] = value
+        while len(self.items) > self.size and not self.is_pinned(key):
+            self.items.popitem(last=False)
+        print("put %s -> %r" % (key, value), os.getpid())
+
+'''
+
+CS_SNIPPET = '''using System;
+using System.Collections.Generic;
+
+namespace Demo
+{
+    /* 用于基准测试的示例代码
+       包含块注释、字符串和方法调用 */
+    public class Cache
+    {
+        private Dictionary<string, int> items = new Dictionary<string, int>();
+
+        public void Put(string key, int value)
+        {
+            items[key] = value; // 覆盖旧值
+            Console.WriteLine("put " + key);
+        }
+
+        public bool Contains(string key)
+        {
+            return items.ContainsKey(key);
+        }
+    }
+}
+'''
+
+
+def build_corpus():
+    """参考语料：小文件、大文件、超长行、病态输入"""
+    long_list = ", ".join(f'"item{i}"' for i in range(20000))
+    return {
+        "python_small": (PythonHighlighter, PY_SNIPPET),
+        "python_large": (PythonHighlighter, PY_SNIPPET * 800),
+        "python_long_line": (PythonHighlighter, f"data = [{long_list}]\n" * 20),
+        # 大量未闭合引号和交替出现的三引号，考验回溯和跨行状态
+        "python_pathological": (PythonHighlighter, ('"' * 500 + " '" * 500 + "\n" + '"""\n' + "x(\n" * 20) * 200),
+        "csharp_small": (CSharpHighlighter, CS_SNIPPET),
+        "csharp_large": (CSharpHighlighter, CS_SNIPPET * 800),
+        "csharp_pathological": (CSharpHighlighter, ("/*" + " *" * 1000 + "\n" + '"' * 1000 + "\n*/\n") * 200),
+    }
+
+
+FUZZY_WORDS = ["get", "set", "user", "name", "file", "path", "index", "symbol", "load", "save", "cache", "item",
+               "node", "tree", "value", "key", "list", "map", "parse", "token", "http", "request", "async", "config"]
+# 前缀、驼峰缩写、下划线片段、子序列和无结果的查询各占一部分
+FUZZY_QUERIES = ["g", "e", "gun", "getUser", "fp", "sym_idx", "hrq", "parse_tok", "cfgld", "xq", "zzz"]
+
+
+def build_fuzzy_corpus(count=100000):
+    """固定种子生成的符号名（驼峰、下划线、帕斯卡）和项目文件路径"""
+    rng = random.Random(0)
+
+    def words():
+        return [rng.choice(FUZZY_WORDS) for _ in range(rng.randint(1, 4))]
+
+    symbols = set()
+    while len(symbols) < count:
+        parts = words()
+        style = rng.random()
+        if style < 0.4:
+            symbols.add(parts[0] + "".join(p.title() for p in parts[1:]))
+        elif style < 0.8:
+            symbols.add("_".join(parts))
+        else:
+            symbols.add("".join(p.title() for p in parts) + str(rng.randint(0, 99)))
+    paths = set()
+    while len(paths) < count:
+        folders = "/".join(rng.choice(FUZZY_WORDS) for _ in range(rng.randint(1, 4)))
+        paths.add(f"src/{folders}/{'_'.join(words())}{rng.choice(['.py', '.cs', '.json'])}")
+    return {"fuzzy_symbols": sorted(symbols), "fuzzy_paths": sorted(paths)}
+
+
+def bench_fuzzy(candidates, repeat):
+    """建立匹配器的耗时和各查询取前 50 个结果的耗时（每个查询取 repeat 次中最快的一次）"""
+    start = time.perf_counter()
+    matcher = FuzzyMatcher(candidates)
+    build = time.perf_counter() - start
+    latencies = []
+    for query in FUZZY_QUERIES:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            matcher.match(query, 50)
+            best = min(best, time.perf_counter() - start)
+        latencies.append(best)
+    return {
+        "candidates": len(matcher),
+        "build_seconds": build,
+        "match_p50_ms": percentile(latencies, 0.50) * 1000,
+        "match_p95_ms": percentile(latencies, 0.95) * 1000,
+        "match_max_ms": max(latencies) * 1000,
+    }
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def bench_full(cls, text, repeat):
+    """整篇重新高亮（每次清空共享区间缓存，测冷启动）"""
+    document = QTextDocument()
+    document.setPlainText(text)
+    best = float("inf")
+    warm = float("inf")
+    for _ in range(repeat):
+        SPAN_CACHE.clear()
+        highlighter = cls(None)
+        start = time.perf_counter()
+        highlighter.setDocument(document)
+        highlighter.rehighlight()
+        best = min(best, time.perf_counter() - start)
+        # 缓存已填充后再来一次，相当于滚动回来或换主题
+        start = time.perf_counter()
+        highlighter.rehighlight()
+        warm = min(warm, time.perf_counter() - start)
+        highlighter.setDocument(None)
+    lines = document.blockCount()
+    return {
+        "lines": lines,
+        "full_seconds": best,
+        "lines_per_second": lines / best if best else 0.0,
+        "warm_lines_per_second": lines / warm if warm else 0.0,
+    }
+
+
+def bench_keystrokes(cls, text, samples):
+    """在文档各处插入再删除一个字符，每次编辑都会同步触发重新高亮"""
+    document = QTextDocument()
+    document.setPlainText(text)
+    highlighter = cls(document)
+    highlighter.rehighlight()
+    cursor = QTextCursor(document)
+    step = max(1, document.blockCount() // samples)
+    latencies = []
+    for number in range(0, document.blockCount(), step):
+        block = document.findBlockByNumber(number)
+        cursor.setPosition(block.position())
+        start = time.perf_counter()
+        cursor.insertText("a")
+        latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        cursor.deletePreviousChar()
+        latencies.append(time.perf_counter() - start)
+    highlighter.setDocument(None)
+    return {
+        "keystroke_p50_ms": percentile(latencies, 0.50) * 1000,
+        "keystroke_p95_ms": percentile(latencies, 0.95) * 1000,
+        "keystroke_max_ms": max(latencies) * 1000,
+    }
+
+
+def run(repeat=3, samples=200, only=None):
+    # QGuiApplication 必须在整个运行期间存活，绑定到局部变量防止被回收
+    _ = QGuiApplication.instance() or QGuiApplication(sys.argv[:1])
+    results = {}
+    for name, (cls, text) in build_corpus().items():
+        if only and only not in name:
+            continue
+        result = bench_full(cls, text, repeat)
+        result.update(bench_keystrokes(cls, text, samples))
+        results[name] = result
+        print(f"{name:<22} {result['lines']:>7} 行  {result['lines_per_second']:>12,.0f} 行/秒  "
+              f"按键 p50 {result['keystroke_p50_ms']:.3f} ms  p95 {result['keystroke_p95_ms']:.3f} ms")
+    for name, candidates in build_fuzzy_corpus().items():
+        if only and only not in name:
+            continue
+        result = bench_fuzzy(candidates, repeat)
+        results[name] = result
+        print(f"{name:<22} {result['candidates']:>7} 个  建立 {result['build_seconds'] * 1000:.0f} ms  "
+              f"查询 p50 {result['match_p50_ms']:.3f} ms  p95 {result['match_p95_ms']:.3f} ms")
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """与基线比较，返回变慢的项目列表"""
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        if "match_p95_ms" in result:
+            if result["match_p95_ms"] > base["match_p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name}: 查询 p95 {base['match_p95_ms']:.3f} ms -> {result['match_p95_ms']:.3f} ms")
+            continue
+        if result["lines_per_second"] < base["lines_per_second"] * (1 - tolerance):
+            regressions.append(f"{name}: 行/秒 {base['lines_per_second']:,.0f} -> {result['lines_per_second']:,.0f}")
+        if result["keystroke_p95_ms"] > base["keystroke_p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: 按键 p95 {base['keystroke_p95_ms']:.3f} ms -> {result['keystroke_p95_ms']:.3f} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="高亮器与模糊匹配微基准")
+    parser.add_argument("--output", help="把结果保存为 JSON")
+    parser.add_argument("--baseline", help="与之前保存的 JSON 结果比较，变慢则返回非零退出码")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的波动比例，默认 0.1")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--samples", type=int, default=200, help="每个文件模拟的按键位置数")
+    parser.add_argument("--only", help="只运行名称包含该字符串的语料")
+    args = parser.parse_args(argv)
+
+    current = run(args.repeat, args.samples, args.only)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=4)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print("性能回退：")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("与基线相比没有变慢")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
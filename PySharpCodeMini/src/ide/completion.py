@@ -1,25 +1,378 @@
-from PySide6.QtWidgets import QListWidget, QListWidgetItem
-from PySide6.QtCore import Qt  # 修复导入错误
+import hashlib
+import os
+import re
+import threading
+from PySide6.QtWidgets import QListView
+from PySide6.QtCore import Qt, QObject, QThread, QTimer, Signal, QAbstractListModel, QModelIndex  # 修复导入错误
+from .search_index import walk_project, project_relpath
+from .symbols import SymbolIndex, SOURCE_EXTENSIONS, index_source_files
+from .fuzzy import FuzzyMatcher
+from .workers import process_pool, FutureWatcher
+
+WORD_BEFORE_CURSOR = re.compile(r'\w*$')
+CACHE_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), "cache", "symbols")
+
+
+def cache_dir_for(root):
+    return os.path.join(CACHE_DIR, hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()[:16])
+
+
+def scan_source_files(root):
+    return {relpath: stat for relpath, stat in walk_project(root).items()
+            if relpath.lower().endswith(SOURCE_EXTENSIONS)}
+
+
+class SymbolLoader(QThread):
+    """后台线程：读取磁盘上的符号索引并扫描项目中的 Python 和 C# 文件"""
+    loaded = Signal(object, object)  # (index, {相对路径: (mtime_ns, 大小)})
+
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.index = index
+
+    def run(self):
+        self.index.load()
+        self.loaded.emit(self.index, scan_source_files(self.index.root))
+
+
+class IndexSaver(QThread):
+    """后台线程：把符号索引的快照写盘，界面线程不做序列化"""
+    def __init__(self, index, data, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.data = data
+
+    def run(self):
+        try:
+            self.index.save(self.data)
+        except OSError:
+            pass  # 缓存写不进去只影响下次启动的速度
+
+
+class SymbolService(QObject):
+    """项目符号服务：进程池中提取符号（Python 用 ast，C# 见 csharp_index），结果合并进排序数组索引并保存在磁盘上
+
+    启动时只重新解析改动过的文件，保存文件时单独更新该文件；补全查找在补全线程进行。
+    索引改动后，模糊匹配器在进程池中按新的名字表重建，建好后整体换上；重建期间补全沿用旧的匹配器，
+    按键不会等待重建。
+    """
+    BATCH = 100  # 每个后台任务解析的文件数
+    MATCHER_DELAY_MS = 500  # 索引改动后等这么久再重建匹配器，连续的改动只重建一次
+    SAVE_DELAY_MS = 5000    # 索引改动后等这么久再写盘，连续保存文件时只写一次
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index = None
+        self.loader = None
+        self.ready = False
+        self.generation = 0  # 切换根目录时加一，丢弃旧目录的后台结果
+        self.pending = 0     # 尚未返回的后台任务数
+        self.lock = threading.Lock()  # 索引在界面线程更新，在补全线程查找
+        self.matcher = None  # 全部不重复名字的模糊匹配器，建好后整体替换，补全线程只读取
+        self.matcher_revision = None  # 当前匹配器对应的索引版本
+        self.matcher_building = False
+        self.watcher = FutureWatcher(self)
+        self.watcher.finished.connect(self.on_finished)
+        self.watcher.failed.connect(self.on_failed)
+        self.matcher_watcher = FutureWatcher(self)
+        self.matcher_watcher.finished.connect(self.on_matcher_built)
+        self.matcher_watcher.failed.connect(self.on_matcher_failed)
+        self.matcher_timer = QTimer(self)
+        self.matcher_timer.setSingleShot(True)
+        self.matcher_timer.setInterval(self.MATCHER_DELAY_MS)
+        self.matcher_timer.timeout.connect(self.rebuild_matcher)
+        self.saver = None
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(self.SAVE_DELAY_MS)
+        self.save_timer.timeout.connect(self.save_index)
+
+    def set_root(self, root):
+        root = os.path.abspath(root)
+        if self.index and self.index.root == root:
+            return
+        self.flush()
+        self.generation += 1
+        self.ready = False
+        self.pending = 0
+        self.matcher = None
+        self.matcher_revision = None
+        self.matcher_building = False
+        self.index = SymbolIndex(root, cache_dir_for(root))
+        self.loader = SymbolLoader(self.index, self)
+        self.loader.loaded.connect(self.on_loaded)
+        self.loader.start()
+
+    def on_loaded(self, index, scanned):
+        if index is not self.index:
+            return
+        self.ready = True
+        with self.lock:
+            stale = index.stale(scanned)
+        for start in range(0, len(stale), self.BATCH):
+            self.submit(stale[start:start + self.BATCH])
+        if not stale:
+            self.save_timer.start()
+        self.rebuild_matcher()
+
+    def submit(self, entries):
+        self.pending += 1
+        future = process_pool().submit(index_source_files, self.index.root, entries)
+        self.watcher.watch(future, self.generation)
+
+    def on_finished(self, generation, results):
+        if generation != self.generation:
+            return
+        self.pending -= 1
+        with self.lock:
+            self.index.set_files(results)
+        if not self.pending:
+            self.save_timer.start()
+        self.matcher_timer.start()
+
+    def on_failed(self, generation, error):
+        if generation == self.generation:
+            self.pending -= 1
+
+    def notify_changed(self, path):
+        """文件保存后只重新解析这一个文件"""
+        if not self.ready or not path.lower().endswith(SOURCE_EXTENSIONS):
+            return
+        relpath = project_relpath(path, self.index.root)
+        if relpath is None:
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        self.submit([(relpath, st.st_mtime_ns, st.st_size)])
+
+    def save_index(self):
+        """取快照（持锁的时间只有一次字典拷贝）后交给后台线程写盘；上一次还没写完就稍后再试"""
+        if self.saver and self.saver.isRunning():
+            self.save_timer.start()
+            return
+        with self.lock:
+            data = self.index.snapshot()
+        self.saver = IndexSaver(self.index, data, self)
+        self.saver.start()
+
+    def flush(self):
+        """切换根目录或退出前：写完尚未写盘的改动"""
+        if self.save_timer.isActive():
+            self.save_timer.stop()
+            if self.saver and self.saver.isRunning():
+                self.saver.wait()
+            self.save_index()
+        if self.saver and self.saver.isRunning():
+            self.saver.wait()
+
+    def rebuild_matcher(self):
+        """名字表有变化时在进程池中重建匹配器；上一次还没建好时，建好后再检查一次"""
+        if self.matcher_building or not self.ready:
+            return
+        with self.lock:
+            revision = self.index.revision
+            names = list(self.index.names) if revision != self.matcher_revision else None
+        if names is None:
+            return
+        self.matcher_building = True
+        future = process_pool().submit(FuzzyMatcher, names)
+        self.matcher_watcher.watch(future, (self.generation, revision))
+
+    def on_matcher_built(self, tag, matcher):
+        generation, revision = tag
+        if generation != self.generation:
+            return
+        self.matcher_building = False
+        self.matcher = matcher
+        self.matcher_revision = revision
+        if self.index.revision != revision:
+            self.matcher_timer.start()
+
+    def on_matcher_failed(self, tag, error):
+        if tag[0] == self.generation:
+            self.matcher_building = False
+
+    def complete(self, prefix, limit=50):
+        """补全线程调用：用当前的匹配器排序；第一个匹配器建好之前没有结果"""
+        index = self.index
+        matcher = self.matcher
+        if not index or not self.ready or matcher is None:
+            return []
+        matches = matcher.match(prefix, limit)
+        with self.lock:
+            symbols = [index.definition(name) for score, name in matches]
+        return [symbol for symbol in symbols if symbol]
+
+
+class CompletionRanker(QThread):
+    """常驻后台线程：查找并排序补全项
+
+    只保留最新的一次请求，旧请求在开始前就被覆盖；结果带请求序号，界面线程据此丢弃过期结果。
+    """
+    ranked = Signal(int, object)  # (请求序号, [(名字, 类别, 相对路径, 行号, 所属类名)])
+
+    def __init__(self, service, parent=None):
+        super().__init__(parent)
+        self.service = service
+        self.condition = threading.Condition()
+        self.latest = None
+        self.stopping = False
+
+    def request(self, query_id, prefix, limit):
+        with self.condition:
+            self.latest = (query_id, prefix, limit)
+            self.condition.notify()
+        if not self.isRunning():
+            self.start()
+
+    def stop(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.latest is None and not self.stopping:
+                    self.condition.wait()
+                if self.stopping:
+                    return
+                query_id, prefix, limit = self.latest
+                self.latest = None
+            self.ranked.emit(query_id, self.service.complete(prefix, limit))
+
+
+class CompletionModel(QAbstractListModel):
+    """补全项模型：更新时复用已有的行，只通知变化的部分，视图不重置"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        name, kind, relpath, line, container = self.items[index.row()]
+        if role == Qt.DisplayRole:
+            return name
+        if role == Qt.ToolTipRole:
+            return f"{kind}  {container + '.' if container else ''}{name}  ({relpath}:{line})"
+        if role == Qt.UserRole:
+            return self.items[index.row()]
+        return None
+
+    def set_items(self, items):
+        old = len(self.items)
+        new = len(items)
+        if new < old:
+            self.beginRemoveRows(QModelIndex(), new, old - 1)
+            self.items = self.items[:new]
+            self.endRemoveRows()
+        self.items[:min(old, new)] = items[:min(old, new)]
+        if min(old, new):
+            self.dataChanged.emit(self.index(0), self.index(min(old, new) - 1))
+        if new > old:
+            self.beginInsertRows(QModelIndex(), old, new - 1)
+            self.items.extend(items[old:])
+            self.endInsertRows()
+
+
+class CompletionPopup(QListView):
+    MAX_VISIBLE_ROWS = 10
 
-class CompletionPopup(QListWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowFlags(self.windowFlags() | Qt.ToolTip)
         self.setFocusPolicy(Qt.NoFocus)
         self.setMouseTracking(True)
+        self.setUniformItemSizes(True)  # 行高一致，只排版可见的行
+        self.setEditTriggers(QListView.NoEditTriggers)
+        self.completion_model = CompletionModel(self)
+        self.setModel(self.completion_model)
+
+    def count(self):
+        return self.completion_model.rowCount()
 
     def show_completions(self, completions, position):
-        """显示补全项"""
-        self.clear()
-        for completion in completions:
-            item = QListWidgetItem(completion)
-            self.addItem(item)
+        """显示补全项（原地更新）；completions 为 [(名字, 类别, 相对路径, 行号, 所属类名)]"""
+        self.completion_model.set_items(completions)
+        self.setCurrentIndex(self.completion_model.index(0))
+        self.scrollToTop()
+        rows = min(self.count(), self.MAX_VISIBLE_ROWS)
+        row_height = self.sizeHintForRow(0) if self.count() else self.fontMetrics().height()
+        self.resize(max(self.width(), 240), rows * row_height + 2 * self.frameWidth())
         self.move(position)
         self.show()
 
+    def move_selection(self, step):
+        if self.count():
+            self.setCurrentIndex(self.completion_model.index((self.currentIndex().row() + step) % self.count()))
+
     def insert_completion(self):
         """插入选中的补全项"""
-        current_item = self.currentItem()
-        if current_item:
-            return current_item.text()
+        index = self.currentIndex()
+        if index.isValid():
+            return self.completion_model.items[index.row()][0]
         return None
+
+
+class CompletionController(QObject):
+    """按键后防抖一小段时间再请求补全；排序在 CompletionRanker 线程中进行，过期结果直接丢弃"""
+    DEBOUNCE_MS = 40
+
+    def __init__(self, service, popup, parent=None):
+        super().__init__(parent)
+        self.service = service
+        self.popup = popup
+        self.editor = None
+        self.query_id = 0
+        self.min_prefix = 2
+        self.limit = 50
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.DEBOUNCE_MS)
+        self.timer.timeout.connect(self.dispatch)
+        self.ranker = CompletionRanker(service, self)
+        self.ranker.ranked.connect(self.on_ranked)
+
+    def prefix(self):
+        cursor = self.editor.textCursor()
+        return WORD_BEFORE_CURSOR.search(cursor.block().text()[:cursor.positionInBlock()]).group()
+
+    def request(self, editor):
+        """按键事件里调用：此时字符尚未插入，等防抖结束后再读取光标前的单词"""
+        self.editor = editor
+        self.query_id += 1
+        self.timer.start()
+
+    def cancel(self):
+        self.query_id += 1
+        self.timer.stop()
+        self.popup.hide()
+
+    def dispatch(self):
+        prefix = self.prefix()
+        if len(prefix) < self.min_prefix or prefix[0].isdigit():
+            self.popup.hide()
+            return
+        self.ranker.request(self.query_id, prefix, self.limit)
+
+    def on_ranked(self, query_id, items):
+        if query_id != self.query_id or not self.editor or not self.editor.hasFocus():
+            return
+        prefix = self.prefix()
+        items = [item for item in items if item[0] != prefix]
+        if not items:
+            self.popup.hide()
+            return
+        self.popup.show_completions(items, self.editor.viewport().mapToGlobal(self.editor.cursorRect().bottomRight()))
+
+    def shutdown(self):
+        self.cancel()
+        if self.ranker.isRunning():
+            self.ranker.stop()
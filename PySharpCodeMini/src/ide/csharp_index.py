@@ -0,0 +1,147 @@
+import os
+import re
+from .encoding import decode_text
+
+# 该模块不依赖 Qt，提取符号在后台进程中运行
+
+CSHARP_EXTENSIONS = ('.cs',)
+
+# 注释、字符串和字符字面量替换成空格，保留换行，行号不变
+_NOISE = re.compile(r'//[^\n]*|/\*.*?\*/|@"(?:[^"]|"")*"|\$?"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])+\'', re.S)
+_USING = re.compile(r'^\s*(?:global\s+)?using\s+(?:static\s+)?(?:(\w+)\s*=\s*)?([\w.]+)\s*;')
+_NAMESPACE = re.compile(r'^\s*namespace\s+([\w.]+)')
+_TYPE = re.compile(r'\b(class|struct|interface|enum|record)\s+(?:(?:class|struct)\s+)?(\w+)')
+_MODIFIERS = r'(?:(?:public|private|protected|internal|static|virtual|override|abstract|sealed|async|extern|' \
+             r'unsafe|new|partial|readonly|const|volatile|required|event)\s+)*'
+_TYPE_NAME = r'[\w.]+(?:<[\w\s,.<>\[\]?]*>)?(?:\[[\s,]*\])*\??'
+_DELEGATE = re.compile(r'\bdelegate\s+' + _TYPE_NAME + r'\s+(\w+)')
+_METHOD = re.compile(r'^\s*' + _MODIFIERS + r'(?:' + _TYPE_NAME + r'\s+)?(\w+)\s*(?:<[\w\s,]*>)?\s*\(')
+_PROPERTY = re.compile(r'^\s*' + _MODIFIERS + _TYPE_NAME + r'\s+(\w+)\s*(?:\{|=>|$)')
+_FIELD = re.compile(r'^\s*' + _MODIFIERS + _TYPE_NAME + r'\s+(\w+)\s*(?:=|;|,)')
+_ENUM_MEMBER = re.compile(r'\s*([A-Za-z_]\w*)\s*(?:=.*)?$', re.S)
+_DECLARATOR = re.compile(r'\s*([A-Za-z_]\w*)\s*(?:=|;|$)')
+# 看起来像方法调用或声明、其实是语句的关键字
+_STATEMENTS = {'if', 'for', 'foreach', 'while', 'switch', 'catch', 'using', 'lock', 'return', 'new', 'throw',
+               'typeof', 'sizeof', 'nameof', 'await', 'else', 'fixed', 'when', 'base', 'this', 'get', 'set',
+               'init', 'add', 'remove', 'var', 'default'}
+
+
+def strip_noise(source):
+    return _NOISE.sub(lambda m: re.sub(r'[^\n]', ' ', m.group()), source)
+
+
+def _split_top_level(text):
+    """按不在括号里的逗号切分：初始化表达式里的 f(1, 2)、{ 1, 2 } 不会被切开"""
+    parts = []
+    level = 0
+    start = 0
+    for i, ch in enumerate(text):
+        if ch in '([{':
+            level += 1
+        elif ch in ')]}':
+            level -= 1
+        elif ch == ',' and level == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _enum_members(text):
+    """枚举体中的一段文本（一行，或声明行 '{' 之后的部分）里的成员名，到 '}' 为止"""
+    text = text.split('}', 1)[0]
+    return [m.group(1) for m in map(_ENUM_MEMBER.match, _split_top_level(text)) if m]
+
+
+def extract_csharp_symbols(source, module=""):
+    """返回 [(名字, 类别, 行号, 所属类型名)]：using、命名空间、类型及其成员
+
+    按行用正则识别声明，花括号深度区分类型体和方法体，方法体内的局部变量不收录。
+    与 Python 的符号使用同一种格式，可以放进同一个 SymbolIndex。
+    """
+    if isinstance(source, bytes):
+        source = decode_text(source)[0]
+    symbols = []
+    types = []      # [(类型名, 类别, 类型体所在的花括号深度)]
+    pending = None  # 已声明、尚未遇到 '{' 的类型
+    depth = 0
+    for number, line in enumerate(strip_noise(source).split('\n'), 1):
+        body = types[-1] if types and depth == types[-1][2] else None
+        using = _USING.match(line)
+        namespace = _NAMESPACE.match(line)
+        declared = _TYPE.search(line) if body or not types else None
+        delegate = _DELEGATE.search(line) if body or not types else None
+        if using and not types:
+            symbols.append((using.group(1) or using.group(2), "import", number, ""))
+        elif namespace:
+            symbols.append((namespace.group(1), "module", number, ""))
+        elif delegate:
+            symbols.append((delegate.group(1), "function", number, body[0] if body else ""))
+        elif declared:
+            kind, name = declared.groups()
+            symbols.append((name, "class", number, body[0] if body else ""))
+            pending = (name, kind)
+            if kind == "enum" and '{' in line:
+                # 写在一行里的枚举：enum Kind { A, B = 2, C }
+                members = _enum_members(line.split('{', 1)[1])
+                symbols.extend((member, "variable", number, name) for member in members)
+        elif body and body[1] == "enum":
+            symbols.extend((member, "variable", number, body[0]) for member in _enum_members(line))
+        elif body:
+            m = _METHOD.match(line)
+            if m and m.group(1) not in _STATEMENTS:
+                symbols.append((m.group(1), "method", number, body[0]))
+            else:
+                m = _PROPERTY.match(line) or _FIELD.match(line)
+                if m and m.group(1) not in _STATEMENTS:
+                    symbols.append((m.group(1), "variable", number, body[0]))
+                    if m.re is _FIELD:
+                        # 一次声明多个字段：int a = 1, b;
+                        for part in _split_top_level(line[m.end(1):])[1:]:
+                            d = _DECLARATOR.match(part)
+                            if d:
+                                symbols.append((d.group(1), "variable", number, body[0]))
+        for ch in line:
+            if ch == '{':
+                depth += 1
+                if pending:
+                    types.append((pending[0], pending[1], depth))
+                    pending = None
+            elif ch == '}':
+                if types and types[-1][2] == depth:
+                    types.pop()
+                depth = max(0, depth - 1)
+        if pending and line.rstrip().endswith(';'):
+            pending = None  # record 的一行声明
+    return symbols
+
+
+def find_csproj(directory, cache, root=None):
+    """从 directory 逐级向上找第一个含有 .csproj 的目录，返回该 .csproj 的路径或 None
+
+    cache 为 {目录: .csproj 路径或 None}，沿途查过的目录都记进去。
+    给出 root 时查到 root 为止，不再往上走；同一个 cache 应始终用同一个 root。
+    """
+    visited = []
+    result = None
+    while True:
+        if directory in cache:
+            result = cache[directory]
+            break
+        visited.append(directory)
+        try:
+            names = sorted(name for name in os.listdir(directory) if name.endswith('.csproj'))
+        except OSError:
+            names = []
+        if names:
+            result = os.path.join(directory, names[0])
+            break
+        if directory == root:
+            break
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    for path in visited:
+        cache[path] = result
+    return result
@@ -0,0 +1,62 @@
+import os
+from PySide6.QtCore import QObject, QFileSystemWatcher
+from .csharp_index import find_csproj
+
+
+class CSharpProjectModel(QObject):
+    """.cs 文件到所属 .csproj 的映射
+
+    从文件所在目录逐级向上找第一个含有 .csproj 的目录，最远查到工作区根目录；
+    工作区以外的文件只查它所在的目录。沿途每个目录的结果都缓存下来，
+    同一项目里的其它文件只查一次字典。查过的目录交给 QFileSystemWatcher 监视，
+    目录内容变化（增删改名 .csproj）时清掉该目录及其下所有子目录的缓存。
+    类型、成员和 using 由 SymbolService 在进程池中与 Python 符号一起提取。
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = None
+        self.cache = {}  # 目录 -> .csproj 路径或 None
+        self.watched = set()
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+
+    def set_root(self, root):
+        """切换工作区：缓存是按旧的根目录查出来的，连同监视的目录一起清掉"""
+        root = os.path.abspath(root)
+        if root == self.root:
+            return
+        self.root = root
+        self.cache.clear()
+        if self.watched:
+            self.watcher.removePaths(list(self.watched))
+            self.watched.clear()
+
+    def stop_at(self, directory):
+        """向上查找的终点：工作区内为根目录，工作区外为 directory 自身"""
+        if self.root:
+            try:
+                if os.path.commonpath([directory, self.root]) == self.root:
+                    return self.root
+            except ValueError:  # 不在同一个驱动器上
+                pass
+        return directory
+
+    def project_for(self, path):
+        """path 所属的 .csproj，找不到时返回 None"""
+        directory = os.path.dirname(os.path.abspath(path))
+        before = len(self.cache)
+        csproj = find_csproj(directory, self.cache, self.stop_at(directory))
+        if len(self.cache) != before:
+            added = [directory for directory in self.cache if directory not in self.watched]
+            self.watched.update(added)
+            self.watcher.addPaths(added)
+        return csproj
+
+    def on_directory_changed(self, directory):
+        directory = os.path.normpath(directory)  # Qt 给出的路径用 '/' 分隔
+        prefix = directory.rstrip(os.sep) + os.sep
+        for d in [d for d in self.cache if d == directory or d.startswith(prefix)]:
+            del self.cache[d]
+        if not os.path.isdir(directory):
+            # 目录已删除，Qt 会自动停止监视
+            self.watched.discard(directory)
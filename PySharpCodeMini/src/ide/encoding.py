@@ -0,0 +1,160 @@
+import codecs
+
+# 该模块不依赖 Qt，编码探测在加载线程中运行
+
+SAMPLE_SIZE = 64 * 1024  # 探测编码时读取的文件头字节数
+FALLBACK_ENCODING = 'gb18030'  # GBK 的超集，不是合法 UTF-8 的文本按它解码
+
+
+def _sig_codec(base):
+    """仿照 utf-8-sig，为指定字节序的 UTF-16/32 生成带 BOM 的编码：解码时去掉开头的 BOM，编码时先写 BOM
+
+    Python 自带的 utf-16、utf-32 解码时认 BOM，但编码时总按本机字节序写 BOM，
+    大端文件保存后会变成小端；这里解码和编码都固定用 base 的字节序。
+    """
+    bom = '\ufeff'
+
+    def encode(text, errors='strict'):
+        return codecs.encode(bom + text, base, errors), len(text)
+
+    def decode(data, errors='strict'):
+        text = codecs.decode(bytes(data), base, errors)
+        return (text[1:] if text.startswith(bom) else text), len(data)
+
+    class IncrementalEncoder(codecs.IncrementalEncoder):
+        def __init__(self, errors='strict'):
+            super().__init__(errors)
+            self.first = True
+
+        def encode(self, text, final=False):
+            if self.first:
+                self.first = False
+                text = bom + text
+            return codecs.encode(text, base, self.errors)
+
+        def reset(self):
+            self.first = True
+
+        def getstate(self):
+            return int(self.first)
+
+        def setstate(self, state):
+            self.first = bool(state)
+
+    class IncrementalDecoder(codecs.IncrementalDecoder):
+        def __init__(self, errors='strict'):
+            super().__init__(errors)
+            self.decoder = codecs.getincrementaldecoder(base)(errors)
+            self.first = True
+
+        def decode(self, data, final=False):
+            text = self.decoder.decode(data, final)
+            if self.first and text:
+                self.first = False
+                if text.startswith(bom):
+                    text = text[1:]
+            return text
+
+        def reset(self):
+            self.decoder.reset()
+            self.first = True
+
+        def getstate(self):
+            buffered, flag = self.decoder.getstate()
+            return buffered, flag << 1 | int(self.first)
+
+        def setstate(self, state):
+            buffered, flag = state
+            self.decoder.setstate((buffered, flag >> 1))
+            self.first = bool(flag & 1)
+
+    return codecs.CodecInfo(encode, decode, name=base + '-sig',
+                            incrementalencoder=IncrementalEncoder, incrementaldecoder=IncrementalDecoder)
+
+
+_SIG_CODECS = {base + '-sig': _sig_codec(base) for base in ('utf-16-le', 'utf-16-be', 'utf-32-le', 'utf-32-be')}
+# 注册后 open()、str.encode 都能直接用 'utf-16-be-sig' 这类名字，编码名可以照常存进恢复日志
+codecs.register(lambda name: _SIG_CODECS.get(name.replace('_', '-')))
+
+# 长的 BOM 放前面：UTF-32-LE 的 BOM 以 UTF-16-LE 的 BOM 开头
+_BOMS = ((codecs.BOM_UTF32_LE, 'utf-32-le-sig'), (codecs.BOM_UTF32_BE, 'utf-32-be-sig'),
+         (codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16-le-sig'), (codecs.BOM_UTF16_BE, 'utf-16-be-sig'))
+
+
+def detect_encoding(sample, complete=False):
+    """根据文件头 sample 推断编码，返回可直接交给 open() 的编码名
+
+    有 BOM 时按 BOM 判断，返回 utf-8-sig、utf-16-be-sig 这类保留字节序的编码（解码时去掉 BOM，写回时加上）；
+    没有 BOM 但偶数或奇数位置大量是 NUL 时视为 UTF-16；否则能按 UTF-8 解码就是 UTF-8，
+    不能则视为 GBK。complete 为 True 表示 sample 就是整个文件，末尾不完整的多字节字符也算错误。
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    if len(sample) >= 2:
+        even = sample[0::2].count(0)
+        odd = sample[1::2].count(0)
+        half = len(sample) // 2
+        if odd > half * 0.3 and even < half * 0.05:
+            return 'utf-16-le'
+        if even > half * 0.3 and odd < half * 0.05:
+            return 'utf-16-be'
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=complete)
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+    return 'utf-8'
+
+
+def primary_newline(newlines):
+    """把 TextIOWrapper.newlines（None、字符串或元组）归为一种换行符，保存时沿用"""
+    if newlines is None:
+        return '\n'
+    if isinstance(newlines, str):
+        return newlines
+    return '\r\n' if '\r\n' in newlines else newlines[0]
+
+
+def decode_text(data):
+    """按探测到的编码解码整个文件的字节，返回 (文本, 编码)；换行符原样保留，无法解码的字节替换掉"""
+    encoding = detect_encoding(data[:SAMPLE_SIZE], len(data) <= SAMPLE_SIZE)
+    try:
+        return data.decode(encoding), encoding
+    except UnicodeDecodeError:
+        if encoding == 'utf-8':
+            encoding = FALLBACK_ENCODING
+        return data.decode(encoding, errors='replace'), encoding
+
+
+def read_text(path):
+    """一次读出整个文件，返回 (文本, 编码, 换行符)；文本中的换行统一为 '\\n'"""
+    with open(path, 'rb') as f:
+        sample = f.read(SAMPLE_SIZE)
+        complete = len(sample) < SAMPLE_SIZE
+    encoding = detect_encoding(sample, complete)
+    try:
+        with open(path, 'r', encoding=encoding) as f:
+            return f.read(), encoding, primary_newline(f.newlines)
+    except UnicodeDecodeError:
+        # 文件头是 UTF-8、后面才出现其它编码的字节时改按 GBK；仍无法解码的字节替换掉
+        if encoding == 'utf-8':
+            encoding = FALLBACK_ENCODING
+        with open(path, 'r', encoding=encoding, errors='replace') as f:
+            return f.read(), encoding, primary_newline(f.newlines)
+
+
+def read_exact(path):
+    """读出整个文件，换行符原样保留，返回 (文本, 编码)
+
+    用于改写后按原编码写回的场合（批量替换）。与 read_text 不同，解码失败时不替换字节，
+    而是抛出 UnicodeDecodeError，免得写回时破坏原文件。
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    encoding = detect_encoding(data[:SAMPLE_SIZE], len(data) <= SAMPLE_SIZE)
+    try:
+        return data.decode(encoding), encoding
+    except UnicodeDecodeError:
+        if encoding != 'utf-8':
+            raise
+    return data.decode(FALLBACK_ENCODING), FALLBACK_ENCODING
@@ -0,0 +1,68 @@
+import os
+import threading
+from PySide6.QtCore import QThread, Signal
+from .encoding import SAMPLE_SIZE, FALLBACK_ENCODING, detect_encoding, primary_newline
+
+
+class FileLoader(QThread):
+    """后台线程：探测编码并按块解码文件，解码后的文本分块交给界面线程追加到文档
+
+    最多有 IN_FLIGHT 块已发出、尚未被界面线程追加，读得比界面快时线程在此等待，
+    内存中不会堆积整份文本的副本。按 UTF-8 解码到中途出错时从头改按 GBK 重读，
+    先发出 restarted 让界面清空已追加的内容。
+    """
+    chunk = Signal(str)
+    progress = Signal()                # done 已更新
+    restarted = Signal(str)            # 改用的编码
+    loaded = Signal(str, str)          # (编码, 换行符)
+    failed = Signal(str)
+    CHUNK_CHARS = 256 * 1024
+    IN_FLIGHT = 4
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.cancelled = False
+        self.total = 0  # 文件字节数
+        self.done = 0   # 已读字节数
+        self.slots = threading.Semaphore(self.IN_FLIGHT)
+
+    def cancel(self):
+        self.cancelled = True
+        self.slots.release()  # 唤醒可能正在等待的线程
+
+    def consumed(self):
+        """界面线程追加完一块后调用"""
+        self.slots.release()
+
+    def run(self):
+        try:
+            self.total = os.path.getsize(self.path)
+            with open(self.path, 'rb') as f:
+                sample = f.read(SAMPLE_SIZE)
+            encoding = detect_encoding(sample, complete=len(sample) < SAMPLE_SIZE)
+            try:
+                newline = self.stream(encoding, 'strict')
+            except UnicodeDecodeError:
+                if encoding == 'utf-8':
+                    encoding = FALLBACK_ENCODING
+                self.restarted.emit(encoding)
+                newline = self.stream(encoding, 'replace')
+            if not self.cancelled:
+                self.loaded.emit(encoding, newline)
+        except OSError as e:
+            self.failed.emit(str(e))
+
+    def stream(self, encoding, errors):
+        with open(self.path, 'r', encoding=encoding, errors=errors) as f:
+            while not self.cancelled:
+                text = f.read(self.CHUNK_CHARS)
+                if not text:
+                    break
+                self.slots.acquire()
+                if self.cancelled:
+                    break
+                self.chunk.emit(text)
+                self.done = f.buffer.tell()
+                self.progress.emit()
+            return primary_newline(f.newlines)
@@ -0,0 +1,45 @@
+import queue
+from PySide6.QtCore import QThread, Signal
+
+
+class SaveWriter(QThread):
+    """后台线程：按提交顺序把文档快照编码后原子写盘（临时文件 + fsync + 替换）
+
+    界面线程只负责取快照，编码和写盘都在这里进行，网络盘上写得慢也不会卡住窗口。
+    所有保存共用这一个线程，同一文件先后两次保存不会乱序覆盖。
+    每次提交是一批 [(标记, 路径, 文本, 编码, 换行符)]，整批写完后发出一次 saved；
+    标记原样带回，界面线程据此判断文档在保存期间是否又被修改。
+    """
+    saved = Signal(object, object)  # ([(标记, 路径)], [(路径, 错误)])
+
+    def __init__(self, file_manager, parent=None):
+        super().__init__(parent)
+        self.file_manager = file_manager
+        self.batches = queue.Queue()
+
+    def enqueue(self, jobs):
+        self.batches.put(jobs)
+        if not self.isRunning():
+            self.start()
+
+    def stop(self):
+        """写完已提交的批次后退出"""
+        if self.isRunning():
+            self.batches.put(None)
+            self.wait()
+
+    def run(self):
+        while True:
+            jobs = self.batches.get()
+            if jobs is None:
+                break
+            written = []
+            failures = []
+            while jobs:
+                tag, path, text, encoding, newline = jobs.pop(0)  # 写完即丢弃快照
+                try:
+                    self.file_manager.write_atomic(path, text, encoding=encoding, newline=newline)
+                    written.append((tag, path))
+                except (OSError, UnicodeEncodeError) as e:
+                    failures.append((path, str(e)))
+            self.saved.emit(written, failures)
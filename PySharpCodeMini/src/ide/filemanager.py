@@ -1,19 +1,57 @@
 import os
+import shutil
+import tempfile
 from PySide6.QtCore import QDir
 from PySide6.QtWidgets import QFileSystemModel
+from .search_index import replace_lines
+from .encoding import read_text, read_exact
+
+# 新建文件的默认权限取决于 umask；os.umask 只能读写成对调用，不是线程安全的，所以在导入时读一次
+_UMASK = os.umask(0)
+os.umask(_UMASK)
 
 class FileManager:
     def __init__(self, model: QFileSystemModel):
         self.model = model
 
     def open_file(self, path):
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
+        """按探测到的编码读出文本（GBK、UTF-16 等，带 BOM 的也可以）"""
+        return read_text(path)[0]
 
     def save_file(self, path, content):
         with open(path, 'w', encoding='utf-8') as f:
             f.write(content)
 
+    def write_atomic(self, path, content, encoding='utf-8', newline=None):
+        """先写入同目录的临时文件并落盘，再替换目标文件，中途失败不会留下写了一半的文件"""
+        # 目标是符号链接时替换它指向的文件，链接本身保持不变
+        path = os.path.realpath(path)
+        directory = os.path.dirname(path)
+        fd, temp_path = tempfile.mkstemp(prefix='.pysharp-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding=encoding, newline=newline) as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(path):
+                shutil.copymode(path, temp_path)
+            else:
+                # mkstemp 建的文件权限是 0600，新文件改成与 open() 新建时相同的权限
+                os.chmod(temp_path, 0o666 & ~_UMASK)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def replace_in_file(self, path, compiled, replacement, regex=False):
+        """按行替换文件内容并按原编码原子写回，保留原有换行符；返回替换次数"""
+        text, encoding = read_exact(path)
+        text, count = replace_lines(text, compiled, replacement, regex)
+        if count:
+            self.write_atomic(path, text, encoding=encoding, newline='')
+        return count
+
     def delete_file(self, path):
         if os.path.isfile(path):
             os.remove(path)
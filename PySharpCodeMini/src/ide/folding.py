@@ -0,0 +1,265 @@
+import re
+from PySide6.QtCore import QObject
+from PySide6.QtGui import QTextCursor
+
+# 花括号计数时跳过字符串、字符字面量和行注释
+_BRACE_NOISE = re.compile(r'@"(?:[^"]|"")*"|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|//.*')
+
+
+def indent_info(text):
+    """缩进折叠的行信息：缩进宽度，空行为 -1"""
+    stripped = text.lstrip()
+    if not stripped or stripped.startswith('#'):
+        return -1
+    return len(text[:len(text) - len(stripped)].expandtabs(4))
+
+
+def brace_info(text):
+    """花括号折叠的行信息：(净增层数, 行内最低层数, 是否只有一个 '{')"""
+    code = _BRACE_NOISE.sub('', text)
+    depth = 0
+    dip = 0
+    for ch in code:
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            dip = min(dip, depth)
+    return depth, dip, code.strip() == '{'
+
+
+class FoldIndex:
+    """折叠索引：每行只保存少量信息，编辑时按行替换，折叠范围在需要时再计算
+
+    style 为 "indent"（Python 等按缩进）或 "brace"（C# 按花括号，'{' 单独成行时折叠到上一行）。
+    """
+    def __init__(self, style="indent"):
+        self.style = style
+        self.info = indent_info if style == "indent" else brace_info
+        self.lines = []
+
+    def reset(self, texts):
+        self.lines = [self.info(text) for text in texts]
+
+    def splice(self, first, removed, texts):
+        """用 texts 替换从 first 开始的 removed 行"""
+        self.lines[first:first + removed] = [self.info(text) for text in texts]
+
+    # --- 缩进 ---
+    def indent_end(self, header):
+        lines = self.lines
+        base = lines[header]
+        if base < 0:
+            return None
+        last = header
+        for number in range(header + 1, len(lines)):
+            indent = lines[number]
+            if indent < 0:
+                continue
+            if indent <= base:
+                break
+            last = number
+        return last if last > header else None
+
+    def indent_ranges(self):
+        ranges = {}
+        stack = []
+        last = -1
+        for number, indent in enumerate(self.lines):
+            if indent < 0:
+                continue
+            while stack and self.lines[stack[-1]] >= indent:
+                header = stack.pop()
+                if last > header:
+                    ranges[header] = last
+            stack.append(number)
+            last = number
+        for header in stack:
+            if last > header:
+                ranges[header] = last
+        return ranges
+
+    # --- 花括号 ---
+    def brace_open_line(self, header):
+        """header 行对应的 '{' 所在行，没有则返回 None"""
+        lines = self.lines
+        net, dip, bare = lines[header]
+        if bare and header > 0:
+            return None  # 单独的 '{' 归上一行所有
+        if header + 1 < len(lines) and lines[header + 1][2]:
+            return header + 1
+        return header if net - dip > 0 else None
+
+    def brace_end(self, header):
+        opened = self.brace_open_line(header)
+        if opened is None:
+            return None
+        net, dip, bare = self.lines[opened]
+        depth = net - dip  # 该行末尾仍未闭合的层数里，属于本行的部分
+        for number in range(opened + 1, len(self.lines)):
+            net, dip, bare = self.lines[number]
+            if depth + dip <= 0:
+                return number
+            depth += net
+        return None
+
+    def brace_ranges(self):
+        ranges = {}
+        stack = []
+        for number, (net, dip, bare) in enumerate(self.lines):
+            for _ in range(-dip):
+                if stack:
+                    header = stack.pop()
+                    if number > header:
+                        ranges[header] = max(ranges.get(header, 0), number)
+            header = number - 1 if bare and number > 0 else number
+            stack.extend([header] * (net - dip))
+        return ranges
+
+    # --- 查询 ---
+    def fold_end(self, header):
+        """header 行可折叠时返回折叠区的最后一行，否则返回 None"""
+        if not 0 <= header < len(self.lines):
+            return None
+        return self.indent_end(header) if self.style == "indent" else self.brace_end(header)
+
+    def is_header(self, number):
+        """绘制行号区时逐行调用，只看本行和下一行"""
+        lines = self.lines
+        if not 0 <= number < len(lines) - 1:
+            return False
+        if self.style == "indent":
+            if lines[number] < 0:
+                return False
+            following = number + 1
+            while following < len(lines) and lines[following] < 0:
+                following += 1
+            return following < len(lines) and lines[following] > lines[number]
+        return self.brace_open_line(number) is not None
+
+    def ranges(self):
+        """一次扫描得到所有折叠区 {首行: 末行}"""
+        return self.indent_ranges() if self.style == "indent" else self.brace_ranges()
+
+
+class FoldManager(QObject):
+    """为 CodeEditor 维护折叠索引并折叠/展开块
+
+    折叠区用 QTextBlock.setVisible(False) 隐藏，被隐藏的块不参与排版和绘制。
+    contentsChange 时只替换改动涉及的行，已折叠区域的首行号随之平移。
+    """
+    def __init__(self, editor, style="indent", parent=None):
+        super().__init__(parent or editor)
+        self.editor = editor
+        self.document = editor.document()
+        self.index = FoldIndex(style)
+        self.folded = {}  # 已折叠的区域 {首行: 末行}（从 0 开始）
+        self.block_count = 0
+        self.reset()
+        self.document.contentsChange.connect(self.on_contents_change)
+
+    def reset(self):
+        self.index.reset(self.document.toPlainText().split('\n'))
+        self.block_count = self.document.blockCount()
+
+    def block_texts(self, first, last):
+        texts = []
+        block = self.document.findBlockByNumber(first)
+        while block.isValid() and block.blockNumber() <= last:
+            texts.append(block.text())
+            block = block.next()
+        return texts
+
+    def on_contents_change(self, position, removed, added):
+        first = self.document.findBlock(position).blockNumber()
+        last = self.document.findBlock(min(position + added, self.document.characterCount() - 1)).blockNumber()
+        delta = self.document.blockCount() - self.block_count
+        self.block_count = self.document.blockCount()
+        self.index.splice(first, last - first + 1 - delta, self.block_texts(first, last))
+        if not self.folded:
+            return
+        if delta:
+            # 改动之后的区域整体平移，被删掉的首行不再折叠
+            self.folded = {header + delta if header > first else header: end + delta if end >= first else end
+                           for header, end in self.folded.items() if not first < header <= first - delta}
+        # 只核对与改动重叠的区域；改动只在首行内时保持折叠
+        for header, end in sorted(self.folded.items()):
+            if header > last or end < first or header == first == last:
+                continue
+            self.unfold(header)
+
+    # --- 折叠操作 ---
+    def set_range_visible(self, first, last, visible):
+        block = self.document.findBlockByNumber(first)
+        start = block.position()
+        while block.isValid() and block.blockNumber() <= last:
+            block.setVisible(visible)
+            block = block.next()
+        end = block.position() if block.isValid() else self.document.characterCount()
+        return start, end
+
+    def relayout(self, start, end):
+        self.document.markContentsDirty(start, end - start)
+        self.editor.viewport().update()
+        self.editor.lineNumberArea.update()
+
+    def fold(self, header):
+        end = self.index.fold_end(header)
+        if end is None:
+            return False
+        self.folded[header] = end
+        start, stop = self.set_range_visible(header + 1, end, False)
+        self.relayout(start, stop)
+        cursor = self.editor.textCursor()
+        if header < cursor.blockNumber() <= end:
+            cursor.setPosition(self.document.findBlockByNumber(header).position())
+            cursor.movePosition(QTextCursor.EndOfBlock)
+            self.editor.setTextCursor(cursor)
+        return True
+
+    def unfold(self, header):
+        end = self.folded.pop(header, header)
+        start, stop = self.set_range_visible(header + 1, end, True)
+        # 内层仍处于折叠状态的区域保持隐藏
+        for inner, inner_end in sorted(self.folded.items()):
+            if header < inner <= end:
+                self.set_range_visible(inner + 1, inner_end, False)
+        self.relayout(start, stop)
+
+    def toggle(self, header):
+        if header in self.folded:
+            self.unfold(header)
+        else:
+            self.fold(header)
+
+    def fold_all(self):
+        self.folded = self.index.ranges()
+        hidden = [False] * self.document.blockCount()
+        covered = -1
+        for header, end in sorted(self.folded.items()):
+            # 内层区域已被外层覆盖
+            if header >= covered:
+                hidden[header + 1:end + 1] = [True] * (end - header)
+                covered = end
+        self.apply_hidden(hidden)
+
+    def unfold_all(self):
+        self.folded.clear()
+        self.apply_hidden([False] * self.document.blockCount())
+
+    def apply_hidden(self, hidden):
+        """按整篇的隐藏表一次性设置所有块，只在末尾重新排版一次"""
+        block = self.document.firstBlock()
+        for flag in hidden:
+            if not block.isValid():
+                break
+            block.setVisible(not flag)
+            block = block.next()
+        self.relayout(0, self.document.characterCount())
+        cursor = self.editor.textCursor()
+        if not cursor.block().isVisible():
+            while not cursor.block().isVisible() and cursor.block().previous().isValid():
+                cursor.setPosition(cursor.block().previous().position())
+            cursor.movePosition(QTextCursor.EndOfBlock)
+            self.editor.setTextCursor(cursor)
+        self.editor.ensureCursorVisible()
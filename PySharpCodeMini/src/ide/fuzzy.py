@@ -0,0 +1,228 @@
+import re
+from array import array
+from bisect import bisect_right
+from collections import defaultdict
+from itertools import accumulate
+
+# 该模块不依赖 Qt，补全和快速打开共用
+
+# 词首：开头、分隔符之后、小写到大写、字母到数字
+_WORD_START = re.compile(r'(?:^|(?<=[_\-./\\ :]))[^_\-./\\ :]|(?<=[a-z])[A-Z]|(?<=[A-Za-z])[0-9]')
+# 同上，用于换行拼接的整块文本，换行符本身也保留下来作为分隔
+_PACKED_WORD_START = re.compile(r'\n|(?<=[\n_\-./\\ :])[^\n_\-./\\ :]|(?<=[a-z])[A-Z]|(?<=[A-Za-z])[0-9]')
+
+PREFIX_BONUS = 30
+WORD_START_BONUS = 12
+CONSECUTIVE_BONUS = 8
+CASE_BONUS = 1
+GAP_PENALTY = 1
+LENGTH_PENALTY = 0.1
+
+
+def word_starts(candidate):
+    return [m.start() for m in _WORD_START.finditer(candidate)]
+
+
+def fuzzy_score(candidate, query):
+    """单个候选的精确得分，query 不是其子序列（不区分大小写）时返回 None
+
+    逐个匹配查询字符时优先落在词首（驼峰、下划线、路径分隔之后），其次取最早出现的位置。
+    """
+    lower = candidate.lower()
+    needle = query.lower()
+    starts = set(word_starts(candidate))
+    score = PREFIX_BONUS if lower.startswith(needle) else 0
+    position = 0
+    previous = -2
+    for offset, ch in enumerate(needle):
+        found = lower.find(ch, position)
+        if found < 0:
+            return None
+        # 不与上一个字符相连时，后面还有同一字符落在词首、且剩余部分仍能匹配则改用词首
+        if found not in starts and found != previous + 1:
+            for start in sorted(s for s in starts if s > found):
+                if lower[start] == ch and _is_subsequence(lower, needle[offset + 1:], start + 1):
+                    found = start
+                    break
+        if found in starts:
+            score += WORD_START_BONUS
+        if found == previous + 1:
+            score += CONSECUTIVE_BONUS
+        elif previous >= 0:
+            score -= GAP_PENALTY * min(found - previous - 1, 10)
+        if candidate[found] == query[offset]:
+            score += CASE_BONUS
+        previous = found
+        position = found + 1
+    return score - LENGTH_PENALTY * len(candidate)
+
+
+def _is_subsequence(text, needle, position):
+    for ch in needle:
+        position = text.find(ch, position) + 1
+        if not position:
+            return False
+    return True
+
+
+# 非零字节映射为 1，位图转成字节串后可以用 bytes.find 跳过全零的部分
+_NONZERO = bytes([0] + [1] * 255)
+
+
+class CharIndex:
+    """换行拼接的整块文本中，每个字符出现在哪些行
+
+    出现在很多行的字符用按位打包的大整数（第 i 位为 1 表示第 i 行含有该字符），查询时按位与；
+    只出现在少数行的字符（中文名字和路径里的大多数汉字）用升序的行号数组。
+    占用的内存与文本长度成正比，不随行数乘以不同字符数增长。
+    """
+    DENSE_RATIO = 32  # 出现在超过 1/32 的行中时改用位图：行号每项 4 字节，位图每行只占 1 位
+
+    def __init__(self, text):
+        lines = text[1:-1].split("\n")
+        self.rows = len(lines)
+        postings = defaultdict(list)
+        for index, line in enumerate(lines):
+            for ch in set(line):
+                postings[ch].append(index)
+        self.dense = {}
+        self.sparse = {}
+        threshold = self.rows // self.DENSE_RATIO
+        for ch, rows in postings.items():
+            if len(rows) > threshold:
+                lane = bytearray((self.rows + 7) >> 3)
+                for index in rows:
+                    lane[index >> 3] |= 1 << (index & 7)
+                self.dense[ch] = int.from_bytes(lane, 'little')
+            else:
+                self.sparse[ch] = array('l', rows)
+
+    def __contains__(self, ch):
+        return ch in self.dense or ch in self.sparse
+
+    def containing(self, needle):
+        """含有 needle 中全部字符的行号（按行顺序）"""
+        mask = -1
+        sparse = []
+        for ch in set(needle):
+            if ch in self.dense:
+                mask &= self.dense[ch]
+                if not mask:
+                    return
+            elif ch in self.sparse:
+                sparse.append(self.sparse[ch])
+            else:
+                return
+        bits = mask.to_bytes((self.rows + 7) >> 3, 'little') if mask != -1 else None
+        if sparse:
+            # 从最短的行号数组出发，逐个检查其余字符
+            sparse.sort(key=len)
+            others = [set(rows) for rows in sparse[1:]]
+            for index in sparse[0]:
+                if bits is not None and not bits[index >> 3] >> (index & 7) & 1:
+                    continue
+                if all(index in rows for rows in others):
+                    yield index
+            return
+        nonzero = bits.translate(_NONZERO)
+        byte = nonzero.find(1)
+        while byte >= 0:
+            value = bits[byte]
+            while value:
+                low = value & -value
+                yield (byte << 3) + low.bit_length() - 1
+                value ^= low
+            byte = nonzero.find(1, byte + 1)
+
+
+class FuzzyMatcher:
+    """批量模糊匹配
+
+    候选按 (长度, 小写) 排好序后用换行拼成一整块小写文本，另有一块只含各候选词首字母的文本，
+    两块文本各有一个 CharIndex，记录每个字符出现在哪些候选中。查询按档次进行，凑够 limit 个后不再查找更低的档次：
+        前缀 > 词首缩写（getUserName ← gun）> 连续子串 > 子序列
+    前缀和子串直接在整块文本上 str.find；缩写和子序列先从 CharIndex 取出同时含有全部查询字符的候选，
+    只核对这些候选。同一档内候选越短越靠前，每档最多取 limit * WIDEN 个，
+    最后只对这几百个候选计算精确得分排序。
+    """
+    WIDEN = 2
+
+    def __init__(self, candidates):
+        self.candidates = sorted(set(candidates), key=str.lower)
+        self.candidates.sort(key=len)
+        packed = "\n" + "\n".join(self.candidates) + "\n"
+        self.lower = packed.lower()
+        self.starts = self.line_starts(map(len, self.lower[1:-1].split("\n")))  # 个别字符转小写后长度会变
+        # 各候选的词首字母，一次 findall 得到，不逐个候选处理
+        self.initials = "".join(_PACKED_WORD_START.findall(packed)).lower()
+        self.initial_starts = self.line_starts(map(len, self.initials[1:-1].split("\n")))
+        self.char_index = CharIndex(self.lower)
+        self.initial_index = CharIndex(self.initials)
+
+    def __len__(self):
+        return len(self.candidates)
+
+    @staticmethod
+    def line_starts(lengths):
+        """整块文本中每行的起点（第 0 个字符是换行符）"""
+        starts = array('l', accumulate((length + 1 for length in lengths), initial=1))
+        starts.pop()
+        return starts
+
+    @staticmethod
+    def _subsequence(needle):
+        """按子序列匹配的正则；每个字符前只跳过不是该字符的内容，失败时几乎不回溯"""
+        return re.compile("".join(f"[^\n{re.escape(ch)}]*{re.escape(ch)}" for ch in needle))
+
+    def _find(self, literal, found, cap, tier):
+        """在整块文本上查找字面串，每行只取一次，按行顺序（即候选长度）取够 cap 个为止"""
+        text = self.lower
+        taken = 0
+        position = text.find(literal)
+        while position >= 0 and taken < cap:
+            index = bisect_right(self.starts, position + (literal[0] == "\n")) - 1
+            if index not in found:
+                found[index] = tier
+                taken += 1
+            # 从行尾的换行符继续，以换行开头的字面串从这里匹配下一行
+            position = text.find("\n", position + 1)
+            if position >= 0:
+                position = text.find(literal, position)
+
+    def _check(self, char_index, text, starts, needle, pattern, found, cap, tier):
+        """逐个核对含有全部查询字符的行"""
+        taken = 0
+        for index in char_index.containing(needle):
+            if index not in found and pattern.match(text, starts[index]):
+                found[index] = tier
+                taken += 1
+                if taken >= cap:
+                    break
+
+    def match(self, query, limit=50):
+        """返回 [(得分, 候选)]，得分从高到低"""
+        needle = query.lower()
+        if not needle or "\n" in needle or any(ch not in self.char_index for ch in needle):
+            return []
+        cap = limit * self.WIDEN
+        found = {}  # 候选序号 -> 档次
+        tiers = (
+            lambda: self._find("\n" + needle, found, cap, 0),
+            lambda: self._check(self.initial_index, self.initials, self.initial_starts, needle,
+                                self._subsequence(needle), found, cap, 1),
+            lambda: self._find(needle, found, cap, 2),
+            lambda: self._check(self.char_index, self.lower, self.starts, needle, self._subsequence(needle),
+                                found, cap, 3),
+        )
+        for run in tiers:
+            run()
+            if len(found) >= limit:
+                break
+        ranked = []
+        for index, tier in found.items():
+            candidate = self.candidates[index]
+            score = fuzzy_score(candidate, query)
+            if score is not None:
+                ranked.append((-tier, score, candidate))
+        ranked.sort(reverse=True)
+        return [(score, candidate) for tier, score, candidate in ranked[:limit]]
@@ -0,0 +1,82 @@
+from PySide6.QtCore import Qt, QPointF
+from PySide6.QtGui import QPixmap, QPainter, QColor, QFontMetrics, QPolygonF
+
+# 按 (字体, 设备像素比, 颜色) 缓存的数字字形，所有编辑器共享
+_DIGITS = {}
+# 按 (类别, 尺寸, 设备像素比) 缓存的行标记图
+_MARKERS = {}
+
+MARKER_COLORS = {
+    "breakpoint": QColor(229, 57, 53),
+    "error": QColor(229, 57, 53),
+    "warning": QColor(251, 140, 0),
+    "folded": QColor(120, 120, 120),
+    "unfolded": QColor(160, 160, 160),
+}
+
+
+class DigitGlyphs:
+    """预先渲染好的 0-9 字形，绘制行号时逐位贴图，不再每行排版文字"""
+    def __init__(self, font, dpr, color):
+        fm = QFontMetrics(font)
+        self.width = fm.horizontalAdvance('9')
+        self.height = fm.height()
+        self.pixmaps = []
+        for digit in '0123456789':
+            pixmap = QPixmap(max(1, round(self.width * dpr)), max(1, round(self.height * dpr)))
+            pixmap.setDevicePixelRatio(dpr)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setFont(font)
+            painter.setPen(color)
+            painter.drawText(0, fm.ascent(), digit)
+            painter.end()
+            self.pixmaps.append(pixmap)
+
+    def draw_number(self, painter, right, top, number):
+        """把 number 右对齐绘制到 right 左侧"""
+        text = str(number)
+        x = right - self.width * len(text)
+        for ch in text:
+            painter.drawPixmap(x, top, self.pixmaps[ord(ch) - 48])
+            x += self.width
+
+
+def digit_glyphs(font, dpr, color):
+    key = (font.key(), dpr, color.rgba())
+    glyphs = _DIGITS.get(key)
+    if glyphs is None:
+        glyphs = _DIGITS[key] = DigitGlyphs(font, dpr, color)
+    return glyphs
+
+
+def marker_pixmap(kind, size, dpr):
+    """断点画实心圆，错误和警告画三角形，折叠标记画朝右（已折叠）或朝下的箭头"""
+    key = (kind, size, dpr)
+    pixmap = _MARKERS.get(key)
+    if pixmap is None:
+        pixmap = QPixmap(max(1, round(size * dpr)), max(1, round(size * dpr)))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(MARKER_COLORS.get(kind, QColor(Qt.gray)))
+        margin = size * 0.2
+        if kind == "breakpoint":
+            painter.drawEllipse(QPointF(size / 2, size / 2), size / 2 - margin, size / 2 - margin)
+        elif kind == "folded":
+            margin = size * 0.3
+            painter.drawPolygon(QPolygonF([
+                QPointF(margin, margin), QPointF(size - margin, size / 2), QPointF(margin, size - margin)]))
+        elif kind == "unfolded":
+            margin = size * 0.3
+            painter.drawPolygon(QPolygonF([
+                QPointF(margin, margin), QPointF(size - margin, margin), QPointF(size / 2, size - margin)]))
+        else:
+            painter.drawPolygon(QPolygonF([
+                QPointF(size / 2, margin), QPointF(size - margin, size - margin), QPointF(margin, size - margin)]))
+        painter.end()
+        _MARKERS[key] = pixmap
+    return pixmap
+
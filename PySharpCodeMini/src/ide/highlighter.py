@@ -1,157 +1,360 @@
-import re
-from PySide6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor, QFont
-from PySide6.QtCore import Qt
+import time
+import zlib
+from PySide6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor, QFont, QTextBlockUserData
+from PySide6.QtCore import Qt, QObject, QTimer
+from .lexer import (KEYWORD, COMMENT, TOKEN_NAMES, PYTHON_GRAMMAR, CSHARP_GRAMMAR,
+                    SPAN_CACHE, iter_spans, language_for_path)
+from .semantic import analyze_revision
+from .workers import process_pool, FutureWatcher
 
-class PythonHighlighter(QSyntaxHighlighter):
-    def __init__(self, document, dark_mode=False):
-        super().__init__(document)
-        self.highlighting_rules = []
-        self.dark_mode = dark_mode
-        self.set_dark_mode(self.dark_mode)
+# 每套配色只创建一份格式表，由所有标签页的高亮器共用
+_PALETTES = {}
 
-    def set_dark_mode(self, dark):
-        self.dark_mode = dark
-        if dark:
-            self.colors = {
-                "keyword_color": "#ff9500",
-                "string_color": "#a5c261",
-                "comment_color": "#888888",
-                "function_color": "#ffd700",
-                "class_color": "#e6e6e6",
-                "call_color": "#7ec3e6"
-            }
-        else:
-            self.colors = {
-                "keyword_color": "#ff9500",
-                "string_color": "#6a8759",
-                "comment_color": "#808080",
-                "function_color": "#ffc66d",
-                "class_color": "#a9b7c6",
-                "call_color": "#6897bb"
-        }
-        self.setup_highlighting_rules()
-        self.rehighlight()
+def get_palette(colors):
+    """返回 {token: QTextCharFormat}，相同颜色组合直接复用已有格式"""
+    key = tuple(sorted(colors.items()))
+    palette = _PALETTES.get(key)
+    if palette is None:
+        palette = {}
+        for token, name in TOKEN_NAMES.items():
+            if f"{name}_color" not in colors:
+                continue
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor(colors[f"{name}_color"]))
+            if token == KEYWORD:
+                fmt.setFontWeight(QFont.Bold)
+            elif token == COMMENT:
+                fmt.setFontItalic(True)
+            palette[token] = fmt
+        _PALETTES[key] = palette
+    return palette
 
-    def setup_highlighting_rules(self):
-        """根据当前颜色设置高亮规则"""
-        self.highlighting_rules.clear()
-
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(QColor(self.colors["keyword_color"]))
-        keyword_format.setFontWeight(QFont.Bold)
-        keywords = ['def', 'class', 'if', 'else', 'elif', 'while', 'for',
-                    'import', 'from', 'return', 'try', 'except', 'with',
-                    'as', 'pass', 'break', 'continue', 'and', 'or', 'not']
-        for word in keywords:
-            pattern = re.compile(r'\b' + word + r'\b')
-            self.highlighting_rules.append((pattern, keyword_format))
-
-        string_format = QTextCharFormat()
-        string_format.setForeground(QColor(self.colors["string_color"]))
-        self.highlighting_rules.append((re.compile(r'".*?"'), string_format))
-        self.highlighting_rules.append((re.compile(r"'.*?'"), string_format))
-
-        comment_format = QTextCharFormat()
-        comment_format.setForeground(QColor(self.colors["comment_color"]))
-        comment_format.setFontItalic(True)
-        self.highlighting_rules.append((re.compile(r'#.*'), comment_format))
-
-        function_format = QTextCharFormat()
-        function_format.setForeground(QColor(self.colors["function_color"]))
-        self.highlighting_rules.append((re.compile(r'\bdef\s+(\w+)\b'), function_format))
-
-        class_format = QTextCharFormat()
-        class_format.setForeground(QColor(self.colors["class_color"]))
-        self.highlighting_rules.append((re.compile(r'\bclass\s+(\w+)\b'), class_format))
-
-        call_format = QTextCharFormat()
-        call_format.setForeground(QColor(self.colors["call_color"]))
-        self.highlighting_rules.append((re.compile(r'\b\w+(?=\()'), call_format))
+class BlockTokens(QTextBlockUserData):
+    """块上保存的词法结果：语义类别与颜色分离，换配色时无需重新分词
 
-    def update_highlighting_colors(self, new_colors):
-        """更新高亮颜色并重新设置规则"""
-        self.colors.update(new_colors)
-        self.setup_highlighting_rules()
-        self.rehighlight()
+    text_key 和 start_state 记录 spans 对应的行文本和行首状态，两者都没变时直接复用 spans。
+    """
+    def __init__(self, spans=None, generation=-1):
+        super().__init__()
+        self.spans = spans
+        self.generation = generation
+        self.semantic_generation = -1
+        self.text_key = None
+        self.start_state = 0
+        self.end_state = 0
 
-    def highlightBlock(self, text):
-        for pattern, fmt in self.highlighting_rules:
-            for match in pattern.finditer(text):
-                start, end = match.span()
-                self.setFormat(start, end - start, fmt)
+class LexerHighlighter(QSyntaxHighlighter):
+    """基于单次扫描词法器的高亮基类，子类只需提供语法和配色"""
+    grammar = None
+    span_cache = SPAN_CACHE
+    # 每个块最多分词的字符数，超出部分不着色，避免压缩代码的超长行拖慢输入
+    max_line_length = 4000
+    dark_colors = {}
+    light_colors = {}
 
-class CSharpHighlighter(QSyntaxHighlighter):
     def __init__(self, document, dark_mode=False):
         super().__init__(document)
-        self.highlighting_rules = []
+        self.formats = {}
+        self.palette_generation = 0
+        self.scheduler = None
+        # 语义高亮结果 {块号: (行文本 crc32, array('I'))}，None 表示没有
+        self.semantic_tokens = None
+        self.semantic_generation = 0
+        # 后台高亮模式下，只有编号小于 ready_upto 或处于可见范围内的块才真正高亮
+        self.ready_upto = None
+        self.visible_range = (0, -1)
+        # 构造时 QSyntaxHighlighter 已经安排了一次延迟的整体高亮，这里不再同步 rehighlight
         self.dark_mode = dark_mode
-        self.set_dark_mode(self.dark_mode)
+        self.colors = dict(self.dark_colors if dark_mode else self.light_colors)
+        self.setup_highlighting_rules()
 
     def set_dark_mode(self, dark):
         self.dark_mode = dark
-        if dark:
-            self.colors = {
-                "keyword_color": "#ffcc66",
-                "string_color": "#a5c261",
-                "comment_color": "#888888",
-                "function_color": "#ffd700",
-                "class_color": "#e6e6e6",
-                "call_color": "#7ec3e6"
-            }
-        else:
-            self.colors = {
-                "keyword_color": "#0033b3",
-                "string_color": "#6a8759",
-                "comment_color": "#808080",
-                "function_color": "#ffc66d",
-                "class_color": "#a9b7c6",
-                "call_color": "#6897bb"
-        }
-        self.setup_highlighting_rules()
-        self.rehighlight()
+        self.colors = dict(self.dark_colors if dark else self.light_colors)
+        self.apply_palette()
 
     def setup_highlighting_rules(self):
-        """根据当前颜色设置高亮规则"""
-        self.highlighting_rules.clear()
-
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(QColor(self.colors["keyword_color"]))
-        keyword_format.setFontWeight(QFont.Bold)
-        keywords = ['class', 'void', 'using', 'namespace', 'public', 'private',
-                    'if', 'else', 'for', 'while', 'return', 'int', 'string', 'bool']
-        for word in keywords:
-            pattern = re.compile(r'\b' + word + r'\b')
-            self.highlighting_rules.append((pattern, keyword_format))
-
-        string_format = QTextCharFormat()
-        string_format.setForeground(QColor(self.colors["string_color"]))
-        self.highlighting_rules.append((re.compile(r'".*?"'), string_format))
-
-        comment_format = QTextCharFormat()
-        comment_format.setForeground(QColor(self.colors["comment_color"]))
-        comment_format.setFontItalic(True)
-        self.highlighting_rules.append((re.compile(r'//.*'), comment_format))
-
-        function_format = QTextCharFormat()
-        function_format.setForeground(QColor(self.colors["function_color"]))
-        self.highlighting_rules.append((re.compile(r'\b(?:void|int|string|bool)\s+(\w+)\s*\('), function_format))
-
-        class_format = QTextCharFormat()
-        class_format.setForeground(QColor(self.colors["class_color"]))
-        self.highlighting_rules.append((re.compile(r'\bclass\s+(\w+)\b'), class_format))
-
-        call_format = QTextCharFormat()
-        call_format.setForeground(QColor(self.colors["call_color"]))
-        self.highlighting_rules.append((re.compile(r'\b\w+(?=\()'), call_format))
+        """根据当前颜色取得共享的格式表，语法规则已在注册表中预编译"""
+        self.formats = get_palette(self.colors)
 
     def update_highlighting_colors(self, new_colors):
         """更新高亮颜色并重新设置规则"""
         self.colors.update(new_colors)
-        self.setup_highlighting_rules()
-        self.rehighlight()
+        self.apply_palette()
+
+    def apply_palette(self):
+        """切换格式表；有调度器时只重绘可见块，其余块在空闲时补上"""
+        formats = get_palette(self.colors)
+        if formats is self.formats:
+            return
+        self.formats = formats
+        self.palette_generation += 1
+        if self.scheduler:
+            self.scheduler.recolor()
+        else:
+            self.rehighlight()
+
+    def set_semantic_tokens(self, by_line):
+        """更新语义结果；只立即重绘可见块，其余块滚动到可见时再应用"""
+        self.semantic_tokens = by_line
+        self.semantic_generation += 1
+        if self.scheduler:
+            self.scheduler.update_visible_range()
+
+    def is_deferred(self, number):
+        """后台高亮尚未处理到、且不在可见范围内的块"""
+        if self.ready_upto is None or number < self.ready_upto:
+            return False
+        first, last = self.visible_range
+        return not first <= number <= last
 
     def highlightBlock(self, text):
-        for pattern, fmt in self.highlighting_rules:
-            for match in pattern.finditer(text):
-                start, end = match.span()
-                self.setFormat(start, end - start, fmt)
+        if self.ready_upto is not None and self.is_deferred(self.currentBlock().blockNumber()):
+            # 状态未知，留给后台高亮按顺序补上
+            self.setCurrentBlockState(-1)
+            data = self.currentBlockUserData()
+            if data is not None:
+                data.generation = -1
+            return
+        # 块状态保存行末词法状态；Qt 只在状态变化时继续重排后续块，
+        # 所以一次按键通常只会重新高亮少数几个块
+        start_state = max(self.previousBlockState(), 0)
+        text_key = (len(text), hash(text))
+        line = text
+        if len(text) > self.max_line_length:
+            text = text[:self.max_line_length]
+        data = self.currentBlockUserData()
+        if data is not None and data.spans is not None and data.text_key == text_key and data.start_state == start_state:
+            # 文本和行首状态都没变（换配色、语义结果更新）：沿用块上的词法结果，只换格式表
+            spans, state = data.spans, data.end_state
+        else:
+            spans, state = self.span_cache.tokenize(self.grammar, text, start_state)
+            if line is not text:
+                # 只着色行首一段，但行末状态按整行求：截断处之后才闭合的三引号或块注释不能影响后续行
+                state = self.grammar.end_state(line, start_state)
+        formats = self.formats
+        for start, length, token in iter_spans(spans):
+            self.setFormat(start, length, formats[token])
+        if self.semantic_tokens:
+            entry = self.semantic_tokens.get(self.currentBlock().blockNumber())
+            # 行文本变了（或行号已错位）就不再套用旧的语义结果
+            if entry and entry[0] == zlib.crc32(text.encode('utf-8')):
+                for start, length, token in iter_spans(entry[1]):
+                    if token in formats:
+                        self.setFormat(start, length, formats[token])
+        self.setCurrentBlockState(state)
+        if data is None:
+            data = BlockTokens()
+            self.setCurrentBlockUserData(data)
+        data.spans = spans
+        data.text_key = text_key
+        data.start_state = start_state
+        data.end_state = state
+        data.generation = self.palette_generation
+        data.semantic_generation = self.semantic_generation
+
+class HighlightScheduler(QObject):
+    """按可见范围优先的顺序调度高亮工作，其余块在空闲时按时间片分批处理
+
+    两种工作：大文档打开时的后台分词（start），以及换配色后的重新着色（recolor）。
+    """
+    def __init__(self, editor, highlighter, slice_ms=8, parent=None):
+        super().__init__(parent or editor)
+        self.editor = editor
+        self.highlighter = highlighter
+        highlighter.scheduler = self
+        self.document = editor.document()
+        self.slice_ms = slice_ms  # 每个时间片的预算（毫秒）
+        self.block_count = self.document.blockCount()
+        self.recolor_upto = None  # 重新着色的进度（块编号），None 表示没有待着色的块
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.run_slice)
+        self.editor.updateRequest.connect(self.on_update_request)
+        self.document.contentsChange.connect(self.on_contents_change)
+
+    def is_busy(self):
+        return (self.highlighter.ready_upto is not None or self.recolor_upto is not None
+                or self.highlighter.semantic_tokens is not None)
+
+    def start(self):
+        """后台分词：先处理可见块，再从头按时间片处理整个文档"""
+        self.highlighter.ready_upto = 0
+        self.highlighter.visible_range = self.compute_visible_range()
+        # 排在 QSyntaxHighlighter 构造时安排的延迟整体高亮之后，此时编辑器也已完成布局
+        QTimer.singleShot(0, self.update_visible_range)
+        QTimer.singleShot(0, self.timer.start)
+
+    def recolor(self):
+        """配色变化：立即重绘可见块，其余块保留旧颜色直到滚动到可见或空闲时处理"""
+        self.recolor_upto = 0
+        self.highlighter.visible_range = self.compute_visible_range()
+        self.highlight_visible()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.highlighter.ready_upto = None
+        self.recolor_upto = None
+
+    def compute_visible_range(self):
+        first = self.editor.firstVisibleBlock().blockNumber()
+        line_height = max(1, self.editor.fontMetrics().height())
+        return first, first + self.editor.viewport().height() // line_height + 1
+
+    def is_stale(self, block):
+        data = block.userData()
+        return data is None or data.generation != self.highlighter.palette_generation
+
+    def needs_refresh(self, block):
+        """可见块额外检查语义结果是否已应用"""
+        return self.is_stale(block) or block.userData().semantic_generation != self.highlighter.semantic_generation
+
+    def highlight_visible(self):
+        """立即处理可见范围内还未分词或颜色过期的块"""
+        if not self.is_busy():
+            return
+        first, last = self.highlighter.visible_range
+        block = self.document.findBlockByNumber(first)
+        while block.isValid() and block.blockNumber() <= last:
+            if self.needs_refresh(block):
+                self.highlighter.rehighlightBlock(block)
+            block = block.next()
+
+    def update_visible_range(self):
+        visible = self.compute_visible_range()
+        if visible != self.highlighter.visible_range:
+            self.highlighter.visible_range = visible
+        self.highlight_visible()
+
+    def on_update_request(self, rect, dy):
+        if self.is_busy() and self.compute_visible_range() != self.highlighter.visible_range:
+            self.update_visible_range()
+
+    def on_contents_change(self, position, removed, added):
+        # 在已处理区域内增删行时同步移动分界线，避免漏掉或重复处理块
+        count = self.document.blockCount()
+        delta = count - self.block_count
+        self.block_count = count
+        ready_upto = self.highlighter.ready_upto
+        if delta and ready_upto is not None and self.document.findBlock(position).blockNumber() < ready_upto:
+            self.highlighter.ready_upto = max(0, ready_upto + delta)
+
+    def run_slice(self):
+        deadline = time.perf_counter() + self.slice_ms / 1000.0
+        highlighter = self.highlighter
+        if highlighter.ready_upto is not None:
+            block = self.document.findBlockByNumber(highlighter.ready_upto)
+            while block.isValid():
+                highlighter.ready_upto = block.blockNumber() + 1
+                highlighter.rehighlightBlock(block)
+                block = block.next()
+                if time.perf_counter() >= deadline:
+                    return
+            highlighter.ready_upto = None
+            if self.recolor_upto is not None:
+                return
+        elif self.recolor_upto is not None:
+            block = self.document.findBlockByNumber(self.recolor_upto)
+            while block.isValid():
+                if self.is_stale(block):
+                    highlighter.rehighlightBlock(block)
+                block = block.next()
+                if time.perf_counter() >= deadline:
+                    self.recolor_upto = block.blockNumber() if block.isValid() else self.block_count
+                    return
+            self.recolor_upto = None
+        self.timer.stop()
+
+class SemanticLayer(QObject):
+    """Python 标签页的语义高亮：停止输入片刻后在后台进程分析语法树，结果按文档版本号校验"""
+    def __init__(self, editor, highlighter, delay_ms=500, parent=None):
+        super().__init__(parent or editor)
+        self.highlighter = highlighter
+        self.document = editor.document()
+        self.pending = False  # 后台是否有尚未返回的分析
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.request)
+        self.watcher = FutureWatcher(self)
+        self.watcher.finished.connect(self.on_result)
+        self.watcher.failed.connect(self.on_failed)
+        self.document.contentsChange.connect(lambda *_: self.timer.start())
+        self.timer.start()
+
+    def request(self):
+        if self.pending:
+            # 上一次分析还没回来，稍后再发，避免请求堆积
+            self.timer.start()
+            return
+        self.pending = True
+        revision = self.document.revision()
+        self.watcher.watch(process_pool().submit(analyze_revision, self.document.toPlainText(), revision))
+
+    def on_result(self, tag, result):
+        self.pending = False
+        revision, by_line = result
+        # 分析期间文档又改过，结果已过期，等下一次分析
+        if revision != self.document.revision() or by_line is None:
+            return
+        self.highlighter.set_semantic_tokens(by_line)
+
+    def on_failed(self, tag, error):
+        self.pending = False
+
+class PythonHighlighter(LexerHighlighter):
+    grammar = PYTHON_GRAMMAR
+    dark_colors = {
+        "keyword_color": "#ff9500",
+        "string_color": "#a5c261",
+        "comment_color": "#888888",
+        "function_color": "#ffd700",
+        "class_color": "#e6e6e6",
+        "call_color": "#7ec3e6",
+        "parameter_color": "#f0a868",
+        "local_color": "#dddddd",
+        "global_color": "#c792ea",
+        "imported_color": "#89ddff"
+    }
+    light_colors = {
+        "keyword_color": "#ff9500",
+        "string_color": "#6a8759",
+        "comment_color": "#808080",
+        "function_color": "#ffc66d",
+        "class_color": "#a9b7c6",
+        "call_color": "#6897bb",
+        "parameter_color": "#aa4926",
+        "local_color": "#000000",
+        "global_color": "#871094",
+        "imported_color": "#0b7285"
+    }
+
+class CSharpHighlighter(LexerHighlighter):
+    grammar = CSHARP_GRAMMAR
+    dark_colors = {
+        "keyword_color": "#ffcc66",
+        "string_color": "#a5c261",
+        "comment_color": "#888888",
+        "function_color": "#ffd700",
+        "class_color": "#e6e6e6",
+        "call_color": "#7ec3e6"
+    }
+    light_colors = {
+        "keyword_color": "#0033b3",
+        "string_color": "#6a8759",
+        "comment_color": "#808080",
+        "function_color": "#ffc66d",
+        "class_color": "#a9b7c6",
+        "call_color": "#6897bb"
+    }
+
+HIGHLIGHTERS = {
+    "python": PythonHighlighter,
+    "csharp": CSharpHighlighter,
+}
+
+def create_highlighter(path, document, dark_mode=False):
+    """按文件类型创建高亮器，不支持的类型返回 None"""
+    cls = HIGHLIGHTERS.get(language_for_path(path))
+    return cls(document, dark_mode=dark_mode) if cls else None
@@ -0,0 +1,173 @@
+import json
+import os
+import struct
+import tempfile
+
+# 该模块不依赖 Qt：日志格式、追加写入和重放
+
+# 每条记录：操作(1 字节)、位置、删除长度、数据长度(各 4 字节)，后跟数据
+HEADER = struct.Struct('<BIII')
+META = 1      # 数据为 JSON：文件路径、编码、换行符
+SNAPSHOT = 2  # 数据为整篇文本，之后的编辑以它为基础
+EDIT = 3      # 在位置处删除若干单位并插入数据中的文本
+
+# 位置和长度以 UTF-16 单位计，与 QTextDocument 的位置一致
+
+
+def utf16_length(text):
+    return len(text) if text.isascii() else len(text.encode('utf-16-le', 'surrogatepass')) // 2
+
+
+def process_alive(pid):
+    """pid 对应的进程是否还在运行；日志文件名以写入它的进程号开头，据此区分其它实例正在写的日志和崩溃后留下的日志"""
+    if pid == os.getpid():
+        return True
+    if pid <= 0:
+        return False
+    if os.name == 'nt':
+        # Windows 上 os.kill 会直接结束进程，只能打开进程句柄查询退出码
+        import ctypes
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return ctypes.get_last_error() == 5  # ERROR_ACCESS_DENIED：进程存在但无权查询
+        try:
+            code = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # 其它用户的进程
+    return True
+
+
+def journal_pid(name):
+    """日志文件名（进程号-序号.journal）中的进程号，格式不符时返回 None"""
+    try:
+        return int(name.split('-', 1)[0])
+    except ValueError:
+        return None
+
+
+def pack_record(op, data=b'', position=0, removed=0):
+    return HEADER.pack(op, position, removed, len(data)) + data
+
+
+def _encode(text):
+    return text.encode('utf-8', 'surrogatepass')
+
+
+def read_journal(path):
+    """重放日志，返回 (元数据, 文本)；没有快照或文件损坏时返回 None
+
+    崩溃时最后一条记录可能只写了一半，忽略即可。
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    meta = None
+    document = None
+    offset = 0
+    try:
+        while offset + HEADER.size <= len(data):
+            op, position, removed, length = HEADER.unpack_from(data, offset)
+            start = offset + HEADER.size
+            end = start + length
+            if end > len(data):
+                break
+            payload = data[start:end]
+            if op == META:
+                meta = json.loads(payload.decode('utf-8'))
+            elif op == SNAPSHOT:
+                document = bytearray(payload.decode('utf-8', 'surrogatepass').encode('utf-16-le', 'surrogatepass'))
+            elif op == EDIT and document is not None:
+                text = payload.decode('utf-8', 'surrogatepass').encode('utf-16-le', 'surrogatepass')
+                document[2 * position:2 * (position + removed)] = text
+            offset = end
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if meta is None or document is None:
+        return None
+    return meta, document.decode('utf-16-le', 'surrogatepass')
+
+
+class JournalFile:
+    """一个标签页的恢复日志：快照加其后的编辑，只追加
+
+    编辑先放在内存里，相邻的连续输入和退格合并成一条，flush 时一次写入。
+    追加的字节数超过快照大小（至少 COMPACT_BYTES）或记录数超过 COMPACT_RECORDS 时，
+    调用方应改写快照（compact），重放时间和文件大小都有上限，均摊下来每次编辑的开销是常数。
+    """
+    COMPACT_BYTES = 256 * 1024
+    COMPACT_RECORDS = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = []  # [[位置, 删除长度, 插入的文本, 插入的 UTF-16 长度]]
+        self.snapshot_bytes = 0
+        self.appended_bytes = 0
+        self.records = 0
+
+    def write_snapshot(self, meta, text):
+        """以新快照整体替换日志（临时文件 + 替换），丢弃之前的所有记录"""
+        data = pack_record(META, json.dumps(meta).encode('utf-8')) + pack_record(SNAPSHOT, _encode(text))
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix='.journal-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.pending = []
+        self.snapshot_bytes = len(data)
+        self.appended_bytes = 0
+        self.records = 0
+
+    def add_edit(self, position, removed, text):
+        added = utf16_length(text)
+        if self.pending:
+            last = self.pending[-1]
+            end = last[0] + last[3]
+            if removed == 0 and position == end:
+                # 接着上一次插入继续输入
+                last[2] += text
+                last[3] += added
+                return
+            if not text and last[3] == len(last[2]) and last[0] <= position and position + removed == end:
+                # 退格删掉的是上一次刚插入的文本
+                last[2] = last[2][:position - last[0]]
+                last[3] = len(last[2])
+                return
+        self.pending.append([position, removed, text, added])
+
+    def flush(self):
+        if not self.pending:
+            return
+        data = b''.join(pack_record(EDIT, _encode(text), position, removed)
+                        for position, removed, text, _ in self.pending)
+        with open(self.path, 'ab') as f:
+            f.write(data)
+        self.appended_bytes += len(data)
+        self.records += len(self.pending)
+        self.pending = []
+
+    def needs_compaction(self):
+        return (self.records >= self.COMPACT_RECORDS
+                or self.appended_bytes >= max(self.COMPACT_BYTES, self.snapshot_bytes))
+
+    def discard(self):
+        self.pending = []
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,402 @@
+import mmap
+import os
+import re
+from array import array
+from bisect import bisect_right
+from PySide6.QtWidgets import QAbstractScrollArea, QInputDialog
+from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtGui import QPainter, QColor
+from .piece_table import PieceTable
+
+NEWLINE = re.compile(rb'\n')
+
+
+class MappedFile:
+    """以内存映射方式打开的只读大文件，行起始偏移由后台线程逐步建立"""
+    # 单行最多解码的字节数，防止超长行拖慢绘制
+    MAX_LINE_BYTES = 64 * 1024
+
+    def __init__(self, path, encoding='utf-8'):
+        self.path = path
+        self.encoding = encoding
+        self.file = open(path, 'rb')
+        self.size = os.path.getsize(path)
+        # 空文件无法映射，用空字节串代替
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+        self.offsets = array('Q', [0])
+        self.indexed = self.size == 0
+
+    def close(self):
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+        self.file.close()
+
+    def line_count(self):
+        return len(self.offsets)
+
+    def line_bounds(self, number):
+        start = self.offsets[number]
+        if number + 1 < len(self.offsets):
+            end = self.offsets[number + 1] - 1
+        elif self.indexed:
+            end = self.size
+        else:
+            end = self.mm.find(b'\n', start)
+            end = self.size if end < 0 else end
+        return start, end
+
+    def line(self, number):
+        start, end = self.line_bounds(number)
+        end = min(end, start + self.MAX_LINE_BYTES)
+        return self.mm[start:end].decode(self.encoding, errors='replace').rstrip('\r')
+
+    def line_start(self, number):
+        return self.offsets[number]
+
+    def line_of_offset(self, offset):
+        return bisect_right(self.offsets, offset) - 1
+
+    def search(self, pattern, start=0, regex=False):
+        """在映射的字节上查找，返回 (起始偏移, 结束偏移)，找不到返回 None"""
+        if regex:
+            m = re.compile(pattern.encode(self.encoding)).search(self.mm, start)
+            return m.span() if m else None
+        needle = pattern.encode(self.encoding)
+        pos = self.mm.find(needle, start)
+        return (pos, pos + len(needle)) if pos >= 0 else None
+
+
+class LineIndexer(QThread):
+    """后台扫描换行符，分块追加行起始偏移"""
+    progress = Signal(int)
+    CHUNK = 4 * 1024 * 1024
+
+    def __init__(self, mapped, parent=None):
+        super().__init__(parent)
+        self.mapped = mapped
+
+    def run(self):
+        mm = self.mapped.mm
+        offsets = self.mapped.offsets
+        size = self.mapped.size
+        pos = 0
+        while pos < size and not self.isInterruptionRequested():
+            end = min(size, pos + self.CHUNK)
+            chunk = mm[pos:end]
+            offsets.extend([m.end() + pos for m in NEWLINE.finditer(chunk)])
+            pos = end
+            self.progress.emit(len(offsets))
+        self.mapped.indexed = pos >= size
+        self.progress.emit(len(offsets))
+
+
+def expanded_column(text, column, tab=4):
+    """原始列号转换为展开制表符后的列号"""
+    return len(text[:column].expandtabs(tab))
+
+
+def raw_column(text, expanded, tab=4):
+    """展开制表符后的列号转换回原始列号"""
+    width = 0
+    for index, ch in enumerate(text):
+        width = (width // tab + 1) * tab if ch == '\t' else width + 1
+        if width > expanded:
+            return index
+    return len(text)
+
+
+class LargeFileView(QAbstractScrollArea):
+    """大文件视图：只解码并绘制可见的行，跳转和搜索直接在映射的字节上进行
+
+    行索引建立完毕后换成片段表（PieceTable）作为文档，此后可以编辑；
+    保存时按片段流式写盘，不会拼出整篇文本。
+    """
+    modificationChanged = Signal(bool)
+
+    def __init__(self, path, encoding='utf-8', parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.mapped = MappedFile(path, encoding)
+        self.table = None  # 索引完成前为 None，视图只读
+        self.modified = False
+        self.cursor_line = 0
+        self.cursor_column = 0  # 字符列号（未展开制表符）
+        self.current_line = -1  # 跳转或搜索命中的行
+        self.search_pattern = ""
+        self.search_regex = False
+        self.search_offset = 0
+        self.max_columns = 0
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.viewport().setCursor(Qt.IBeamCursor)
+        self.indexer = LineIndexer(self.mapped, self)
+        self.indexer.progress.connect(self.on_index_progress)
+        self.indexer.finished.connect(self.on_index_finished)
+        self.indexer.start()
+
+    def close_file(self):
+        """关闭标签页时停止索引线程并释放映射"""
+        self.indexer.requestInterruption()
+        self.indexer.wait()
+        if self.table:
+            self.table.close()
+        else:
+            self.mapped.close()
+
+    def isReadOnly(self):
+        return self.table is None
+
+    def source(self):
+        """当前的行数据来源：片段表或只读映射，两者提供相同的按行读取接口"""
+        return self.table or self.mapped
+
+    def on_index_finished(self):
+        if self.mapped.indexed and self.table is None:
+            self.table = PieceTable(self.mapped)
+            self.viewport().update()
+
+    def set_modified(self, modified):
+        if modified != self.modified:
+            self.modified = modified
+            self.modificationChanged.emit(modified)
+
+    def save_to(self, path):
+        """流式保存到 path（临时文件 + 替换），之后以保存后的文件作为原文件"""
+        self.table.save(path)
+        self.mapped = self.table.mapped
+        self.path = path
+        self.set_modified(False)
+
+    def line_height(self):
+        return max(1, self.fontMetrics().height())
+
+    def visible_rows(self):
+        return self.viewport().height() // self.line_height() + 1
+
+    def gutter_width(self):
+        digits = len(str(self.source().line_count()))
+        return 8 + self.fontMetrics().horizontalAdvance('9') * digits
+
+    def update_scrollbars(self):
+        rows = self.viewport().height() // self.line_height()
+        self.verticalScrollBar().setRange(0, max(0, self.source().line_count() - rows))
+        self.verticalScrollBar().setPageStep(max(1, rows))
+        char_width = max(1, self.fontMetrics().horizontalAdvance('M'))
+        columns = (self.viewport().width() - self.gutter_width()) // char_width
+        self.horizontalScrollBar().setRange(0, max(0, self.max_columns - columns))
+        self.horizontalScrollBar().setPageStep(max(1, columns))
+
+    def on_index_progress(self, count):
+        self.update_scrollbars()
+        first = self.verticalScrollBar().value()
+        if count <= first + self.visible_rows() + 1:
+            self.viewport().update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scrollbars()
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        fm = self.fontMetrics()
+        line_height = self.line_height()
+        width = self.viewport().width()
+        gutter = self.gutter_width()
+        painter.fillRect(event.rect(), self.palette().base())
+        painter.fillRect(0, 0, gutter, self.viewport().height(), QColor(245, 245, 245))
+        first = self.verticalScrollBar().value()
+        first_column = self.horizontalScrollBar().value()
+        count = self.source().line_count()
+        text_color = self.palette().text().color()
+        columns = 0
+        for row in range(self.visible_rows()):
+            number = first + row
+            if number >= count:
+                break
+            y = row * line_height
+            if number == self.current_line:
+                painter.fillRect(gutter, y, width - gutter, line_height, QColor(232, 242, 254))
+            painter.setPen(Qt.gray)
+            painter.drawText(0, y, gutter - 4, line_height, Qt.AlignRight, str(number + 1))
+            text = self.source().line(number).expandtabs(4)
+            columns = max(columns, len(text))
+            painter.setPen(text_color)
+            painter.drawText(gutter + 4, y + fm.ascent(), text[first_column:first_column + 1024])
+            if self.table and number == self.cursor_line and self.hasFocus():
+                column = expanded_column(self.source().line(number), self.cursor_column) - first_column
+                if column >= 0:
+                    x = gutter + 4 + fm.horizontalAdvance(text[first_column:first_column + column])
+                    painter.drawLine(x, y, x, y + line_height - 1)
+        if columns > self.max_columns:
+            self.max_columns = columns
+            self.update_scrollbars()
+
+    def goto_line(self, line):
+        """跳转到指定行（从 1 开始）"""
+        number = max(0, min(line - 1, self.source().line_count() - 1))
+        self.current_line = number
+        self.cursor_line = number
+        self.cursor_column = 0
+        self.verticalScrollBar().setValue(max(0, number - self.visible_rows() // 2))
+        self.viewport().update()
+
+    # --- 编辑 ---
+    def cursor_offset(self):
+        """光标所在的文档字节偏移"""
+        text = self.table.line(self.cursor_line)
+        return self.table.line_start(self.cursor_line) + len(text[:self.cursor_column].encode(self.table.encoding))
+
+    def set_cursor(self, line, column):
+        line = max(0, min(line, self.source().line_count() - 1))
+        self.cursor_line = line
+        self.cursor_column = max(0, min(column, len(self.source().line(line))))
+        bar = self.verticalScrollBar()
+        rows = max(1, self.viewport().height() // self.line_height())
+        if line < bar.value():
+            bar.setValue(line)
+        elif line >= bar.value() + rows:
+            bar.setValue(line - rows + 1)
+        self.viewport().update()
+
+    def set_cursor_offset(self, offset):
+        line = self.table.line_of_offset(offset)
+        prefix = self.table.read(self.table.line_start(line), offset)
+        self.set_cursor(line, len(prefix.decode(self.table.encoding, errors='replace')))
+
+    def insert_text(self, text):
+        offset = self.cursor_offset()
+        self.table.insert(offset, text)
+        self.set_modified(True)
+        self.update_scrollbars()
+        self.set_cursor_offset(offset + len(text.encode(self.table.encoding)))
+
+    def delete_char(self, forward):
+        text = self.table.line(self.cursor_line)
+        if forward:
+            if self.cursor_column < len(text):
+                size = len(text[self.cursor_column].encode(self.table.encoding))
+            elif self.cursor_line + 1 < self.table.line_count():
+                size = self.table.line_start(self.cursor_line + 1) - self.cursor_offset()
+            else:
+                return
+            offset = self.cursor_offset()
+        else:
+            if self.cursor_column > 0:
+                size = len(text[self.cursor_column - 1].encode(self.table.encoding))
+                offset = self.cursor_offset() - size
+            elif self.cursor_line > 0:
+                offset = self.table.break_offset(self.cursor_line - 1)
+                size = self.table.line_start(self.cursor_line) - offset
+            else:
+                return
+        self.table.delete(offset, size)
+        self.set_modified(True)
+        self.update_scrollbars()
+        self.set_cursor_offset(offset)
+
+    def focusNextPrevChild(self, next):
+        # 可编辑时 Tab 键用于输入缩进
+        return False if self.table else super().focusNextPrevChild(next)
+
+    def mousePressEvent(self, event):
+        if not self.table or event.button() != Qt.LeftButton:
+            return super().mousePressEvent(event)
+        line = self.verticalScrollBar().value() + int(event.position().y()) // self.line_height()
+        if line >= self.table.line_count():
+            line = self.table.line_count() - 1
+        char_width = max(1, self.fontMetrics().horizontalAdvance('M'))
+        expanded = self.horizontalScrollBar().value() + round((event.position().x() - self.gutter_width() - 4) / char_width)
+        self.set_cursor(line, raw_column(self.table.line(line), max(0, expanded)))
+
+    def find_next(self):
+        if not self.search_pattern:
+            return False
+        found = self.source().search(self.search_pattern, self.search_offset, self.search_regex)
+        if found is None and self.search_offset:
+            # 到末尾后从头继续查找
+            found = self.source().search(self.search_pattern, 0, self.search_regex)
+        if found is None:
+            return False
+        start, end = found
+        self.search_offset = max(end, start + 1)
+        self.goto_line(self.source().line_of_offset(start) + 1)
+        return True
+
+    def find(self, pattern, regex=False):
+        self.search_pattern = pattern
+        self.search_regex = regex
+        self.search_offset = self.source().line_start(self.current_line) if self.current_line >= 0 else 0
+        return self.find_next()
+
+    def keyPressEvent(self, event):
+        bar = self.verticalScrollBar()
+        key = event.key()
+        ctrl = event.modifiers() & Qt.ControlModifier
+        if key == Qt.Key_G and ctrl:
+            line, ok = QInputDialog.getInt(self, "跳转到行", "行号：", self.current_line + 1, 1, self.source().line_count())
+            if ok:
+                self.goto_line(line)
+        elif key == Qt.Key_F and ctrl:
+            pattern, ok = QInputDialog.getText(self, "查找", "查找内容：", text=self.search_pattern)
+            if ok and pattern:
+                self.find(pattern)
+        elif key == Qt.Key_F3:
+            self.find_next()
+        elif self.table and self.edit_key(event):
+            pass
+        elif key == Qt.Key_Up:
+            bar.setValue(bar.value() - 1)
+        elif key == Qt.Key_Down:
+            bar.setValue(bar.value() + 1)
+        elif key == Qt.Key_PageUp:
+            bar.setValue(bar.value() - bar.pageStep())
+        elif key == Qt.Key_PageDown:
+            bar.setValue(bar.value() + bar.pageStep())
+        elif key == Qt.Key_Home and ctrl:
+            bar.setValue(0)
+        elif key == Qt.Key_End and ctrl:
+            bar.setValue(bar.maximum())
+        else:
+            super().keyPressEvent(event)
+
+    def edit_key(self, event):
+        """可编辑时处理光标移动和输入，返回是否已处理"""
+        key = event.key()
+        line, column = self.cursor_line, self.cursor_column
+        if key == Qt.Key_Left:
+            if column > 0:
+                self.set_cursor(line, column - 1)
+            elif line > 0:
+                self.set_cursor(line - 1, len(self.table.line(line - 1)))
+        elif key == Qt.Key_Right:
+            if column < len(self.table.line(line)):
+                self.set_cursor(line, column + 1)
+            elif line + 1 < self.table.line_count():
+                self.set_cursor(line + 1, 0)
+        elif key == Qt.Key_Up:
+            self.set_cursor(line - 1, column)
+        elif key == Qt.Key_Down:
+            self.set_cursor(line + 1, column)
+        elif key == Qt.Key_PageUp:
+            self.set_cursor(line - self.verticalScrollBar().pageStep(), column)
+        elif key == Qt.Key_PageDown:
+            self.set_cursor(line + self.verticalScrollBar().pageStep(), column)
+        elif key == Qt.Key_Home and not event.modifiers() & Qt.ControlModifier:
+            self.set_cursor(line, 0)
+        elif key == Qt.Key_End and not event.modifiers() & Qt.ControlModifier:
+            self.set_cursor(line, len(self.table.line(line)))
+        elif key == Qt.Key_Backspace:
+            self.delete_char(forward=False)
+        elif key == Qt.Key_Delete:
+            self.delete_char(forward=True)
+        elif key in (Qt.Key_Return, Qt.Key_Enter):
+            self.insert_text('\n')
+        elif key == Qt.Key_Tab:
+            self.insert_text(' ' * 4)
+        elif event.text() and event.text().isprintable() and not event.modifiers() & Qt.ControlModifier:
+            self.insert_text(event.text())
+        else:
+            return False
+        return True
@@ -0,0 +1,68 @@
+import json
+import math
+import time
+
+
+class LatencyHistogram:
+    """按对数分桶统计延迟（毫秒），记录和取分位数都是 O(桶数)，不保存原始样本"""
+    def __init__(self, min_ms=0.05, max_ms=5000.0, growth=1.1):
+        self.min_ms = min_ms
+        self.growth = growth
+        self.log_growth = math.log(growth)
+        size = int(math.log(max_ms / min_ms) / self.log_growth) + 2
+        self.counts = [0] * size
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def bucket_upper(self, index):
+        return self.min_ms * self.growth ** index
+
+    def record(self, ms):
+        if ms <= self.min_ms:
+            index = 0
+        else:
+            index = min(len(self.counts) - 1, int(math.log(ms / self.min_ms) / self.log_growth) + 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction):
+        """返回分位数所在桶的上界（误差不超过一个桶宽，约 10%）"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return min(self.bucket_upper(index), self.max_ms)
+        return self.max_ms
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max_ms,
+        }
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def dump(self, path):
+        """保存汇总和各桶计数（只保存非空桶）"""
+        data = self.summary()
+        data["time"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        data["buckets"] = [
+            {"upper_ms": round(self.bucket_upper(index), 4), "count": count}
+            for index, count in enumerate(self.counts) if count
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
@@ -0,0 +1,271 @@
+import os
+import re
+import sys
+from array import array
+from collections import OrderedDict
+
+# 词法单元类别（即 format id），0 表示不设置格式
+KEYWORD = 1
+STRING = 2
+COMMENT = 3
+FUNCTION = 4
+CLASS = 5
+CALL = 6
+# 语义类别，由后台语法树分析得到，覆盖在词法颜色之上
+PARAMETER = 7
+LOCAL = 8
+GLOBAL = 9
+IMPORTED = 10
+
+TOKEN_NAMES = {
+    KEYWORD: "keyword",
+    STRING: "string",
+    COMMENT: "comment",
+    FUNCTION: "function",
+    CLASS: "class",
+    CALL: "call",
+    PARAMETER: "parameter",
+    LOCAL: "local",
+    GLOBAL: "global",
+    IMPORTED: "imported",
+}
+
+
+class Rule:
+    """一条词法规则：整段匹配对应一个类别，或按捕获组分别对应类别"""
+    def __init__(self, token, pattern, captures=()):
+        self.token = token
+        self.pattern = pattern
+        self.captures = tuple(captures)
+        self.region = None
+
+
+class Region(Rule):
+    """跨行区域（三引号字符串、块注释）：以 begin 开始，直到 end 匹配为止，未闭合时进入 state"""
+    def __init__(self, token, begin, end, state):
+        super().__init__(token, begin)
+        self.end = re.compile(end)
+        self.state = state
+        self.region = self
+
+    def close(self, text, pos):
+        """返回区域在本行内的结束位置，未闭合返回 -1"""
+        m = self.end.match(text, pos)
+        return m.end() if m else -1
+
+
+class Grammar:
+    """把一组规则合并成单个交替正则，每行只扫描一次并输出互不重叠的区间"""
+    def __init__(self, name, rules):
+        self.name = name
+        self.rules = list(rules)
+        parts = []
+        self._rules_by_group = {}
+        self.regions = {}
+        group = 1
+        for rule in self.rules:
+            if rule.region:
+                self.regions[rule.state] = rule
+            parts.append(f"({rule.pattern})")
+            self._rules_by_group[group] = (rule, group)
+            group += 1 + re.compile(rule.pattern).groups
+        self.regex = re.compile("|".join(parts))
+        # 只影响行末状态的规则：跨行区域，以及可能把区域开头藏在里面的注释和单行字符串
+        state_parts = []
+        self._state_rules = {}
+        group = 1
+        for rule in self.rules:
+            if rule.region or rule.token in (STRING, COMMENT):
+                state_parts.append(f"({rule.pattern})")
+                self._state_rules[group] = rule
+                group += 1 + re.compile(rule.pattern).groups
+        self.state_regex = re.compile("|".join(state_parts))
+
+    def tokenize(self, text, state=0):
+        """返回 ([(start, length, token), ...], 行末状态)，区间按起始位置排序且不重叠
+
+        state 为 0 表示从普通代码开始，否则表示处于某个跨行区域内。
+        """
+        spans = []
+        append = spans.append
+        length = len(text)
+        pos = 0
+        if state:
+            region = self.regions[state]
+            pos = region.close(text, 0)
+            if pos < 0:
+                if length:
+                    append((0, length, region.token))
+                return spans, state
+            if pos:
+                append((0, pos, region.token))
+        rules_by_group = self._rules_by_group
+        while True:
+            for m in self.regex.finditer(text, pos):
+                # 外层分组最后闭合，lastindex 就是命中规则的分组号
+                rule, group = rules_by_group[m.lastindex]
+                if rule.region:
+                    start = m.start()
+                    pos = rule.close(text, m.end())
+                    if pos < 0:
+                        append((start, length - start, rule.token))
+                        return spans, rule.state
+                    append((start, pos - start, rule.token))
+                    break
+                if rule.captures:
+                    for offset, token in enumerate(rule.captures, 1):
+                        start = m.start(group + offset)
+                        if token and start >= 0:
+                            append((start, m.end(group + offset) - start, token))
+                elif rule.token:
+                    start, end = m.span()
+                    append((start, end - start, rule.token))
+            else:
+                return spans, 0
+
+    def end_state(self, text, state=0):
+        """只求行末状态，不生成区间：用于只高亮了行首一段的超长行，后续行的状态仍按整行计算"""
+        pos = 0
+        if state:
+            pos = self.regions[state].close(text, 0)
+            if pos < 0:
+                return state
+        state_rules = self._state_rules
+        while True:
+            for m in self.state_regex.finditer(text, pos):
+                rule = state_rules[m.lastindex]
+                if rule.region:
+                    pos = rule.close(text, m.end())
+                    if pos < 0:
+                        return rule.state
+                    break
+            else:
+                return 0
+
+
+class SpanCache:
+    """按 (语言, 行首状态, 行文本哈希) 缓存词法结果，超出内存预算时按 LRU 淘汰
+
+    区间以 array('I') 的 start/length/token 三元组紧凑保存。
+    """
+    # 键元组、OrderedDict 节点和结果元组的大致开销（字节）
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, budget_bytes=8 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def tokenize(self, grammar, text, state=0):
+        """返回 (packed_spans, 行末状态)，命中时不再运行词法器"""
+        key = (grammar.name, state, len(text), hash(text))
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        spans, end_state = grammar.tokenize(text, state)
+        packed = array('I')
+        for span in spans:
+            packed.extend(span)
+        entry = (packed, end_state)
+        self._entries[key] = entry
+        self.size_bytes += sys.getsizeof(packed) + self.ENTRY_OVERHEAD
+        while self.size_bytes > self.budget_bytes and self._entries:
+            _, (old, _) = self._entries.popitem(last=False)
+            self.size_bytes -= sys.getsizeof(old) + self.ENTRY_OVERHEAD
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def stats(self):
+        """命中/未命中计数和当前占用，供状态栏或调试输出读取"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+        }
+
+
+def iter_spans(packed):
+    """把 array('I') 还原成 (start, length, token) 三元组"""
+    it = iter(packed)
+    return zip(it, it, it)
+
+
+def keyword_pattern(keywords):
+    return r'\b(?:' + '|'.join(sorted(keywords, key=len, reverse=True)) + r')\b'
+
+
+PYTHON_KEYWORDS = ['def', 'class', 'if', 'else', 'elif', 'while', 'for',
+                   'import', 'from', 'return', 'try', 'except', 'with',
+                   'as', 'pass', 'break', 'continue', 'and', 'or', 'not']
+
+CSHARP_KEYWORDS = ['class', 'void', 'using', 'namespace', 'public', 'private',
+                   'if', 'else', 'for', 'while', 'return', 'int', 'string', 'bool']
+
+# 跨行区域的状态编号，0 保留给普通代码
+PY_TRIPLE_DOUBLE = 1
+PY_TRIPLE_SINGLE = 2
+CS_BLOCK_COMMENT = 1
+
+# 规则顺序即优先级：注释、字符串先于关键字和调用，避免字符串里的内容被染色
+PYTHON_GRAMMAR = Grammar("python", [
+    Rule(COMMENT, r'#.*'),
+    Region(STRING, r'"""', r'(?:[^"\\]|\\.|"(?!""))*"""', PY_TRIPLE_DOUBLE),
+    Region(STRING, r"'''", r"(?:[^'\\]|\\.|'(?!''))*'''", PY_TRIPLE_SINGLE),
+    Rule(STRING, r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\''),
+    Rule(None, r'\b(def)\s+(\w+)', captures=(KEYWORD, FUNCTION)),
+    Rule(None, r'\b(class)\s+(\w+)', captures=(KEYWORD, CLASS)),
+    Rule(KEYWORD, keyword_pattern(PYTHON_KEYWORDS)),
+    Rule(CALL, r'\b\w+(?=\()'),
+    # 普通标识符整体跳过，避免在长单词的每个位置重复尝试
+    Rule(None, r'\w+'),
+])
+
+CSHARP_GRAMMAR = Grammar("csharp", [
+    Rule(COMMENT, r'//.*'),
+    Region(COMMENT, r'/\*', r'(?:[^*]|\*(?!/))*\*/', CS_BLOCK_COMMENT),
+    Rule(STRING, r'@"(?:[^"]|"")*"|"(?:[^"\\]|\\.)*"'),
+    Rule(None, r'\b(class)\s+(\w+)', captures=(KEYWORD, CLASS)),
+    Rule(None, r'\b(void|int|string|bool)\s+(\w+)(?=\s*\()', captures=(KEYWORD, FUNCTION)),
+    Rule(KEYWORD, keyword_pattern(CSHARP_KEYWORDS)),
+    Rule(CALL, r'\b\w+(?=\()'),
+    Rule(None, r'\w+'),
+])
+
+# 进程内的语言注册表：每种语法只编译一次，所有高亮器共用同一份不可变规则表
+LANGUAGES = {}
+EXTENSIONS = {}
+
+
+def register_language(grammar, extensions):
+    LANGUAGES[grammar.name] = grammar
+    for ext in extensions:
+        EXTENSIONS[ext.lower()] = grammar.name
+
+
+def language_for_path(path):
+    """根据扩展名返回语言名，未知类型返回 None"""
+    if not path:
+        return None
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def get_grammar(name):
+    return LANGUAGES.get(name)
+
+
+register_language(PYTHON_GRAMMAR, ['.py', '.pyw'])
+register_language(CSHARP_GRAMMAR, ['.cs'])
+
+# 所有编辑器标签页共用的区间缓存
+SPAN_CACHE = SpanCache()
@@ -1,4 +1,4 @@
-import os, json, subprocess, traceback, re, sys
+import os, json, subprocess, traceback, re, sys, time
 from PySide6.QtWidgets import (
     QMainWindow, QTextEdit, QFileDialog, QPushButton, QVBoxLayout, QWidget, QTreeView,
     QFileSystemModel, QHBoxLayout, QSplitter, QMessageBox, QInputDialog, QMenu, 
@@ -6,14 +6,31 @@ from PySide6.QtWidgets import (
     QCheckBox, QComboBox, QSlider, QProgressBar, QLineEdit, QPlainTextEdit, QToolBar, QDialog, QDialogButtonBox, QApplication, QCompleter, QGroupBox, QTabWidget, QTabBar
 )
 from PySide6.QtCore import Qt, QDir, QSize, QThread, Signal, QPoint, QMimeData, QProcess, QTranslator, QEvent, QTimer, QRect
-from PySide6.QtGui import QFont, QAction, QKeySequence, QIcon, QDrag, QPainter, QColor, QCursor, QTextCursor, QTextFormat
+from PySide6.QtGui import QFont, QAction, QKeySequence, QIcon, QDrag, QPainter, QColor, QCursor, QTextCursor, QTextFormat, QTextOption
 from .filemanager import FileManager
-from .highlighter import PythonHighlighter, CSharpHighlighter
+from .highlighter import create_highlighter, HighlightScheduler, SemanticLayer
+from .lexer import language_for_path
+from .large_file import LargeFileView
+from .latency import LatencyHistogram
+from .gutter import digit_glyphs, marker_pixmap
+from .minimap import Minimap
+from .folding import FoldManager
+from .search_panel import SearchPanel
+from .completion import CompletionPopup, CompletionController, SymbolService
+from .quick_open import QuickOpenDialog
+from .csharp_project import CSharpProjectModel
+from .navigation import XrefService
+from .file_loader import FileLoader
+from .file_saver import SaveWriter
+from .recovery import RecoveryJournal
 from .dialogs import SettingsDialog, AboutDialog, HelpDialog
 from .lang_manager import LangManager
 import shutil
 import ctypes
 
+# 单独按下时不计入按键延迟的修饰键
+MODIFIER_KEYS = {Qt.Key_Shift, Qt.Key_Control, Qt.Key_Alt, Qt.Key_Meta, Qt.Key_AltGr, Qt.Key_CapsLock}
+
 class CodeRunnerThread(QThread):
     output_signal = Signal(str)
     error_signal = Signal(str)
@@ -246,66 +263,223 @@ class LineNumberArea(QWidget):
         self.codeEditor.lineNumberAreaPaintEvent(event)
 
     def mousePressEvent(self, event):
-        block_height = self.codeEditor.fontMetrics().height()
-        y = event.pos().y()
-        block_number = y // block_height + self.codeEditor.firstVisibleBlock().blockNumber()
-        line = block_number + 1
-        if line in self.codeEditor.breakpoints:
-            self.codeEditor.breakpoints.remove(line)
+        # 按位置取块，折行和隐藏的块也能对上行号
+        y = int(event.position().y())
+        number = self.codeEditor.cursorForPosition(QPoint(0, y)).blockNumber()
+        folding = self.codeEditor.folding
+        if folding and event.position().x() >= self.width() - self.codeEditor.marker_size() - 2:
+            folding.toggle(number)
         else:
-            self.codeEditor.breakpoints.add(line)
-        self.codeEditor.lineNumberArea.update()
+            self.codeEditor.toggle_breakpoint(number + 1)
 
 class CodeEditor(QPlainTextEdit):
+    longLineDetected = Signal(int)
+    definitionRequested = Signal(str)  # Ctrl+单击标识符
+    # 超过该长度的行视为超长行（压缩或生成的代码）
+    long_line_threshold = 10000
+    # 按键时间戳超过该秒数仍未等到重绘，视为该按键没有引起重绘
+    KEY_STAMP_MAX_AGE = 1.0
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.highlighter = None
+        self.folding = None
+        self.long_line_warned = False
+        # 打开文件时探测到的编码和换行符，保存时沿用
+        self.encoding = 'utf-8'
+        self.newline = '\n'
+        self.breakpoints = set()  # 断点所在行号（从 1 开始）
+        self.diagnostics = {}  # 行号（从 1 开始） -> "error" / "warning"
+        self.line_digits = 0  # 行号区宽度只在位数变化时重算
+        self.last_block_count = 1
+        # 按键到下一次重绘之间的延迟，由主窗口的事件过滤器打点
+        self.key_latency = None
+        self.pending_key_time = None
         self.lineNumberArea = LineNumberArea(self)
+        self.minimap = Minimap(self)
         self.blockCountChanged.connect(self.updateLineNumberAreaWidth)
         self.updateRequest.connect(self.updateLineNumberArea)
         self.cursorPositionChanged.connect(self.highlightCurrentLine)
+        self.document().contentsChange.connect(self.shift_markers)
         self.updateLineNumberAreaWidth(0)
         self.highlightCurrentLine()
-        # self.breakpoints = set()  # 断点集合，已去除
+
+    def marker_size(self):
+        return self.fontMetrics().height()
 
     def lineNumberAreaWidth(self):
-        digits = len(str(self.blockCount()))
-        space = 3 + self.fontMetrics().horizontalAdvance('9') * digits
-        return space
+        digits = max(2, len(str(self.blockCount())))
+        # 左侧断点/诊断标记列，右侧折叠标记列
+        return self.marker_size() * 2 + self.fontMetrics().horizontalAdvance('9') * digits + 6
 
     def updateLineNumberAreaWidth(self, _):
-        self.setViewportMargins(self.lineNumberAreaWidth(), 0, 0, 0)
+        digits = max(2, len(str(self.blockCount())))
+        if digits != self.line_digits:
+            self.line_digits = digits
+            self.setViewportMargins(self.lineNumberAreaWidth(), 0, self.minimap_width(), 0)
+            self.place_side_widgets()
 
     def updateLineNumberArea(self, rect, dy):
         if dy:
+            # 滚动时平移已绘制的内容，只重绘新露出的部分
             self.lineNumberArea.scroll(0, dy)
         else:
             self.lineNumberArea.update(0, rect.y(), self.lineNumberArea.width(), rect.height())
-        if rect.contains(self.viewport().rect()):
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.FontChange:
+            # 字号变化后字形缓存换用新的键，宽度需要重算
+            self.line_digits = 0
             self.updateLineNumberAreaWidth(0)
 
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
+    def toggle_breakpoint(self, line):
+        if line in self.breakpoints:
+            self.breakpoints.remove(line)
+        else:
+            self.breakpoints.add(line)
+        self.lineNumberArea.update()
+
+    def set_diagnostics(self, diagnostics):
+        """设置诊断标记 {行号: "error" / "warning"}"""
+        self.diagnostics = dict(diagnostics)
+        self.lineNumberArea.update()
+
+    def shift_markers(self, position, removed, added):
+        """插入或删除行后，移动其后的断点和诊断标记"""
+        delta = self.blockCount() - self.last_block_count
+        self.last_block_count = self.blockCount()
+        if not delta or not (self.breakpoints or self.diagnostics):
+            return
+        line = self.document().findBlock(position).blockNumber() + 1
+        def shifted(number):
+            if number <= line:
+                return number
+            # 被删除的行上的标记落到改动所在行
+            return max(line, number + delta)
+        self.breakpoints = {shifted(number) for number in self.breakpoints}
+        self.diagnostics = {shifted(number): kind for number, kind in self.diagnostics.items()}
+        self.lineNumberArea.update()
+
+    def minimap_width(self):
+        return self.minimap.width_hint() if self.minimap.isVisibleTo(self) else 0
+
+    def set_minimap_visible(self, visible):
+        self.minimap.setVisible(visible)
+        self.line_digits = 0
+        self.updateLineNumberAreaWidth(0)
+        self.place_side_widgets()
+
+    def place_side_widgets(self):
         cr = self.contentsRect()
         self.lineNumberArea.setGeometry(QRect(cr.left(), cr.top(), self.lineNumberAreaWidth(), cr.height()))
+        # 缩略图放在右侧视口边距里，位于文本和滚动条之间
+        vp = self.viewport().geometry()
+        self.minimap.setGeometry(QRect(vp.right() + 1, vp.top(), self.minimap_width(), vp.height()))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.place_side_widgets()
+
+    def mousePressEvent(self, event):
+        # Ctrl+单击跳转到定义
+        if event.button() == Qt.LeftButton and event.modifiers() & Qt.ControlModifier:
+            cursor = self.cursorForPosition(event.position().toPoint())
+            cursor.select(QTextCursor.WordUnderCursor)
+            word = cursor.selectedText()
+            if word.isidentifier():
+                self.setTextCursor(cursor)
+                self.definitionRequested.emit(word)
+                return
+        super().mousePressEvent(event)
 
     def lineNumberAreaPaintEvent(self, event):
         painter = QPainter(self.lineNumberArea)
-        painter.fillRect(event.rect(), QColor(245, 245, 245))
+        rect = event.rect()
+        painter.fillRect(rect, QColor(245, 245, 245))
+        dpr = self.lineNumberArea.devicePixelRatioF()
+        glyphs = digit_glyphs(self.font(), dpr, QColor(Qt.gray))
+        marker = self.marker_size()
+        fold_x = self.lineNumberArea.width() - marker - 2
+        right = fold_x - 2
+        has_markers = bool(self.breakpoints or self.diagnostics)
+        folding = self.folding
         block = self.firstVisibleBlock()
         blockNumber = block.blockNumber()
         top = int(self.blockBoundingGeometry(block).translated(self.contentOffset()).top())
-        bottom = top + int(self.blockBoundingRect(block).height())
-        while block.isValid() and top <= event.rect().bottom():
-            if block.isVisible() and bottom >= event.rect().top():
-                number = str(blockNumber + 1)
-                painter.setPen(Qt.gray)
-                painter.drawText(14, top, self.lineNumberArea.width() - 16, self.fontMetrics().height(),
-                                 Qt.AlignRight, number)
+        while block.isValid() and top <= rect.bottom():
+            height = int(self.blockBoundingRect(block).height()) if block.isVisible() else 0
+            if height and top + height >= rect.top():
+                line = blockNumber + 1
+                glyphs.draw_number(painter, right, top, line)
+                if has_markers:
+                    kind = "breakpoint" if line in self.breakpoints else self.diagnostics.get(line)
+                    if kind:
+                        painter.drawPixmap(0, top, marker_pixmap(kind, marker, dpr))
+                if folding and folding.index.is_header(blockNumber):
+                    kind = "folded" if blockNumber in folding.folded else "unfolded"
+                    painter.drawPixmap(fold_x, top, marker_pixmap(kind, marker, dpr))
             block = block.next()
-            top = bottom
-            bottom = top + int(self.blockBoundingRect(block).height())
+            top += height
             blockNumber += 1
 
+    def watch_long_lines(self, content=""):
+        """检查已加载内容中的超长行，并在之后的编辑中继续监视"""
+        if content:
+            match = re.search(r'[^\n]{%d}' % self.long_line_threshold, content)
+            if match:
+                self.on_long_line(content.count('\n', 0, match.start()))
+        self.document().contentsChange.connect(self.check_long_lines)
+
+    def check_long_lines(self, position, removed, added):
+        if self.long_line_warned:
+            return
+        # 只检查本次改动涉及的块
+        end = position + added
+        block = self.document().findBlock(position)
+        while block.isValid() and block.position() <= end:
+            if block.length() > self.long_line_threshold:
+                self.on_long_line(block.blockNumber())
+                return
+            block = block.next()
+
+    def on_long_line(self, block_number):
+        # 超长行按固定宽度任意位置折行，分段布局，省去逐词断行
+        self.long_line_warned = True
+        self.setWordWrapMode(QTextOption.WrapAnywhere)
+        self.longLineDetected.emit(block_number)
+
+    def toggle_fold(self):
+        if self.folding:
+            self.folding.toggle(self.textCursor().blockNumber())
+
+    def fold_all(self):
+        if self.folding:
+            self.folding.fold_all()
+
+    def unfold_all(self):
+        if self.folding:
+            self.folding.unfold_all()
+
+    def set_plain_mode(self):
+        """纯文本模式：卸下高亮器并清除已有格式"""
+        scheduler = getattr(self, 'highlight_scheduler', None)
+        if scheduler:
+            scheduler.stop()
+        if self.highlighter:
+            self.highlighter.setDocument(None)
+            self.highlighter = None
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.pending_key_time is not None:
+            elapsed = time.perf_counter() - self.pending_key_time
+            # 超过 KEY_STAMP_MAX_AGE 的时间戳来自没有引起重绘的按键（文档边缘的方向键、被其它控件处理的键），
+            # 这次重绘（如光标闪烁）与它无关，不记录
+            if self.key_latency is not None and elapsed <= self.KEY_STAMP_MAX_AGE:
+                self.key_latency.record(elapsed * 1000)
+            self.pending_key_time = None
+
     def highlightCurrentLine(self):
         extraSelections = []
         if not self.isReadOnly():
@@ -541,6 +715,11 @@ class MainWindow(QMainWindow):
         self.font_name = 'JetBrains Mono'
         self.font_size = 12
         self.scale_factor = 1.0
+        # 超过该字符数的文档改为先高亮可见区域、空闲时分片高亮其余部分
+        self.background_highlight_threshold = 200000
+        self.highlight_slice_ms = 8
+        # 超过该字节数的文件以内存映射的只读视图打开
+        self.large_file_threshold = 50 * 1024 * 1024
         base_dir = os.path.abspath(os.path.dirname(__file__))
         icon_dir = os.path.join(base_dir, "icons")
         self.left_menu = self.init_left_menu(icon_dir)
@@ -551,7 +730,11 @@ class MainWindow(QMainWindow):
         self.tab_widget.tabCloseRequested.connect(self.close_tab)
         self.tab_widget.currentChanged.connect(self.on_tab_changed)
         self.open_files = []  # 跟踪每个标签的文件路径
+        self.loaders = {}  # 正在后台加载的编辑器 -> FileLoader
+        self.saver = None  # 第一次保存时创建
+        self.recovery = RecoveryJournal(self.editor_path, self)
         self.current_file = None  # 新增：同步当前文件
+        self.key_latency = LatencyHistogram()  # 所有标签页共享的按键延迟统计
         self.add_new_tab()  # 此时还没有popup
 
         # 美化标签页关闭按钮
@@ -591,7 +774,19 @@ QTabBar::close-button::pressed {
         self.tab_widget.tabBar().tabCloseRequested.connect(lambda idx: set_close_icon(idx))
 
         self.terminal_widget = self.init_terminal()
+        self.search_panel = SearchPanel()
+        self.search_panel.openRequested.connect(self.open_location)
+        self.search_panel.hide()
+        self.symbol_service = SymbolService(self)
+        self.csharp_projects = CSharpProjectModel(self)
+        self.completion_popup = CompletionPopup(self)
+        self.completion_popup.hide()
+        self.completion = CompletionController(self.symbol_service, self.completion_popup, self)
+        self.quick_open = None
+        self.xref = XrefService(self)
         self.status_bar = self.statusBar()
+        self.init_latency_label()
+        self.init_load_indicator()
         self.log_file = os.path.join(os.path.abspath(os.path.dirname(__file__)), "error.log")
         self._skip_auto_indent = False
         self.init_layout()  # 只负责组装splitter
@@ -600,29 +795,103 @@ QTabBar::close-button::pressed {
         self.apply_theme_and_font()
         self.init_run_button(icon_dir)
         self.load_project()
+        self.restore_unsaved()
+        self.symbol_service.set_root(self.project_root())
+        self.csharp_projects.set_root(self.project_root())
+        self.xref.status.connect(lambda text: self.status_bar.showMessage(text, 3000))
+        self.xref.usagesFound.connect(self.show_usages)
+        self.xref.set_root(self.project_root())
         self.init_version_selector()
         self.init_debug_toolbar()
         self.debug_toolbar.hide()  # 初始化时隐藏调试工具栏
 
     def add_new_tab(self, file_path=None, content=""):
+        editor = self.create_editor()
+        if content:
+            editor.setPlainText(content)
+        self.attach_language_support(editor, file_path, len(content))
+        editor.watch_long_lines(content)
+        self.add_tab_widget(editor, file_path)
+        return editor
+
+    def create_editor(self):
         editor = CodeEditor()
         editor.setPlaceholderText("代码编辑区")
         editor.setTabStopDistance(4 * self.fontMetrics().horizontalAdvance(' '))
         editor.setStyleSheet("QTextEdit { background-color: #f9f9f9; }")
         editor.installEventFilter(self)
-        if content:
-            editor.setPlainText(content)
-        if file_path and file_path.endswith('.py'):
-            from .highlighter import PythonHighlighter
-            editor.highlighter = PythonHighlighter(editor.document(), dark_mode=("Dark" in self.theme))
-        elif file_path and file_path.endswith('.cs'):
-            from .highlighter import CSharpHighlighter
-            editor.highlighter = CSharpHighlighter(editor.document(), dark_mode=("Dark" in self.theme))
-        else:
-            editor.highlighter = None
+        editor.key_latency = self.key_latency
+        if not getattr(self, "show_minimap", True):
+            editor.set_minimap_visible(False)
+        editor.longLineDetected.connect(lambda number, e=editor: self.warn_long_line(e, number))
+        editor.definitionRequested.connect(self.go_to_definition)
+        self.recovery.watch(editor)
+        return editor
+
+    def editor_path(self, editor):
+        index = self.tab_widget.indexOf(editor)
+        return self.open_files[index] if 0 <= index < len(self.open_files) else None
+
+    def restore_unsaved(self):
+        """重放恢复日志，重新打开上次没有保存的标签页（同一文件已打开的干净副本关掉）"""
+        recovered = self.recovery.recover()
+        for journal_path, meta, text in recovered:
+            path = meta.get("path")
+            if path:
+                for index, opened in enumerate(self.open_files):
+                    if opened and os.path.abspath(opened) == os.path.abspath(path):
+                        self.close_tab(index)
+                        break
+            editor = self.add_new_tab(file_path=path, content=text)
+            editor.encoding = meta.get("encoding") or 'utf-8'
+            editor.newline = meta.get("newline") or '\n'
+            editor.document().setModified(True)
+            self.recovery.adopt(editor, journal_path)
+        if recovered:
+            self.status_bar.showMessage(f"已恢复 {len(recovered)} 个标签页中未保存的内容", 8000)
+
+    def attach_language_support(self, editor, file_path, length):
+        """按文件类型挂上高亮和折叠；length 为已载入的字符数，超过阈值时在后台分片高亮"""
+        editor.highlighter = create_highlighter(file_path, editor.document(), dark_mode=("Dark" in self.theme))
+        if editor.highlighter:
+            editor.highlight_scheduler = HighlightScheduler(editor, editor.highlighter, slice_ms=self.highlight_slice_ms)
+            if length > self.background_highlight_threshold:
+                editor.highlight_scheduler.start()
+            if language_for_path(file_path) == "python":
+                editor.semantic_layer = SemanticLayer(editor, editor.highlighter)
+        # C# 按花括号折叠，其余按缩进
+        editor.folding = FoldManager(editor, "brace" if language_for_path(file_path) == "csharp" else "indent")
+
+    def warn_long_line(self, editor, block_number):
+        """提示超长行，提供关闭自动换行或纯文本模式（非模态，不打断输入）"""
+        box = QMessageBox(self)
+        box.setWindowTitle("超长行")
+        box.setText(f"第 {block_number + 1} 行超过 {editor.long_line_threshold} 个字符，已分段显示并只高亮行首部分。\n"
+                    "可以关闭自动换行或切换到纯文本模式，让输入保持流畅。")
+        nowrap_btn = box.addButton("关闭自动换行", QMessageBox.ActionRole)
+        plain_btn = box.addButton("纯文本模式", QMessageBox.ActionRole)
+        box.addButton(QMessageBox.Close)
+        def on_clicked(button):
+            if button is nowrap_btn:
+                editor.setLineWrapMode(QPlainTextEdit.NoWrap)
+            elif button is plain_btn:
+                editor.set_plain_mode()
+        box.buttonClicked.connect(on_clicked)
+        box.setWindowModality(Qt.NonModal)
+        box.show()
+
+    def add_large_file_tab(self, file_path):
+        """大文件模式：内存映射、后台建立行索引、只绘制可见行，索引完成后基于片段表编辑"""
+        view = LargeFileView(file_path)
+        view.setFont(QFont(self.font_name, self.font_size))
+        self.add_tab_widget(view, file_path)
+        self.status_bar.showMessage(f"已以大文件模式打开 {os.path.basename(file_path)}，建立行索引后可编辑（Ctrl+G 跳转，Ctrl+F 查找）", 5000)
+        return view
+
+    def add_tab_widget(self, widget, file_path=None):
         tab_name = os.path.basename(file_path) if file_path else "未命名"
-        self.tab_widget.addTab(editor, tab_name)
-        self.tab_widget.setCurrentWidget(editor)
+        self.tab_widget.addTab(widget, tab_name)
+        self.tab_widget.setCurrentWidget(widget)
         if file_path:
             self.open_files.append(file_path)
         else:
@@ -630,7 +899,7 @@ QTabBar::close-button::pressed {
         self.current_file = file_path  # 新增：同步当前文件
         # 自定义关闭按钮
         tab_bar = self.tab_widget.tabBar()
-        idx = self.tab_widget.indexOf(editor)
+        idx = self.tab_widget.indexOf(widget)
         # 隐藏原生关闭按钮
         tab_bar.setTabButton(idx, QTabBar.RightSide, None)
         # 添加自定义QToolButton
@@ -662,6 +931,14 @@ QTabBar::close-button::pressed {
         # 不再自定义QToolButton关闭按钮，完全用QTabWidget自带的关闭按钮
 
     def close_tab(self, index):
+        widget = self.tab_widget.widget(index)
+        self.recovery.discard(widget)
+        loader = self.loaders.pop(widget, None)
+        if loader:
+            loader.cancel()
+            self.update_load_progress()
+        if hasattr(widget, "close_file"):
+            widget.close_file()
         self.tab_widget.removeTab(index)
         self.open_files.pop(index)
         if self.tab_widget.count() == 0:
@@ -689,12 +966,13 @@ QTabBar::close-button::pressed {
         path, _ = QFileDialog.getOpenFileName(self, "打开文件", "", "所有文件 (*.*)")
         if path:
             # 路径自动转换成长路径
-            path = self.get_long_path_name(path)
-            with open(path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            self.add_new_tab(file_path=path, content=content)
+            self.load_file(path)
 
     def save_file_action(self):
+        editor = self.current_editor()
+        if editor.isReadOnly():
+            self.status_bar.showMessage("当前标签页为只读，无法保存", 3000)
+            return
         index = self.tab_widget.currentIndex()
         file_path = self.open_files[index]
         if not file_path:
@@ -703,16 +981,165 @@ QTabBar::close-button::pressed {
                 return
             self.open_files[index] = file_path
             self.tab_widget.setTabText(index, os.path.basename(file_path))
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(self.current_editor().toPlainText())
-        QMessageBox.information(self, "保存成功", f"文件已保存到 {file_path}")
-
-    def load_file(self, path):
+        if hasattr(editor, "save_to"):
+            # 大文件按片段流式保存
+            try:
+                editor.save_to(file_path)
+            except OSError as e:
+                self.on_saved([], [(file_path, str(e))])
+            else:
+                self.on_saved([(None, file_path)], [])
+        else:
+            self.save_editors([(editor, file_path)])
+
+    def save_all_action(self):
+        """保存所有有改动且有路径的标签页，作为一批交给后台写盘"""
+        pairs = []
+        large = []
+        failures = []
+        for index, path in enumerate(self.open_files):
+            editor = self.tab_widget.widget(index)
+            if not path or editor in self.loaders:
+                continue
+            if isinstance(editor, CodeEditor) and editor.document().isModified():
+                pairs.append((editor, path))
+            elif isinstance(editor, LargeFileView) and editor.modified:
+                try:
+                    editor.save_to(path)  # 片段表流式保存
+                    large.append((None, path))
+                except OSError as e:
+                    failures.append((path, str(e)))
+        if pairs:
+            self.save_editors(pairs)
+        if large or failures:
+            # 在排队提示之后报告，大文件的失败不会被“正在保存”盖掉
+            self.on_saved(large, failures)
+        elif not pairs:
+            self.status_bar.showMessage("没有需要保存的文件", 3000)
+
+    def save_editors(self, pairs):
+        """在界面线程取文档快照，编码和原子写盘交给 SaveWriter"""
+        jobs = []
+        for editor, path in pairs:
+            document = editor.document()
+            # 标记带上快照时的版本号，写完后文档没有再改动才清除修改标志
+            jobs.append(((editor, document.revision()), path, document.toPlainText(), editor.encoding, editor.newline))
+        if self.saver is None:
+            self.saver = SaveWriter(self.file_manager, self)
+            self.saver.saved.connect(self.on_saved)
+        self.saver.enqueue(jobs)
+        self.status_bar.showMessage(f"正在保存 {os.path.basename(pairs[0][1])}…" if len(pairs) == 1
+                                    else f"正在保存 {len(pairs)} 个文件…")
+
+    def on_saved(self, written, failures):
+        for tag, path in written:
+            if tag:
+                editor, revision = tag
+                if self.tab_widget.indexOf(editor) >= 0 and editor.document().revision() == revision:
+                    editor.document().setModified(False)
+            self.search_panel.search.notify_changed(path)
+            self.symbol_service.notify_changed(path)
+            self.xref.notify_changed(path)
+        if failures:
+            path, error = failures[0]
+            more = f"（另有 {len(failures) - 1} 个文件失败）" if len(failures) > 1 else ""
+            self.status_bar.showMessage(f"保存 {path} 失败：{error}{more}", 8000)
+        elif len(written) == 1:
+            self.status_bar.showMessage(f"已保存 {written[0][1]}", 3000)
+        elif written:
+            self.status_bar.showMessage(f"已保存 {len(written)} 个文件", 3000)
+
+    def load_file(self, path, line=0):
+        """打开文件并跳到第 line 行（从 0 开始）
+
+        普通文件在后台线程探测编码、分块解码，文本陆续追加到只读的编辑器中，
+        载入完成后再挂上高亮和折叠、恢复可编辑；状态栏显示进度，可以取消。
+        """
         # 路径自动转换成长路径
         path = self.get_long_path_name(path)
-        with open(path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        self.add_new_tab(file_path=path, content=content)
+        try:
+            size = os.path.getsize(path)
+        except OSError as e:
+            # 文件已被删除、改名或没有权限：与后台载入失败一样只在状态栏提示，不打开标签页
+            self.status_bar.showMessage(f"打开失败：{e}", 5000)
+            return
+        if size >= self.large_file_threshold:
+            view = self.add_large_file_tab(path)
+            if line:
+                view.goto_line(line + 1)
+            return
+        editor = self.create_editor()
+        editor.setReadOnly(True)
+        editor.document().setUndoRedoEnabled(False)  # 载入过程不进撤销栈
+        editor.watch_long_lines()
+        self.add_tab_widget(editor, path)
+        loader = FileLoader(path, self)
+        loader.chunk.connect(lambda text, e=editor: self.append_loaded_text(e, text))
+        loader.progress.connect(self.update_load_progress)
+        loader.restarted.connect(lambda encoding, e=editor: e.document().clear())
+        loader.loaded.connect(lambda encoding, newline, e=editor: self.finish_loading(e, encoding, newline, line))
+        loader.failed.connect(lambda error, e=editor: self.abort_loading(e, f"打开失败：{error}"))
+        loader.finished.connect(loader.deleteLater)
+        self.loaders[editor] = loader
+        loader.start()
+        self.update_load_progress()
+
+    def append_loaded_text(self, editor, text):
+        loader = self.loaders.get(editor)
+        if loader is None:
+            return  # 已取消或标签页已关闭
+        cursor = QTextCursor(editor.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        loader.consumed()
+
+    def finish_loading(self, editor, encoding, newline, line):
+        if self.loaders.pop(editor, None) is None:
+            return
+        self.update_load_progress()
+        editor.encoding = encoding
+        editor.newline = newline
+        document = editor.document()
+        document.setUndoRedoEnabled(True)
+        document.setModified(False)
+        editor.setReadOnly(False)
+        index = self.tab_widget.indexOf(editor)
+        self.attach_language_support(editor, self.open_files[index], document.characterCount())
+        if line:
+            self.goto_block(editor, line)
+
+    def abort_loading(self, editor, message):
+        index = self.tab_widget.indexOf(editor)
+        if index >= 0:
+            self.close_tab(index)
+        self.status_bar.showMessage(message, 5000)
+
+    def cancel_loading(self):
+        for editor in list(self.loaders):
+            self.abort_loading(editor, "已取消打开文件")
+
+    def init_load_indicator(self):
+        """状态栏上的文件载入进度和取消按钮，只在有文件正在载入时显示"""
+        self.load_progress = QProgressBar()
+        self.load_progress.setRange(0, 1000)
+        self.load_progress.setMaximumWidth(220)
+        self.load_cancel_btn = QToolButton()
+        self.load_cancel_btn.setText("取消")
+        self.load_cancel_btn.clicked.connect(self.cancel_loading)
+        self.status_bar.addPermanentWidget(self.load_progress)
+        self.status_bar.addPermanentWidget(self.load_cancel_btn)
+        self.load_progress.hide()
+        self.load_cancel_btn.hide()
+
+    def update_load_progress(self):
+        loaders = list(self.loaders.values())
+        self.load_progress.setVisible(bool(loaders))
+        self.load_cancel_btn.setVisible(bool(loaders))
+        if loaders:
+            total = sum(loader.total for loader in loaders)
+            done = sum(loader.done for loader in loaders)
+            self.load_progress.setValue(done * 1000 // total if total else 0)
+            self.load_progress.setFormat(f"正在打开 {len(loaders)} 个文件 %p%")
 
     def get_installed_python_versions(self):
         """获取本机已安装的 Python 版本列表"""
@@ -812,6 +1239,15 @@ QTabBar::close-button::pressed {
     def closeEvent(self, event):
         """确保关闭窗口时保存项目配置"""
         self.save_project()
+        self.completion.shutdown()
+        self.symbol_service.flush()  # 写完还没保存的符号索引
+        self.xref.shutdown()
+        if self.saver:
+            self.saver.stop()  # 等已提交的保存写完
+        self.recovery.flush_all()  # 未保存的内容留在日志里，下次启动时恢复
+        for loader in list(self.loaders.values()):
+            loader.cancel()
+            loader.wait()
         if hasattr(self, 'process') and self.process.state() == QProcess.Running:
             self.process.kill()  # 立即终止进程
         event.accept()
@@ -862,13 +1298,15 @@ QTabBar::close-button::pressed {
         self.updateGeometry()
 
         # 主题切换后同步高亮器配色
+        self.sync_highlighters()
+
+    def sync_highlighters(self):
+        """按当前主题同步所有标签页的高亮配色；配色未变时不做任何重绘"""
         for i in range(self.tab_widget.count()):
             editor = self.tab_widget.widget(i)
             highlighter = getattr(editor, 'highlighter', None)
             if highlighter and hasattr(highlighter, 'set_dark_mode'):
                 highlighter.set_dark_mode("Dark" in self.theme)
-        if hasattr(self, 'highlighter') and self.highlighter and hasattr(self.highlighter, 'set_dark_mode'):
-            self.highlighter.set_dark_mode("Dark" in self.theme)
 
     def insert_completion(self, text):
         """插入选中的补全项到编辑器"""
@@ -878,61 +1316,118 @@ QTabBar::close-button::pressed {
         self.current_editor().setTextCursor(cursor)
 
     def eventFilter(self, obj, event):
-        # 防止 tab_widget 已被销毁时报错
-        if not hasattr(self, "tab_widget") or self.tab_widget is None:
-            return False
-        if obj == self.current_editor() and event.type() == QEvent.KeyPress:
-            key = event.key()
-            # --- 智能 Tab 逻辑 ---
-            if key == Qt.Key_Tab:
-                # 获取光标前的内容
-                cursor = self.current_editor().textCursor()
-                pos = cursor.position()
-                doc_text = self.current_editor().toPlainText()
-                if pos > 0:
-                    prev_char = doc_text[pos - 1]
-                    if prev_char.isalpha():  # 是字母
-                        if self.completion_popup and self.completion_popup.isVisible():
-                            self.completion_popup.insert_completion()
-                        return True
-                    elif prev_char.isspace():  # 是空格
-                        cursor.insertText(" " * 4)
-                        return True
-                else:
-                    cursor.insertText(" " * 4)
+        # 每次按键只处理光标所在的块，不取整篇文本，开销与文档大小无关
+        if event.type() != QEvent.KeyPress or not isinstance(obj, CodeEditor):
+            return super().eventFilter(obj, event)
+        editor = obj
+        key = event.key()
+        if key not in MODIFIER_KEYS:
+            now = time.perf_counter()
+            # 只记重绘前的第一次按键；已过期的时间戳直接换成这次的
+            if editor.pending_key_time is None or now - editor.pending_key_time > editor.KEY_STAMP_MAX_AGE:
+                editor.pending_key_time = now
+        popup = getattr(self, "completion_popup", None)
+        if popup and popup.isVisible():
+            if key in (Qt.Key_Up, Qt.Key_Down):
+                popup.move_selection(-1 if key == Qt.Key_Up else 1)
+                return True
+            if key == Qt.Key_Escape:
+                self.completion.cancel()
+                return True
+            if key in (Qt.Key_Return, Qt.Key_Enter):
+                self.accept_completion()
+                return True
+        # --- 智能 Tab 逻辑 ---
+        if key == Qt.Key_Tab:
+            cursor = editor.textCursor()
+            pos_in_block = cursor.positionInBlock()
+            if pos_in_block > 0:
+                prev_char = cursor.block().text()[pos_in_block - 1]
+                if prev_char.isalpha():  # 是字母
+                    if popup and popup.isVisible():
+                        self.accept_completion()
                     return True
-            elif key == Qt.Key_Backspace:
-                # Backspace：智能删除缩进
-                cursor = self.current_editor().textCursor()
-                block_text = cursor.block().text()
-                pos_in_block = cursor.position() - cursor.block().position()
-                if pos_in_block >= 4 and block_text[pos_in_block - 4:pos_in_block] == " " * 4:
-                    cursor.movePosition(cursor.Left, cursor.KeepAnchor, 4)
-                    cursor.removeSelectedText()
+                elif prev_char.isspace():  # 是空格
+                    cursor.insertText(" " * 4)
                     return True
-
-            # Enter 自动缩进
-            elif key in (Qt.Key_Return, Qt.Key_Enter):
-                cursor = self.current_editor().textCursor()
-                current_line = cursor.block().text()
-                leading_spaces = len(current_line) - len(current_line.lstrip())
-                indent = " " * leading_spaces
-                if current_line.rstrip().endswith(":"):
-                    indent += " " * 4
-                cursor.insertText("\n" + indent)
+            else:
+                cursor.insertText(" " * 4)
+                return True
+        elif key == Qt.Key_Backspace:
+            # Backspace：智能删除缩进
+            cursor = editor.textCursor()
+            pos_in_block = cursor.positionInBlock()
+            if (not cursor.hasSelection() and pos_in_block >= 4
+                    and cursor.block().text()[pos_in_block - 4:pos_in_block] == " " * 4):
+                cursor.movePosition(QTextCursor.Left, QTextCursor.KeepAnchor, 4)
+                cursor.removeSelectedText()
                 return True
 
-            # 动态显示补全框
-            text = event.text()
-            if text.isalnum():  # 输入的是字母或数字
-                cursor = self.current_editor().textCursor()
-                block_text = cursor.block().text()
-                pos_in_block = cursor.position() - cursor.block().position()
-                current_prefix = block_text[:pos_in_block].split()[-1] if block_text.strip() else ""
-            elif key in (Qt.Key_Escape, Qt.Key_Return):
-                pass
+        # Enter 自动缩进
+        elif key in (Qt.Key_Return, Qt.Key_Enter):
+            cursor = editor.textCursor()
+            current_line = cursor.block().text()
+            leading_spaces = len(current_line) - len(current_line.lstrip())
+            indent = " " * leading_spaces
+            if current_line.rstrip().endswith(":"):
+                indent += " " * 4
+            cursor.insertText("\n" + indent)
+            return True
+
+        # 动态显示补全框：防抖后在后台线程查找排序，补全框随输入原地更新
+        text = event.text()
+        if text.isalnum() or text == "_":  # 输入的是标识符字符
+            self.completion.request(editor)
+        elif key == Qt.Key_Backspace and popup and popup.isVisible():
+            self.completion.request(editor)
+        elif popup and popup.isVisible() and key not in MODIFIER_KEYS:
+            self.completion.cancel()
         return super().eventFilter(obj, event)
 
+    def accept_completion(self):
+        text = self.completion_popup.insert_completion()
+        if text:
+            self.insert_completion(text)
+        self.completion.cancel()
+
+    def toggle_minimap(self, checked):
+        self.show_minimap = checked
+        for i in range(self.tab_widget.count()):
+            editor = self.tab_widget.widget(i)
+            if isinstance(editor, CodeEditor):
+                editor.set_minimap_visible(checked)
+
+    def init_latency_label(self):
+        """状态栏上的按键延迟分位数，每秒刷新一次，默认隐藏"""
+        self.latency_label = QLabel()
+        self.latency_label.hide()
+        self.status_bar.addPermanentWidget(self.latency_label)
+        self.latency_timer = QTimer(self)
+        self.latency_timer.setInterval(1000)
+        self.latency_timer.timeout.connect(self.update_latency_label)
+
+    def toggle_latency_label(self, checked):
+        self.latency_label.setVisible(checked)
+        if checked:
+            self.update_latency_label()
+            self.latency_timer.start()
+        else:
+            self.latency_timer.stop()
+
+    def update_latency_label(self):
+        stats = self.key_latency.summary()
+        self.latency_label.setText(f"按键延迟 p50 {stats['p50_ms']:.1f} ms  p95 {stats['p95_ms']:.1f} ms  "
+                                   f"p99 {stats['p99_ms']:.1f} ms  ({stats['count']})")
+
+    def save_latency_stats(self):
+        path, _ = QFileDialog.getSaveFileName(self, "保存按键延迟统计", "keystroke_latency.json", "JSON (*.json)")
+        if path:
+            try:
+                self.key_latency.dump(path)
+                self.status_bar.showMessage(f"按键延迟统计已保存到 {path}", 3000)
+            except OSError as e:
+                QMessageBox.critical(self, "错误", f"无法保存文件：{e}")
+
     def apply_language(self):
         """应用语言到整个界面"""
         self.retranslate_ui()
@@ -961,7 +1456,8 @@ QTabBar::close-button::pressed {
                     btn.setToolTip(value)
 
         # 编辑器占位符
-        self.current_editor().setPlaceholderText(t("Code Editor Area"))
+        if hasattr(self.current_editor(), "setPlaceholderText"):
+            self.current_editor().setPlaceholderText(t("Code Editor Area"))
 
         # 终端输入提示
         self.terminal_input.setPlaceholderText(t("Type a command and press Enter"))
@@ -1029,8 +1525,7 @@ QTabBar::close-button::pressed {
         file_path = self.current_file
         QMessageBox.information(self, "C#调试提示", "请在需要断点的地方插入System.Diagnostics.Debugger.Break();\n然后点击继续运行。\n如需源码级调试，请用VS或vsdbg。")
         # 启动dotnet run
-        project_dir = os.path.dirname(file_path)
-        csproj_path = next((os.path.join(project_dir, f) for f in os.listdir(project_dir) if f.endswith('.csproj')), None)
+        csproj_path = self.csharp_projects.project_for(file_path)
         if csproj_path:
             # 路径自动转换成长路径
             csproj_path = self.get_long_path_name(csproj_path)
@@ -1133,8 +1628,9 @@ QTabBar::close-button::pressed {
         # 右侧：编辑器 + 终端（垂直分割）
         right_splitter = QSplitter(Qt.Vertical)
         right_splitter.addWidget(self.tab_widget)
+        right_splitter.addWidget(self.search_panel)
         right_splitter.addWidget(self.terminal_widget)
-        right_splitter.setSizes([400, 120])
+        right_splitter.setSizes([400, 160, 120])
 
         # 主分割
         main_splitter = QSplitter(Qt.Horizontal)
@@ -1152,6 +1648,9 @@ QTabBar::close-button::pressed {
         self.tree.setRootIndex(self.model.index(QDir.currentPath()))
         self.tree.setContextMenuPolicy(Qt.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.show_tree_context_menu)
+        self.file_manager = FileManager(self.model)
+        self.search_panel.file_manager = self.file_manager
+        self.search_panel.document_provider = self.open_documents
 
     def show_tree_context_menu(self, point):
         """显示文件树右键菜单"""
@@ -1184,6 +1683,11 @@ QTabBar::close-button::pressed {
             new_path = os.path.join(os.path.dirname(file_path), new_name)
             try:
                 os.rename(file_path, new_path)
+                self.search_panel.search.notify_removed(file_path)
+                self.search_panel.search.notify_changed(new_path)
+                self.symbol_service.notify_changed(new_path)
+                self.xref.notify_removed(file_path)
+                self.xref.notify_changed(new_path)
                 self.model.refresh()
             except Exception as e:
                 QMessageBox.warning(self, "Error", f"Rename failed: {e}")
@@ -1222,6 +1726,8 @@ QTabBar::close-button::pressed {
                     os.remove(path)
                 elif os.path.isdir(path):
                     os.rmdir(path)
+                self.search_panel.search.notify_removed(path)
+                self.xref.notify_removed(path)
                 self.model.refresh()
             except Exception as e:
                 QMessageBox.warning(self, "Error", f"Delete failed: {e}")
@@ -1414,6 +1920,7 @@ QTabBar::close-button::pressed {
             self.setStyleSheet(qss)
         else:
             apply_theme_and_font(self, theme_file=theme_file)
+        self.sync_highlighters()
         # 强制刷新界面
         self.update()
 
@@ -1448,6 +1955,9 @@ QTabBar::close-button::pressed {
 
     def run_code(self):
         """运行代码"""
+        if isinstance(self.current_editor(), LargeFileView):
+            QMessageBox.warning(self, self.tr("Error"), self.tr("大文件只读模式下无法运行！"))
+            return
         code = self.current_editor().toPlainText()
         if not code.strip():
             QMessageBox.warning(self, self.tr("Error"), self.tr("代码为空，无法运行！"))
@@ -1495,8 +2005,7 @@ QTabBar::close-button::pressed {
                 self.execute_command(command)
             elif self.current_file and self.current_file.endswith('.cs'):
                 dotnet_version = self.dotnet_version_combo.currentText()
-                project_dir = os.path.dirname(self.current_file)
-                csproj_path = next((os.path.join(project_dir, f) for f in os.listdir(project_dir) if f.endswith('.csproj')), None)
+                csproj_path = self.csharp_projects.project_for(self.current_file)
                 if csproj_path:
                     # 路径自动转换成长路径并规范化
                     csproj_path = self.get_long_path_name(csproj_path)
@@ -1541,34 +2050,69 @@ QTabBar::close-button::pressed {
         open_folder_action = QAction(t("Open Folder"), self)
         open_folder_action.triggered.connect(self.open_folder_action)
         save_action = QAction(t("Save"), self)
+        save_action.setShortcut(QKeySequence("Ctrl+S"))
         save_action.triggered.connect(self.save_file_action)
+        save_all_action = QAction(t("Save All"), self)
+        save_all_action.setShortcut(QKeySequence("Ctrl+Alt+S"))
+        save_all_action.triggered.connect(self.save_all_action)
         exit_action = QAction(t("Exit"), self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(new_action)
         file_menu.addAction(open_action)
         file_menu.addAction(open_folder_action)
         file_menu.addAction(save_action)
+        file_menu.addAction(save_all_action)
         file_menu.addSeparator()
         file_menu.addAction(exit_action)
 
         # 编辑菜单
         edit_menu = QMenu(t("Edit"), self)
         undo_action = QAction(t("Undo"), self)
-        undo_action.triggered.connect(self.current_editor().undo)
+        undo_action.triggered.connect(lambda: self.editor_action("undo"))
         redo_action = QAction(t("Redo"), self)
-        redo_action.triggered.connect(self.current_editor().redo)
+        redo_action.triggered.connect(lambda: self.editor_action("redo"))
         cut_action = QAction(t("Cut"), self)
-        cut_action.triggered.connect(self.current_editor().cut)
+        cut_action.triggered.connect(lambda: self.editor_action("cut"))
         copy_action = QAction(t("Copy"), self)
-        copy_action.triggered.connect(self.current_editor().copy)
+        copy_action.triggered.connect(lambda: self.editor_action("copy"))
         paste_action = QAction(t("Paste"), self)
-        paste_action.triggered.connect(self.current_editor().paste)
+        paste_action.triggered.connect(lambda: self.editor_action("paste"))
         edit_menu.addAction(undo_action)
         edit_menu.addAction(redo_action)
         edit_menu.addSeparator()
         edit_menu.addAction(cut_action)
         edit_menu.addAction(copy_action)
         edit_menu.addAction(paste_action)
+        toggle_fold_action = QAction(t("Toggle Fold"), self)
+        toggle_fold_action.setShortcut(QKeySequence("Ctrl+Shift+["))
+        toggle_fold_action.triggered.connect(lambda: self.editor_action("toggle_fold"))
+        fold_all_action = QAction(t("Fold All"), self)
+        fold_all_action.setShortcut(QKeySequence("Ctrl+K, Ctrl+0"))
+        fold_all_action.triggered.connect(lambda: self.editor_action("fold_all"))
+        unfold_all_action = QAction(t("Unfold All"), self)
+        unfold_all_action.setShortcut(QKeySequence("Ctrl+K, Ctrl+J"))
+        unfold_all_action.triggered.connect(lambda: self.editor_action("unfold_all"))
+        find_in_files_action = QAction(t("Find in Files"), self)
+        find_in_files_action.setShortcut(QKeySequence("Ctrl+Shift+F"))
+        find_in_files_action.triggered.connect(self.show_search_panel)
+        quick_open_action = QAction(t("Go to File"), self)
+        quick_open_action.setShortcut(QKeySequence("Ctrl+P"))
+        quick_open_action.triggered.connect(self.show_quick_open)
+        definition_action = QAction(t("Go to Definition"), self)
+        definition_action.setShortcut(QKeySequence("F12"))
+        definition_action.triggered.connect(lambda: self.go_to_definition())
+        usages_action = QAction(t("Find Usages"), self)
+        usages_action.setShortcut(QKeySequence("Shift+F12"))
+        usages_action.triggered.connect(lambda: self.find_usages())
+        edit_menu.addSeparator()
+        edit_menu.addAction(find_in_files_action)
+        edit_menu.addAction(quick_open_action)
+        edit_menu.addAction(definition_action)
+        edit_menu.addAction(usages_action)
+        edit_menu.addSeparator()
+        edit_menu.addAction(toggle_fold_action)
+        edit_menu.addAction(fold_all_action)
+        edit_menu.addAction(unfold_all_action)
 
         # 调试菜单
         debug_menu = QMenu(t("Debug"), self)
@@ -1584,6 +2128,20 @@ QTabBar::close-button::pressed {
         language_action = QAction(t("Switch Language"), self)
         language_action.triggered.connect(self.toggle_language)
         settings_menu.addAction(language_action)
+        latency_action = QAction(t("Show Keystroke Latency"), self)
+        latency_action.setCheckable(True)
+        latency_action.setChecked(self.latency_label.isVisible() if hasattr(self, "latency_label") else False)
+        latency_action.toggled.connect(self.toggle_latency_label)
+        save_latency_action = QAction(t("Save Keystroke Latency"), self)
+        save_latency_action.triggered.connect(self.save_latency_stats)
+        minimap_action = QAction(t("Show Minimap"), self)
+        minimap_action.setCheckable(True)
+        minimap_action.setChecked(getattr(self, "show_minimap", True))
+        minimap_action.toggled.connect(self.toggle_minimap)
+        settings_menu.addAction(minimap_action)
+        settings_menu.addSeparator()
+        settings_menu.addAction(latency_action)
+        settings_menu.addAction(save_latency_action)
 
         # 帮助菜单
         help_menu = QMenu(t("Help"), self)
@@ -1598,6 +2156,108 @@ QTabBar::close-button::pressed {
         menu_bar.addMenu(settings_menu)
         menu_bar.addMenu(help_menu)
 
+    def project_root(self):
+        """项目树当前显示的根目录"""
+        return self.model.filePath(self.tree.rootIndex()) or QDir.currentPath()
+
+    def show_search_panel(self):
+        self.search_panel.set_root(self.project_root())
+        self.search_panel.show()
+        editor = self.current_editor()
+        selected = editor.textCursor().selectedText() if isinstance(editor, CodeEditor) else ""
+        self.search_panel.focus_input(selected if "\u2029" not in selected else "")
+
+    def show_quick_open(self):
+        if self.quick_open is None:
+            self.quick_open = QuickOpenDialog(self)
+            self.quick_open.openRequested.connect(lambda path: self.open_location(path, 0))
+        self.quick_open.show_for(self.project_root())
+
+    def word_under_cursor(self):
+        editor = self.current_editor()
+        if not isinstance(editor, CodeEditor):
+            return ""
+        cursor = editor.textCursor()
+        cursor.select(QTextCursor.WordUnderCursor)
+        return cursor.selectedText()
+
+    def go_to_definition(self, name=None):
+        """跳到名字的定义处；有多处定义时优先当前文件，否则在查找面板中列出"""
+        name = name or self.word_under_cursor()
+        if not name:
+            return
+        locations = self.xref.definitions(name)
+        if not locations:
+            self.status_bar.showMessage(f"未找到 {name} 的定义", 3000)
+            return
+        index = self.tab_widget.currentIndex()
+        current = self.open_files[index] if 0 <= index < len(self.open_files) else None
+        local = [loc for loc in locations if current and loc[0] == os.path.abspath(current)]
+        if len(locations) == 1 or len(local) == 1:
+            path, line, kind, container = (local or locations)[0]
+            self.open_location(path, line)
+            return
+        self.search_panel.set_root(self.xref.root)
+        self.search_panel.show()
+        matches = [(os.path.relpath(path, self.xref.root), line, 0, len(name), f"{kind} {container}.{name}" if container else f"{kind} {name}")
+                   for path, line, kind, container in locations]
+        self.search_panel.show_locations(f"{name}：{len(locations)} 处定义", matches)
+
+    def find_usages(self, name=None):
+        name = name or self.word_under_cursor()
+        if not name:
+            return
+        self.xref.find_usages(name)
+
+    def show_usages(self, name, usages):
+        self.search_panel.set_root(self.xref.root)
+        self.search_panel.show()
+        files = len({relpath for relpath, *_ in usages})
+        self.search_panel.show_locations(f"{name}：{len(usages)} 处引用，{files} 个文件", usages)
+
+    def open_documents(self):
+        """已打开且有路径、已加载完的代码编辑器 {路径: QTextDocument}
+
+        还在后台加载的标签页文档是空的或只有一部分，不能代替磁盘上的文件。
+        """
+        documents = {}
+        for index, path in enumerate(self.open_files):
+            editor = self.tab_widget.widget(index)
+            if path and isinstance(editor, CodeEditor) and editor not in self.loaders:
+                documents[path] = editor.document()
+        return documents
+
+    def open_location(self, path, line):
+        """打开文件（已打开则切换过去）并跳到指定行（从 0 开始）"""
+        path = os.path.abspath(path)
+        for index, opened in enumerate(self.open_files):
+            if opened and os.path.abspath(opened) == path:
+                self.tab_widget.setCurrentIndex(index)
+                break
+        else:
+            self.load_file(path, line)  # 载入完成后再跳转
+            return
+        editor = self.current_editor()
+        if isinstance(editor, LargeFileView):
+            editor.goto_line(line + 1)
+        elif isinstance(editor, CodeEditor):
+            self.goto_block(editor, line)
+
+    def goto_block(self, editor, line):
+        block = editor.document().findBlockByNumber(line)
+        if block.isValid():
+            cursor = editor.textCursor()
+            cursor.setPosition(block.position())
+            editor.setTextCursor(cursor)
+            editor.centerCursor()
+        editor.setFocus()
+
+    def editor_action(self, name):
+        """把编辑菜单的操作转发给当前标签页，只读视图不支持的操作直接忽略"""
+        action = getattr(self.current_editor(), name, None)
+        if action:
+            action()
+
     def init_debug_toolbar(self):
         """初始化播放器式调试控制栏"""
         self.debug_toolbar = QToolBar("Debug Toolbar", self)
@@ -1710,6 +2370,11 @@ QTabBar::close-button::pressed {
         folder = QFileDialog.getExistingDirectory(self, "选择文件夹")
         if folder:
             self.tree.setRootIndex(self.model.index(folder))
+            if self.search_panel.isVisible():
+                self.search_panel.set_root(folder)
+            self.symbol_service.set_root(folder)
+            self.csharp_projects.set_root(folder)
+            self.xref.set_root(folder)
 
     def show_about_dialog(self):
         QMessageBox.about(self, "关于", "PySharp Code\n版本 1.0\n作者: Your Name")
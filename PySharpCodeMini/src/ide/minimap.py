@@ -0,0 +1,176 @@
+from collections import OrderedDict
+import re
+from PySide6.QtWidgets import QWidget
+from PySide6.QtCore import Qt, QRect
+from PySide6.QtGui import QPainter, QColor, QImage
+from .lexer import iter_spans
+
+NON_SPACE = re.compile(r'\S+')
+
+
+class Minimap(QWidget):
+    """编辑器右侧的缩略图
+
+    文档按每 TILE_LINES 行切成图块分别渲染并缓存，编辑时只丢弃 contentsChange 涉及的图块；
+    颜色直接取高亮器保存在块上的词法结果，不重新分词。缓存的图块数有上限，每个标签页的内存有界。
+    后台高亮只重排版不触发 contentsChange，所以排版更新后按块上的词法结果核对一遍可见图块。
+    """
+    TILE_LINES = 64
+    LINE_PIXELS = 2      # 每行在缩略图中的高度
+    MAX_COLUMNS = 120    # 每行最多绘制的字符数（1 字符 = 1 像素宽）
+    MAX_TILES = 48
+
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
+        self.document = editor.document()
+        self.tiles = OrderedDict()  # 图块编号 -> [QImage, 词法结果标记, 核对时的排版代数]，按最近使用排序
+        self.layout_generation = 0  # 每次排版更新加一，图块绘制前据此决定是否核对
+        self.palette_generation = None
+        self.block_count = self.document.blockCount()
+        self.dragging = False
+        self.setCursor(Qt.PointingHandCursor)
+        self.document.contentsChange.connect(self.on_contents_change)
+        self.document.documentLayout().update.connect(self.on_layout_update)
+        editor.verticalScrollBar().valueChanged.connect(self.update)
+
+    def width_hint(self):
+        return self.MAX_COLUMNS + 8
+
+    # --- 缓存维护 ---
+    def on_contents_change(self, position, removed, added):
+        first = self.document.findBlock(position).blockNumber() // self.TILE_LINES
+        if self.document.blockCount() != self.block_count:
+            # 行数变了，之后的图块全部错位
+            self.block_count = self.document.blockCount()
+            for tile in [tile for tile in self.tiles if tile >= first]:
+                del self.tiles[tile]
+        else:
+            end = min(position + added, self.document.characterCount() - 1)
+            last = self.document.findBlock(end).blockNumber() // self.TILE_LINES
+            for tile in range(first, last + 1):
+                self.tiles.pop(tile, None)
+        self.update()
+
+    def on_layout_update(self, *args):
+        self.layout_generation += 1
+        self.update()
+
+    def stamp(self, index):
+        """图块内各块词法结果的标识；相同文本的分词结果来自共享缓存，对象不变"""
+        block = self.document.findBlockByNumber(index * self.TILE_LINES)
+        ids = []
+        for _ in range(self.TILE_LINES):
+            if not block.isValid():
+                break
+            ids.append(id(getattr(block.userData(), 'spans', None)))
+            block = block.next()
+        return hash(tuple(ids))
+
+    def check_palette(self):
+        """换配色后颜色全部失效"""
+        highlighter = self.editor.highlighter
+        generation = (id(highlighter), highlighter.palette_generation if highlighter else 0)
+        if generation != self.palette_generation:
+            self.palette_generation = generation
+            self.tiles.clear()
+
+    def token_colors(self):
+        highlighter = self.editor.highlighter
+        if not highlighter:
+            return {}
+        return {token: fmt.foreground().color() for token, fmt in highlighter.formats.items()}
+
+    def tile(self, index):
+        entry = self.tiles.get(index)
+        if entry is not None and entry[2] != self.layout_generation:
+            stamp = self.stamp(index)
+            entry = entry if stamp == entry[1] else None
+            if entry is not None:
+                entry[2] = self.layout_generation
+        if entry is None:
+            entry = [self.render_tile(index), self.stamp(index), self.layout_generation]
+            self.tiles[index] = entry
+            while len(self.tiles) > self.MAX_TILES:
+                self.tiles.popitem(last=False)
+        else:
+            self.tiles.move_to_end(index)
+        return entry[0]
+
+    def render_tile(self, index):
+        image = QImage(self.MAX_COLUMNS, self.TILE_LINES * self.LINE_PIXELS, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        default = QColor(self.editor.palette().text().color())
+        default.setAlpha(110)
+        colors = self.token_colors()
+        line_height = max(1, self.LINE_PIXELS - 1)
+        block = self.document.findBlockByNumber(index * self.TILE_LINES)
+        for row in range(self.TILE_LINES):
+            if not block.isValid():
+                break
+            y = row * self.LINE_PIXELS
+            text = block.text()[:self.MAX_COLUMNS].expandtabs(4)[:self.MAX_COLUMNS]
+            for m in NON_SPACE.finditer(text):
+                painter.fillRect(m.start(), y, m.end() - m.start(), line_height, default)
+            data = block.userData()
+            spans = getattr(data, 'spans', None)
+            if spans is not None and colors and '\t' not in text:
+                for start, length, token in iter_spans(spans):
+                    if start >= self.MAX_COLUMNS:
+                        break
+                    color = colors.get(token)
+                    if color is not None:
+                        painter.fillRect(start, y, min(length, self.MAX_COLUMNS - start), line_height, color)
+            block = block.next()
+        painter.end()
+        return image
+
+    # --- 绘制 ---
+    def scroll_offset(self):
+        """缩略图顶端对应的像素偏移：文档比控件高时跟随编辑器按比例滚动"""
+        total = self.document.blockCount() * self.LINE_PIXELS
+        if total <= self.height():
+            return 0
+        bar = self.editor.verticalScrollBar()
+        if bar.maximum() <= 0:
+            return 0
+        return int((total - self.height()) * bar.value() / bar.maximum())
+
+    def paintEvent(self, event):
+        self.check_palette()
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), self.editor.palette().base())
+        offset = self.scroll_offset()
+        tile_height = self.TILE_LINES * self.LINE_PIXELS
+        first = (offset + event.rect().top()) // tile_height
+        last = (offset + event.rect().bottom()) // tile_height
+        tiles = (self.document.blockCount() + self.TILE_LINES - 1) // self.TILE_LINES
+        for index in range(first, min(last + 1, tiles)):
+            painter.drawImage(4, index * tile_height - offset, self.tile(index))
+        # 当前可见区域
+        first_line = self.editor.firstVisibleBlock().blockNumber()
+        rows = max(1, self.editor.viewport().height() // max(1, self.editor.fontMetrics().height()))
+        slider = QRect(0, first_line * self.LINE_PIXELS - offset, self.width(), rows * self.LINE_PIXELS)
+        painter.fillRect(slider, QColor(120, 120, 120, 40))
+
+    # --- 导航 ---
+    def scroll_to(self, y):
+        line = (y + self.scroll_offset()) // self.LINE_PIXELS
+        rows = max(1, self.editor.viewport().height() // max(1, self.editor.fontMetrics().height()))
+        self.editor.verticalScrollBar().setValue(max(0, line - rows // 2))
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.dragging = True
+            self.scroll_to(int(event.position().y()))
+
+    def mouseMoveEvent(self, event):
+        if self.dragging:
+            self.scroll_to(int(event.position().y()))
+
+    def mouseReleaseEvent(self, event):
+        self.dragging = False
+
+    def wheelEvent(self, event):
+        self.editor.wheelEvent(event)
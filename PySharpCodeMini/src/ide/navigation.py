@@ -0,0 +1,188 @@
+import hashlib
+import os
+import queue
+from PySide6.QtCore import QObject, QThread, Signal
+from .search_index import walk_project, project_relpath
+from .symbols import SOURCE_EXTENSIONS
+from .xref import XrefDatabase, index_xref_files, usage_lines
+from .workers import process_pool, FutureWatcher
+
+CACHE_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), "cache", "xref")
+
+
+def database_path_for(root):
+    digest = hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, digest, "xref.sqlite3")
+
+
+class XrefWriter(QThread):
+    """后台线程：持有数据库唯一的写连接
+
+    启动后先读出已索引文件的状态并扫描项目目录，之后按队列顺序写入解析结果，
+    每批一个事务，界面线程不碰写锁。
+    """
+    scanned = Signal(object, object)  # ({相对路径: (mtime_ns, 大小, 哈希)}, {相对路径: (mtime_ns, 大小)})
+
+    def __init__(self, root, path, parent=None):
+        super().__init__(parent)
+        self.root = root
+        self.path = path
+        self.tasks = queue.Queue()
+
+    def enqueue(self, kind, payload):
+        self.tasks.put((kind, payload))
+
+    def stop(self):
+        self.tasks.put(None)
+        self.wait()
+
+    def run(self):
+        database = XrefDatabase(self.path)
+        try:
+            scanned = {relpath: stat for relpath, stat in walk_project(self.root).items()
+                       if relpath.lower().endswith(SOURCE_EXTENSIONS)}
+            self.scanned.emit(database.file_states(), scanned)
+            while True:
+                task = self.tasks.get()
+                if task is None:
+                    break
+                kind, payload = task
+                if kind == "store":
+                    database.store(payload)
+                elif kind == "remove":
+                    database.remove(payload)
+        finally:
+            database.close()
+
+
+class XrefService(QObject):
+    """跳转到定义和查找引用
+
+    解析在进程池中进行，结果由 XrefWriter 线程写入 SQLite；启动时只把 mtime 或大小变了的文件交给进程池，
+    进程池里再按内容哈希判断，内容没变的文件不重新解析。查询在界面线程用单独的只读连接完成，
+    查找引用时各处所在的行由进程池读出，结果经 usagesFound 发出。
+    """
+    status = Signal(str)
+    usagesFound = Signal(str, object)  # (名字, [(相对路径, 行号从 0 开始, 列, 长度, 行文本)])
+    BATCH = 200  # 每个后台任务解析的文件数
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = None
+        self.writer = None
+        self.reader = None
+        self.ready = False
+        self.generation = 0  # 切换根目录时加一，丢弃旧目录的后台结果
+        self.pending = 0
+        self.watcher = FutureWatcher(self)
+        self.watcher.finished.connect(self.on_finished)
+        self.watcher.failed.connect(self.on_failed)
+        self.usage_query = 0  # 每次查找引用加一，只发出最新一次的结果
+        self.usage_watcher = FutureWatcher(self)
+        self.usage_watcher.finished.connect(self.on_usages)
+        self.usage_watcher.failed.connect(self.on_usages_failed)
+
+    def set_root(self, root):
+        root = os.path.abspath(root)
+        if root == self.root:
+            return
+        self.shutdown()
+        self.generation += 1
+        self.root = root
+        self.ready = False
+        self.pending = 0
+        self.writer = XrefWriter(root, database_path_for(root), self)
+        self.writer.scanned.connect(self.on_scanned)
+        self.writer.start()
+
+    def shutdown(self):
+        if self.writer and self.writer.isRunning():
+            self.writer.stop()
+        if self.reader:
+            self.reader.close()
+            self.reader = None
+
+    def on_scanned(self, states, scanned):
+        if self.sender() is not self.writer:
+            return
+        self.reader = XrefDatabase(self.writer.path)
+        self.ready = True
+        removed = [relpath for relpath in states if relpath not in scanned]
+        if removed:
+            self.writer.enqueue("remove", removed)
+        changed = [(relpath, mtime, size, states.get(relpath, (None, None, None))[2])
+                   for relpath, (mtime, size) in scanned.items()
+                   if states.get(relpath, (None, None))[:2] != (mtime, size)]
+        for start in range(0, len(changed), self.BATCH):
+            self.submit(changed[start:start + self.BATCH])
+        if changed:
+            self.status.emit(f"正在建立引用索引（{len(changed)} 个文件）…")
+
+    def submit(self, entries):
+        self.pending += 1
+        future = process_pool().submit(index_xref_files, self.root, entries)
+        self.watcher.watch(future, self.generation)
+
+    def on_finished(self, generation, results):
+        if generation != self.generation:
+            return
+        self.pending -= 1
+        self.writer.enqueue("store", results)
+        if not self.pending:
+            self.status.emit("引用索引已就绪")
+
+    def on_failed(self, generation, error):
+        if generation == self.generation:
+            self.pending -= 1
+            self.status.emit(f"建立引用索引失败：{error}")
+
+    # --- 文件改动通知 ---
+    def relpath(self, path):
+        if not self.root:
+            return None
+        return project_relpath(path, self.root)
+
+    def notify_changed(self, path):
+        relpath = self.relpath(path)
+        if not (self.ready and relpath and relpath.lower().endswith(SOURCE_EXTENSIONS)):
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        self.submit([(relpath, st.st_mtime_ns, st.st_size, None)])
+
+    def notify_removed(self, path):
+        relpath = self.relpath(path)
+        if self.ready and relpath:
+            self.writer.enqueue("remove", [relpath])
+
+    # --- 查询 ---
+    def definitions(self, name):
+        """[(绝对路径, 行号从 0 开始, 类别, 所属类名)]；同时有真正的定义时不列出 import 处"""
+        if not self.reader:
+            return []
+        rows = self.reader.definitions(name)
+        if any(kind != "import" for _, _, kind, _ in rows):
+            rows = [row for row in rows if row[2] != "import"]
+        return [(os.path.join(self.root, relpath), line - 1, kind, container) for relpath, line, kind, container in rows]
+
+    def find_usages(self, name, limit=5000):
+        """查找引用：位置从数据库中查出，读文件取行文本交给进程池，界面线程不读文件"""
+        self.usage_query += 1
+        usages = self.reader.usages(name, limit) if self.reader else []
+        if not usages:
+            self.usagesFound.emit(name, [])
+            return
+        future = process_pool().submit(usage_lines, self.root, name, usages)
+        self.usage_watcher.watch(future, (self.generation, self.usage_query, name))
+
+    def on_usages(self, tag, usages):
+        generation, query, name = tag
+        if generation == self.generation and query == self.usage_query:
+            self.usagesFound.emit(name, usages)
+
+    def on_usages_failed(self, tag, error):
+        generation, query, name = tag
+        if generation == self.generation and query == self.usage_query:
+            self.status.emit(f"查找 {name} 的引用失败：{error}")
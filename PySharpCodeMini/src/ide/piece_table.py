@@ -0,0 +1,248 @@
+import os
+import re
+import shutil
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+
+# 该模块不依赖 Qt
+
+ORIGINAL = 0  # 片段来自内存映射的原文件
+ADDED = 1     # 片段来自追加缓冲区
+
+NEWLINE = re.compile(rb'\n')
+
+
+class PieceTable:
+    """片段表：原文件保持内存映射只读，新输入的内容只追加到附加缓冲区，
+    文档由若干 (缓冲区, 起点, 长度) 片段依次拼接，插入和删除只拆分片段，不移动正文。
+
+    所有偏移都是编码后的字节偏移。两个缓冲区各有一份行起始偏移（与 MappedFile.offsets 相同的约定），
+    片段内的换行数和第 k 个换行都能二分查找得到，定位行的开销与文件大小无关。
+    原文件的行索引必须已经建立完毕（mapped.indexed 为 True）。
+    """
+    MAX_LINE_BYTES = 64 * 1024
+    CHUNK = 1024 * 1024
+    # 正则查找时相邻块之间保留的重叠字节数，跨越更长距离的匹配可能找不到
+    REGEX_OVERLAP = 4096
+
+    def __init__(self, mapped):
+        self.mapped = mapped
+        self.encoding = mapped.encoding
+        self.added = bytearray()
+        self.added_starts = array('Q', [0])
+        self.pieces = [(ORIGINAL, 0, mapped.size)] if mapped.size else []
+        self.revision = 0
+        self.rebuild()
+
+    def close(self):
+        self.mapped.close()
+
+    # --- 片段索引 ---
+    def buffer(self, source):
+        return self.mapped.mm if source == ORIGINAL else self.added
+
+    def starts(self, source):
+        return self.mapped.offsets if source == ORIGINAL else self.added_starts
+
+    def newlines_in(self, source, start, end):
+        """缓冲区 [start, end) 内的换行数"""
+        starts = self.starts(source)
+        return bisect_right(starts, end) - bisect_right(starts, start)
+
+    def rebuild(self):
+        """重新计算每个片段在文档中的起始偏移和累计换行数，开销只与片段数有关"""
+        self.piece_offsets = []
+        self.piece_lines = []  # 截止到该片段末尾（含）的换行数
+        offset = 0
+        lines = 0
+        for source, start, length in self.pieces:
+            self.piece_offsets.append(offset)
+            offset += length
+            lines += self.newlines_in(source, start, start + length)
+            self.piece_lines.append(lines)
+        self.total = offset
+        self.revision += 1
+
+    def locate(self, offset):
+        """返回包含 offset 的片段下标，offset 等于文档长度时返回片段数"""
+        if offset >= self.total:
+            return len(self.pieces)
+        return bisect_right(self.piece_offsets, offset) - 1
+
+    # --- 编辑 ---
+    def insert(self, offset, text):
+        data = text.encode(self.encoding)
+        if not data:
+            return
+        offset = max(0, min(offset, self.total))
+        base = len(self.added)
+        self.added.extend(data)
+        self.added_starts.extend([base + m.end() for m in NEWLINE.finditer(data)])
+        index = self.locate(offset)
+        within = offset - self.piece_offsets[index] if index < len(self.pieces) else 0
+        if within == 0 and index > 0:
+            # 连续输入时直接延长上一个追加片段，避免片段数随按键增长
+            source, start, length = self.pieces[index - 1]
+            if source == ADDED and start + length == base:
+                self.pieces[index - 1] = (ADDED, start, length + len(data))
+                self.rebuild()
+                return
+        piece = (ADDED, base, len(data))
+        if within == 0:
+            self.pieces.insert(index, piece)
+        else:
+            source, start, length = self.pieces[index]
+            self.pieces[index:index + 1] = [
+                (source, start, within), piece, (source, start + within, length - within)]
+        self.rebuild()
+
+    def delete(self, offset, length):
+        offset = max(0, offset)
+        end = min(self.total, offset + length)
+        if end <= offset:
+            return
+        first = self.locate(offset)
+        last = self.locate(end - 1)
+        replacement = []
+        source, start, size = self.pieces[first]
+        head = offset - self.piece_offsets[first]
+        if head:
+            replacement.append((source, start, head))
+        source, start, size = self.pieces[last]
+        tail = self.piece_offsets[last] + size - end
+        if tail:
+            replacement.append((source, start + size - tail, tail))
+        self.pieces[first:last + 1] = replacement
+        self.rebuild()
+
+    # --- 读取 ---
+    def length(self):
+        return self.total
+
+    def line_count(self):
+        return (self.piece_lines[-1] if self.pieces else 0) + 1
+
+    def line_start(self, number):
+        if number <= 0:
+            return 0
+        # 第 number 个换行所在的片段
+        index = bisect_left(self.piece_lines, number)
+        if index >= len(self.pieces):
+            return self.total
+        source, start, length = self.pieces[index]
+        before = self.piece_lines[index - 1] if index else 0
+        starts = self.starts(source)
+        first = bisect_right(starts, start)
+        return self.piece_offsets[index] + starts[first + number - before - 1] - start
+
+    def line_bounds(self, number):
+        start = self.line_start(number)
+        end = self.line_start(number + 1) - 1 if number + 1 < self.line_count() else self.total
+        return start, end
+
+    def break_offset(self, number):
+        """第 number 行行尾换行符（LF 或 CRLF）的起始偏移，退格合并到上一行时从这里删除"""
+        start, end = self.line_bounds(number)
+        if end > start and self.read(end - 1, end) == b'\r':
+            return end - 1
+        return end
+
+    def line_of_offset(self, offset):
+        index = self.locate(offset)
+        if index >= len(self.pieces):
+            return self.line_count() - 1
+        source, start, length = self.pieces[index]
+        before = self.piece_lines[index - 1] if index else 0
+        return before + self.newlines_in(source, start, start + offset - self.piece_offsets[index])
+
+    def read(self, start, end):
+        """读取文档 [start, end) 的字节"""
+        start = max(0, start)
+        parts = []
+        index = self.locate(start)
+        while index < len(self.pieces) and start < end:
+            source, piece_start, length = self.pieces[index]
+            within = start - self.piece_offsets[index]
+            take = min(length - within, end - start)
+            parts.append(bytes(self.buffer(source)[piece_start + within:piece_start + within + take]))
+            start += take
+            index += 1
+        return b''.join(parts)
+
+    def line(self, number):
+        start, end = self.line_bounds(number)
+        end = min(end, start + self.MAX_LINE_BYTES)
+        return self.read(start, end).decode(self.encoding, errors='replace').rstrip('\r')
+
+    def chunks(self, start=0):
+        """按片段顺序产出字节块（每块不超过 CHUNK），保存和查找都不需要拼出整篇文本"""
+        index = self.locate(start)
+        while index < len(self.pieces):
+            source, piece_start, length = self.pieces[index]
+            within = max(0, start - self.piece_offsets[index])
+            data = self.buffer(source)
+            for pos in range(piece_start + within, piece_start + length, self.CHUNK):
+                yield data[pos:min(pos + self.CHUNK, piece_start + length)]
+            index += 1
+
+    def search(self, pattern, start=0, regex=False):
+        """从 start 开始逐块查找，返回 (起始偏移, 结束偏移)，找不到返回 None"""
+        needle = pattern.encode(self.encoding)
+        compiled = re.compile(needle if regex else re.escape(needle))
+        overlap = self.REGEX_OVERLAP if regex else max(0, len(needle) - 1)
+        carry = b''
+        base = start
+        for chunk in self.chunks(start):
+            window = carry + bytes(chunk)
+            m = compiled.search(window)
+            if m:
+                return base + m.start(), base + m.end()
+            keep = min(overlap, len(window))
+            carry = window[len(window) - keep:]
+            base += len(window) - keep
+        return None
+
+    # --- 保存 ---
+    def save(self, path):
+        """把片段流式写入同目录的临时文件，落盘后替换目标文件，再以新文件作为原文件重新映射
+
+        写入时顺带记录行起始偏移，保存后不需要重新建立行索引。
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(prefix='.pysharp-', suffix='.tmp', dir=directory)
+        offsets = array('Q', [0])
+        written = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in self.chunks():
+                    f.write(chunk)
+                    offsets.extend([written + m.end() for m in NEWLINE.finditer(chunk)])
+                    written += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(path):
+                shutil.copymode(path, temp_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        # Windows 下被映射的文件不能被替换，先释放映射
+        old = self.mapped
+        old.close()
+        try:
+            os.replace(temp_path, path)
+        except OSError:
+            os.remove(temp_path)
+            self.mapped = self.reopen(old.path, old.offsets)
+            raise
+        self.mapped = self.reopen(path, offsets)
+        self.added = bytearray()
+        self.added_starts = array('Q', [0])
+        self.pieces = [(ORIGINAL, 0, self.mapped.size)] if self.mapped.size else []
+        self.rebuild()
+
+    def reopen(self, path, offsets):
+        mapped = type(self.mapped)(path, self.encoding)
+        mapped.offsets = offsets
+        mapped.indexed = True
+        return mapped
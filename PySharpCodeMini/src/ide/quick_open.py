@@ -0,0 +1,97 @@
+import os
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QLineEdit, QListWidget, QListWidgetItem, QLabel
+from PySide6.QtCore import Qt, QThread, Signal
+from .search_index import walk_project
+from .fuzzy import FuzzyMatcher
+
+
+class FileScanner(QThread):
+    """后台线程：扫描项目文件并建立模糊匹配器"""
+    scanned = Signal(str, object)  # (根目录, FuzzyMatcher)
+
+    def __init__(self, root, parent=None):
+        super().__init__(parent)
+        self.root = root
+
+    def run(self):
+        self.scanned.emit(self.root, FuzzyMatcher(walk_project(self.root)))
+
+
+class QuickOpenDialog(QDialog):
+    """按文件名模糊查找并打开项目文件（Ctrl+P）
+
+    每次打开时在后台重新扫描目录，扫描完成前沿用上一次的结果；
+    输入时直接在界面线程匹配，10 万个路径也在一帧之内。
+    """
+    openRequested = Signal(str)
+    MAX_RESULTS = 50
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("转到文件")
+        self.resize(560, 420)
+        self.root = None
+        self.matcher = None
+        self.scanner = None
+        layout = QVBoxLayout(self)
+        self.input = QLineEdit()
+        self.input.setPlaceholderText("输入文件名，支持缩写，如 mw → mainwindow.py")
+        self.input.textChanged.connect(self.update_results)
+        self.input.returnPressed.connect(self.open_current)
+        self.input.installEventFilter(self)
+        layout.addWidget(self.input)
+        self.results = QListWidget()
+        self.results.itemActivated.connect(self.open_current)
+        layout.addWidget(self.results)
+        self.status = QLabel()
+        layout.addWidget(self.status)
+
+    def show_for(self, root):
+        root = os.path.abspath(root)
+        if root != self.root:
+            self.root = root
+            self.matcher = None
+        if not (self.scanner and self.scanner.isRunning()):
+            self.scanner = FileScanner(root, self)
+            self.scanner.scanned.connect(self.on_scanned)
+            self.scanner.start()
+        self.status.setText("正在扫描文件…" if self.matcher is None else "")
+        self.input.selectAll()
+        self.input.setFocus()
+        self.update_results()
+        self.show()
+        self.raise_()
+        self.activateWindow()
+
+    def on_scanned(self, root, matcher):
+        if root != self.root:
+            return
+        self.matcher = matcher
+        self.status.setText(f"{len(matcher)} 个文件")
+        self.update_results()
+
+    def update_results(self):
+        self.results.clear()
+        query = self.input.text().strip()
+        if not self.matcher or not query:
+            return
+        for score, relpath in self.matcher.match(query, self.MAX_RESULTS):
+            item = QListWidgetItem(os.path.basename(relpath) + "    " + os.path.dirname(relpath))
+            item.setData(Qt.UserRole, relpath)
+            self.results.addItem(item)
+        self.results.setCurrentRow(0)
+
+    def eventFilter(self, obj, event):
+        # 在输入框中用上下键移动结果选择
+        if obj is self.input and event.type() == event.Type.KeyPress and event.key() in (Qt.Key_Up, Qt.Key_Down):
+            if self.results.count():
+                step = -1 if event.key() == Qt.Key_Up else 1
+                self.results.setCurrentRow((self.results.currentRow() + step) % self.results.count())
+            return True
+        return super().eventFilter(obj, event)
+
+    def open_current(self, *args):
+        item = self.results.currentItem()
+        if item:
+            self.openRequested.emit(os.path.join(self.root, item.data(Qt.UserRole)))
+            self.accept()
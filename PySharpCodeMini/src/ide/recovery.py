@@ -0,0 +1,145 @@
+import itertools
+import os
+from PySide6.QtCore import QObject, QTimer
+from PySide6.QtGui import QTextCursor
+from .journal import JournalFile, read_journal, process_alive, journal_pid
+
+CACHE_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), "cache", "journal")
+
+
+class RecoveryJournal(QObject):
+    """未保存内容的崩溃恢复日志
+
+    文档第一次变成“已修改”时写一份快照，之后把 contentsChange 记成编辑追加到该标签页的日志，
+    FLUSH_MS 内的编辑合并后一次写盘；日志过长时换成新快照。保存（文档回到未修改）或关闭标签页时删除日志，
+    正常退出时保留，下次启动时重放，恢复所有未保存的标签页。
+
+    日志文件名以进程号开头，同时运行的多个实例共用 CACHE_DIR：启动时只接管进程已经不在的日志，
+    接管时先改名为本进程的文件名，两个实例同时启动也不会恢复同一份日志。
+    """
+    FLUSH_MS = 1000
+
+    def __init__(self, path_for, parent=None):
+        super().__init__(parent)
+        self.path_for = path_for  # 编辑器 -> 文件路径或 None，由主窗口提供
+        self.journals = {}    # 编辑器 -> JournalFile，只有存在未保存改动的文档才有
+        self.revisions = {}   # 编辑器 -> 最近一次记录时的 document.revision()
+        self.scheduled = set()
+        self.counter = itertools.count()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.FLUSH_MS)
+        self.timer.timeout.connect(self.flush_all)
+
+    def watch(self, editor):
+        document = editor.document()
+        document.contentsChange.connect(
+            lambda position, removed, added, e=editor: self.on_contents_change(e, position, removed, added))
+        document.modificationChanged.connect(
+            lambda modified, e=editor: self.schedule(e) if modified else self.discard(e))
+
+    def schedule(self, editor):
+        # 等本次改动的信号都处理完再取快照，快照里已包含这次改动
+        if editor not in self.scheduled and editor not in self.journals:
+            self.scheduled.add(editor)
+            QTimer.singleShot(0, lambda e=editor: self.start(e))
+
+    def new_journal_path(self):
+        return os.path.join(CACHE_DIR, f"{os.getpid()}-{next(self.counter)}.journal")
+
+    def start(self, editor):
+        if editor not in self.scheduled:
+            return  # 期间已保存或关闭
+        self.scheduled.discard(editor)
+        document = editor.document()
+        if editor in self.journals or editor.isReadOnly() or not document.isModified():
+            return
+        journal = JournalFile(self.new_journal_path())
+        try:
+            journal.write_snapshot(self.meta_for(editor), document.toPlainText())
+        except OSError:
+            return
+        self.journals[editor] = journal
+        self.revisions[editor] = document.revision()
+
+    def meta_for(self, editor):
+        return {"path": self.path_for(editor), "encoding": editor.encoding, "newline": editor.newline}
+
+    def on_contents_change(self, editor, position, removed, added):
+        if editor.isReadOnly():
+            return  # 正在载入
+        journal = self.journals.get(editor)
+        document = editor.document()
+        if journal is None:
+            if document.isModified():
+                self.schedule(editor)
+            return
+        revision = document.revision()
+        if removed == added and revision == self.revisions.get(editor):
+            return  # 高亮只改格式，文本没变
+        self.revisions[editor] = revision
+        text = ""
+        if added:
+            cursor = QTextCursor(document)
+            cursor.setPosition(position)
+            # 改动碰到文档末尾时（全选后粘贴）Qt 报告的长度把末尾的段落分隔符也算上，多 1；
+            # 越界的 setPosition 会被忽略，这次插入就被记成了纯删除。多报的删除长度重放时按切片截断，无妨
+            cursor.setPosition(min(position + added, document.characterCount() - 1), QTextCursor.KeepAnchor)
+            text = cursor.selectedText().replace('\u2029', '\n')
+        journal.add_edit(position, removed, text)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush_all(self):
+        for editor, journal in list(self.journals.items()):
+            try:
+                journal.flush()
+                if journal.needs_compaction():
+                    journal.write_snapshot(self.meta_for(editor), editor.document().toPlainText())
+            except OSError:
+                pass
+
+    def discard(self, editor):
+        self.scheduled.discard(editor)
+        self.revisions.pop(editor, None)
+        journal = self.journals.pop(editor, None)
+        if journal:
+            journal.discard()
+
+    def recover(self):
+        """接管已退出的实例留下的日志，返回 [(日志路径, 元数据, 文本)]，按写入时间排序
+
+        正在运行的实例（包括本进程）的日志不读也不动。
+        """
+        try:
+            names = [name for name in os.listdir(CACHE_DIR) if name.endswith('.journal')]
+        except OSError:
+            return []
+        claimed = []
+        for name in names:
+            pid = journal_pid(name)
+            if pid is not None and process_alive(pid):
+                continue
+            path = self.new_journal_path()
+            try:
+                # 改名是原子的，同时启动的另一个实例抢先接管时这里失败，跳过
+                os.rename(os.path.join(CACHE_DIR, name), path)
+                claimed.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        recovered = []
+        for _, path in sorted(claimed):
+            result = read_journal(path)
+            if result is not None:
+                recovered.append((path,) + result)
+        return recovered
+
+    def adopt(self, editor, old_path):
+        """恢复出的标签页立即写自己的日志，然后删除旧日志"""
+        self.scheduled.add(editor)
+        self.start(editor)
+        if editor in self.journals:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
@@ -0,0 +1,438 @@
+import os
+import pickle
+import re
+import unicodedata
+from array import array
+
+from .encoding import read_exact
+
+# 该模块不依赖 Qt，建分片和校验匹配都在后台进程中运行
+
+SKIP_DIRS = {'.git', '.hg', '.svn', '.vs', '.idea', '__pycache__', 'node_modules', 'bin', 'obj',
+             '.venv', 'venv', '.mypy_cache', '.pytest_cache'}
+MAX_FILE_SIZE = 4 * 1024 * 1024  # 更大的文件不建索引也不搜索
+SHARD_SIZE = 1000                 # 每个分片最多包含的文件数
+MAX_MATCHES_PER_FILE = 200
+
+_TRIGRAM = re.compile(rb'(?=(...))', re.S)
+
+
+def walk_project(root):
+    """遍历项目目录，返回 {相对路径: (mtime_ns, 大小)}"""
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.')]
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if st.st_size <= MAX_FILE_SIZE:
+                files[os.path.relpath(path, root)] = (st.st_mtime_ns, st.st_size)
+    return files
+
+
+def project_relpath(path, root):
+    """path 相对于项目根目录 root 的路径；不在项目内（含 Windows 上位于其它驱动器）时返回 None"""
+    try:
+        relpath = os.path.relpath(os.path.abspath(path), root)
+    except ValueError:
+        return None
+    if relpath == os.pardir or relpath.startswith(os.pardir + os.sep):
+        return None
+    return relpath
+
+
+def file_trigrams(data):
+    """文件内容（按 ASCII 转小写）中出现过的所有三字节组，编码为整数"""
+    grams = set(_TRIGRAM.findall(data.lower()))
+    return sorted(int.from_bytes(g, 'big') for g in grams)
+
+
+def build_shard(root, entries, path):
+    """后台进程入口：为一批文件建倒排表并写入 path
+
+    entries 为 [(相对路径, mtime_ns, 大小)]；二进制文件（前 8KB 含 NUL）跳过。
+    返回 {"files": [(相对路径, mtime_ns, 大小)], "postings": {三字节组: array('H') 本分片内的文件序号}}。
+    """
+    files = []
+    postings = {}
+    for relpath, mtime, size in entries:
+        try:
+            with open(os.path.join(root, relpath), 'rb') as f:
+                data = f.read()
+        except OSError:
+            continue
+        if b'\0' in data[:8192]:
+            continue
+        local = len(files)
+        files.append((relpath, mtime, size))
+        for gram in file_trigrams(data):
+            ids = postings.get(gram)
+            if ids is None:
+                ids = postings[gram] = array('H')
+            ids.append(local)
+    shard = {"files": files, "postings": postings}
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        pickle.dump(shard, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp, path)
+    return shard
+
+
+_SIMPLE_ESCAPES = {'a': '\a', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+_HEX_DIGITS = {'x': 2, 'u': 4, 'U': 8}
+_OCTAL = re.compile(r'0[0-7]{0,2}|[0-7]{3}')
+_BACKREF = re.compile(r'[1-9][0-9]?')
+
+
+def _escape_char(pattern, i):
+    """解析 pattern[i] 处的转义，返回 (代表的字面字符或 None, 下一个位置)
+
+    \\x41、\\u4e2d、\\N{...}、八进制和 \\n 等按 re 的规则解码成一个字符；
+    \\w、\\d、\\b 这类字符类或断言、分组反向引用以及无法解析的转义返回 None，字面量片段在此断开。
+    """
+    nxt = pattern[i + 1]
+    i += 2
+    if not nxt.isalnum():
+        return nxt, i
+    if nxt in _SIMPLE_ESCAPES:
+        return _SIMPLE_ESCAPES[nxt], i
+    if nxt in _HEX_DIGITS:
+        digits = pattern[i:i + _HEX_DIGITS[nxt]]
+        try:
+            return chr(int(digits, 16)), i + len(digits)
+        except ValueError:
+            return None, i
+    if nxt == 'N' and pattern.startswith('{', i):
+        end = pattern.find('}', i)
+        if end < 0:
+            return None, i
+        try:
+            return unicodedata.lookup(pattern[i + 1:end]), end + 1
+        except KeyError:
+            return None, end + 1
+    m = _OCTAL.match(pattern, i - 1)
+    if m:
+        return chr(int(m.group(), 8)), m.end()
+    m = _BACKREF.match(pattern, i - 1)
+    if m:
+        return None, m.end()
+    return None, i
+
+
+def _literal_runs(pattern):
+    """从正则中取出一定会出现在匹配里的字面量片段；有顶层 '|' 时返回 []"""
+    runs = []
+    current = []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\' and i + 1 < len(pattern):
+            ch, i = _escape_char(pattern, i)
+        elif ch in '*?{':
+            # 前一个字符可以不出现
+            if depth == 0 and current:
+                current.pop()
+            i += 1
+            if ch == '{':
+                while i < len(pattern) and pattern[i] != '}':
+                    i += 1
+                i += 1
+            ch = None
+        elif ch == '+':
+            i += 1
+            ch = None
+        elif ch == '(':
+            depth += 1
+            i += 1
+            ch = None
+        elif ch == ')':
+            depth = max(0, depth - 1)
+            i += 1
+            ch = None
+        elif ch == '[':
+            i += 1
+            if i < len(pattern) and pattern[i] == ']':
+                i += 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            i += 1
+            ch = None
+        elif ch == '|':
+            if depth == 0:
+                return []
+            i += 1
+            ch = None
+        elif ch in '.^$':
+            i += 1
+            ch = None
+        else:
+            i += 1
+        if ch is not None and depth == 0:
+            current.append(ch)
+        else:
+            if current:
+                runs.append(''.join(current))
+            current = []
+    if current:
+        runs.append(''.join(current))
+    return runs
+
+
+def required_trigrams(pattern, regex=False, ignore_case=True):
+    """查询一定包含的三字节组集合，给不出约束时返回空集合（所有文件都是候选）"""
+    runs = _literal_runs(pattern) if regex else [pattern]
+    grams = set()
+    for run in runs:
+        if ignore_case and not run.isascii():
+            # 非 ASCII 的大小写折叠与字节级小写不一致，不能用来筛选
+            continue
+        data = run.encode('utf-8').lower()
+        grams.update(int.from_bytes(data[i:i + 3], 'big') for i in range(len(data) - 2))
+    return grams
+
+
+def compile_query(pattern, regex=False, ignore_case=True):
+    return re.compile(pattern if regex else re.escape(pattern), re.IGNORECASE if ignore_case else 0)
+
+
+def grep_files(root, relpaths, pattern, regex=False, ignore_case=True):
+    """后台进程入口：逐行校验候选文件，返回 [(相对路径, 行号, 列, 长度, 行文本)]"""
+    compiled = compile_query(pattern, regex, ignore_case)
+    results = []
+    for relpath in relpaths:
+        try:
+            with open(os.path.join(root, relpath), 'r', encoding='utf-8', errors='replace') as f:
+                count = 0
+                for number, line in enumerate(f):
+                    m = compiled.search(line)
+                    if m:
+                        results.append((relpath, number, m.start(), m.end() - m.start(), line.rstrip('\r\n')[:500]))
+                        count += 1
+                        if count >= MAX_MATCHES_PER_FILE:
+                            break
+        except OSError:
+            continue
+    return results
+
+
+MAX_PREVIEW_LINES = 50
+
+
+def make_replacer(replacement, regex=False):
+    """正则模式下替换文本可引用分组（\\1、\\g<name>），否则按字面替换"""
+    return replacement if regex else (lambda m: replacement)
+
+
+def replace_lines(text, compiled, replacement, regex=False):
+    """逐行替换（与逐行查找一致，匹配不跨行），保留每行原有的换行符；返回 (新文本, 替换次数)"""
+    if not compiled.search(text):
+        return text, 0
+    repl = make_replacer(replacement, regex)
+    lines = text.split('\n')
+    total = 0
+    for number, line in enumerate(lines):
+        cr = line.endswith('\r')
+        new, count = compiled.subn(repl, line[:-1] if cr else line)
+        if count:
+            lines[number] = new + '\r' if cr else new
+            total += count
+    return '\n'.join(lines), total
+
+
+def preview_replace(root, relpaths, pattern, replacement, regex=False, ignore_case=True, overrides=None):
+    """后台进程入口：计算每个文件的替换预览
+
+    overrides 为 {相对路径: 文本}，已在编辑器中打开的文件以编辑器内容为准。
+    返回 [(相对路径, mtime_ns 或 None, 替换次数, [(行号, 原行, 新行)])]；无法按探测到的编码解码的文件跳过。
+    """
+    compiled = compile_query(pattern, regex, ignore_case)
+    repl = make_replacer(replacement, regex)
+    overrides = overrides or {}
+    results = []
+    for relpath in relpaths:
+        text = overrides.get(relpath)
+        mtime = None
+        if text is None:
+            path = os.path.join(root, relpath)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                text = read_exact(path)[0]
+            except (OSError, UnicodeDecodeError):
+                continue
+        if not compiled.search(text):
+            continue
+        count = 0
+        samples = []
+        for number, line in enumerate(text.split('\n')):
+            line = line.rstrip('\r')
+            new, n = compiled.subn(repl, line)
+            if n:
+                count += n
+                if len(samples) < MAX_PREVIEW_LINES:
+                    samples.append((number, line[:300], new[:300]))
+        results.append((relpath, mtime, count, samples))
+    return results
+
+
+class TrigramIndex:
+    """分片的三字节组倒排索引，保存在 cache_dir 下
+
+    每个文件在 entries 中记录 (mtime_ns, 大小, 分片号, 分片内序号)，分片号为 -1 表示尚未建索引（待处理）。
+    entries 是唯一可信的来源：文件改动或删除后旧分片里的记录自然失效，不需要修改分片本身；
+    失效记录过多的分片把存活文件重新放回待处理，由后台重建。
+    """
+    VERSION = 1
+    PENDING_LIMIT = 200  # 待处理文件达到该数量就建一个新分片
+
+    def __init__(self, root, cache_dir):
+        self.root = root
+        self.cache_dir = cache_dir
+        self.entries = {}
+        self.shards = {}  # 分片号 -> 分片数据
+        self.next_shard = 0
+
+    def manifest_path(self):
+        return os.path.join(self.cache_dir, 'manifest.pkl')
+
+    def shard_path(self, number):
+        return os.path.join(self.cache_dir, f'shard-{number}.pkl')
+
+    def load(self):
+        """读取磁盘上的索引，格式或根目录不符时当作空索引"""
+        try:
+            with open(self.manifest_path(), 'rb') as f:
+                manifest = pickle.load(f)
+            if manifest.get('version') != self.VERSION or manifest.get('root') != self.root:
+                return False
+            shards = {}
+            for number in manifest['shards']:
+                with open(self.shard_path(number), 'rb') as f:
+                    shards[number] = pickle.load(f)
+        except (OSError, EOFError, pickle.PickleError, KeyError, ValueError):
+            return False
+        self.entries = manifest['entries']
+        self.shards = shards
+        self.next_shard = manifest['next_shard']
+        return True
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        manifest = {
+            'version': self.VERSION,
+            'root': self.root,
+            'entries': self.entries,
+            'shards': sorted(self.shards),
+            'next_shard': self.next_shard,
+        }
+        temp = self.manifest_path() + '.tmp'
+        with open(temp, 'wb') as f:
+            pickle.dump(manifest, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, self.manifest_path())
+
+    # --- 增量更新 ---
+    def update(self, scanned):
+        """与最新的目录扫描结果对比，删掉消失的文件，把新增或改动的文件标为待处理"""
+        for relpath in [r for r in self.entries if r not in scanned]:
+            del self.entries[relpath]
+        for relpath, (mtime, size) in scanned.items():
+            entry = self.entries.get(relpath)
+            if entry is None or entry[0] != mtime or entry[1] != size:
+                self.entries[relpath] = (mtime, size, -1, -1)
+        self.compact()
+
+    def touch(self, relpath, mtime, size):
+        """单个文件保存后标为待处理"""
+        self.entries[relpath] = (mtime, size, -1, -1)
+
+    def remove(self, relpath):
+        self.entries.pop(relpath, None)
+
+    def pending(self):
+        return [(relpath, entry[0], entry[1]) for relpath, entry in self.entries.items() if entry[2] < 0]
+
+    def take_batches(self, force=False):
+        """把待处理文件切成若干批，每批对应一个新分片号；不足 PENDING_LIMIT 时不处理（除非 force）"""
+        pending = self.pending()
+        if not pending or (len(pending) < self.PENDING_LIMIT and not force):
+            return []
+        os.makedirs(self.cache_dir, exist_ok=True)
+        batches = []
+        for start in range(0, len(pending), SHARD_SIZE):
+            batches.append((self.next_shard, pending[start:start + SHARD_SIZE]))
+            self.next_shard += 1
+        return batches
+
+    def add_shard(self, number, shard):
+        """后台建好的分片登记进来；期间又改过的文件保持待处理"""
+        used = False
+        for local, (relpath, mtime, size) in enumerate(shard['files']):
+            entry = self.entries.get(relpath)
+            if entry is not None and entry[2] < 0 and entry[0] == mtime and entry[1] == size:
+                self.entries[relpath] = (mtime, size, number, local)
+                used = True
+        if used:
+            self.shards[number] = shard
+        else:
+            self.drop_shard(number)
+
+    def drop_shard(self, number):
+        self.shards.pop(number, None)
+        try:
+            os.remove(self.shard_path(number))
+        except OSError:
+            pass
+
+    def compact(self):
+        """存活文件不到一半的分片，以及过多的小分片，把其中的文件放回待处理并删掉分片"""
+        alive = {}
+        for entry in self.entries.values():
+            if entry[2] >= 0:
+                alive[entry[2]] = alive.get(entry[2], 0) + 1
+        small = [n for n, shard in self.shards.items() if len(shard['files']) < SHARD_SIZE // 2]
+        merge_small = len(small) > 16
+        for number, shard in list(self.shards.items()):
+            live = alive.get(number, 0)
+            if live * 2 < len(shard['files']) or (merge_small and number in small):
+                for relpath, entry in self.entries.items():
+                    if entry[2] == number:
+                        self.entries[relpath] = (entry[0], entry[1], -1, -1)
+                self.drop_shard(number)
+
+    # --- 查询 ---
+    def candidates(self, grams):
+        """可能包含所有 grams 的文件（相对路径），待处理的文件总是候选"""
+        result = [relpath for relpath, entry in self.entries.items() if entry[2] < 0]
+        grams = list(grams)
+        for number, shard in self.shards.items():
+            files = shard['files']
+            if grams:
+                postings = shard['postings']
+                lists = []
+                for gram in grams:
+                    ids = postings.get(gram)
+                    if ids is None:
+                        lists = None
+                        break
+                    lists.append(ids)
+                if lists is None:
+                    continue
+                lists.sort(key=len)
+                found = set(lists[0])
+                for ids in lists[1:]:
+                    found.intersection_update(ids)
+                    if not found:
+                        break
+                locals_ = sorted(found)
+            else:
+                locals_ = range(len(files))
+            for local in locals_:
+                relpath = files[local][0]
+                entry = self.entries.get(relpath)
+                # 只有 entries 仍指向这条记录时才有效
+                if entry is not None and entry[2] == number and entry[3] == local:
+                    result.append(relpath)
+        return result
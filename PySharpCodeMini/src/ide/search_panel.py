@@ -0,0 +1,455 @@
+import hashlib
+import os
+import re
+import time
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QCheckBox, QPushButton,
+                               QLabel, QTreeWidget, QTreeWidgetItem)
+from PySide6.QtCore import Qt, QObject, QThread, Signal
+from PySide6.QtGui import QTextCursor
+from .search_index import (TrigramIndex, walk_project, build_shard, grep_files, preview_replace,
+                           required_trigrams, compile_query, make_replacer, project_relpath)
+from .workers import process_pool, FutureWatcher
+
+CACHE_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), "cache", "search")
+
+
+def cache_dir_for(root):
+    return os.path.join(CACHE_DIR, hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()[:16])
+
+
+class IndexLoader(QThread):
+    """后台线程：读取磁盘上的索引（可选）并扫描项目目录"""
+    loaded = Signal(object, object)  # (index, {相对路径: (mtime_ns, 大小)})
+
+    def __init__(self, index, load=True, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.load = load
+
+    def run(self):
+        if self.load:
+            self.index.load()
+        self.loaded.emit(self.index, walk_project(self.index.root))
+
+
+class ReplaceWriter(QThread):
+    """后台线程：逐个文件按行替换并原子写回（临时文件 + 替换）
+
+    paths 为 [(路径, 预览时的 mtime_ns)]；预览之后又被改动过的文件跳过，按 fileFailed 报告，
+    免得按过期的预览改写别人刚保存的内容。
+    """
+    progress = Signal(int, int)     # (已处理, 总数)
+    fileFailed = Signal(str, str)   # (路径, 错误)
+    written = Signal(object)        # [已写入的路径]
+
+    def __init__(self, file_manager, paths, pattern, replacement, regex, ignore_case, parent=None):
+        super().__init__(parent)
+        self.file_manager = file_manager
+        self.paths = paths
+        self.compiled = compile_query(pattern, regex, ignore_case)
+        self.replacement = replacement
+        self.regex = regex
+
+    def run(self):
+        written = []
+        for done, (path, mtime) in enumerate(self.paths, 1):
+            if self.isInterruptionRequested():
+                break
+            try:
+                if mtime is None or os.stat(path).st_mtime_ns != mtime:
+                    self.fileFailed.emit(path, "预览后文件已改动，已跳过")
+                elif self.file_manager.replace_in_file(path, self.compiled, self.replacement, self.regex):
+                    written.append(path)
+            except (OSError, UnicodeDecodeError) as e:
+                self.fileFailed.emit(path, str(e))
+            if done % 50 == 0 or done == len(self.paths):
+                self.progress.emit(done, len(self.paths))
+        self.written.emit(written)
+
+
+class ProjectSearch(QObject):
+    """项目内查找：三字节组索引筛选候选文件，候选文件分批交给进程池逐行校验，结果按批返回
+
+    索引在后台进程池中分片建立并保存在磁盘上；之后只处理新增或改动的文件。
+    """
+    status = Signal(str)
+    matches = Signal(object)   # [(相对路径, 行号, 列, 长度, 行文本)]
+    previews = Signal(object)  # [(相对路径, mtime_ns 或 None, 替换次数, [(行号, 原行, 新行)])]
+    finished = Signal(int)     # 本次查询的匹配总数
+    GREP_BATCH = 64            # 每个后台任务校验的文件数
+    RESCAN_SECONDS = 60        # 距上次扫描超过该时间，查询时顺带在后台重新扫描
+    MAX_MATCHES = 5000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index = None
+        self.loader = None
+        self.ready = False
+        self.generation = 0       # 切换根目录时加一，丢弃旧目录的后台结果
+        self.building = 0         # 正在建立的分片数
+        self.last_scan = 0.0
+        self.query_id = 0
+        self.query_kind = "grep"
+        self.query_futures = []
+        self.query_remaining = 0
+        self.query_count = 0
+        self.deferred_query = None
+        self.watcher = FutureWatcher(self)
+        self.watcher.finished.connect(self.on_finished)
+        self.watcher.failed.connect(self.on_failed)
+
+    @property
+    def root(self):
+        return self.index.root if self.index else None
+
+    def set_root(self, root):
+        root = os.path.abspath(root)
+        if self.index and self.index.root == root:
+            return
+        self.generation += 1
+        self.cancel_query()
+        self.ready = False
+        self.building = 0
+        self.index = TrigramIndex(root, cache_dir_for(root))
+        self.start_loader(load=True)
+
+    def start_loader(self, load):
+        # 重新扫描时上一次还没结束就不再重复；切换根目录时旧线程的结果会被忽略
+        if not load and self.loader and self.loader.isRunning():
+            return
+        self.status.emit("正在读取索引…" if load else "正在检查文件改动…")
+        self.loader = IndexLoader(self.index, load, self)
+        self.loader.loaded.connect(self.on_loaded)
+        self.loader.start()
+
+    def refresh(self):
+        if self.index and self.ready:
+            self.start_loader(load=False)
+
+    def on_loaded(self, index, scanned):
+        if index is not self.index:
+            return
+        self.last_scan = time.monotonic()
+        index.update(scanned)
+        self.ready = True
+        self.build_pending(force=True)
+        if self.deferred_query:
+            self.run_query(*self.deferred_query)
+
+    def build_pending(self, force=False):
+        batches = self.index.take_batches(force)
+        for number, batch in batches:
+            self.building += 1
+            future = process_pool().submit(build_shard, self.index.root, batch, self.index.shard_path(number))
+            self.watcher.watch(future, ("shard", self.generation, number))
+        if batches:
+            self.status.emit(f"正在建立索引（{self.building} 个分片）…")
+        elif not self.building:
+            self.index.save()
+
+    # --- 文件改动通知 ---
+    def relpath(self, path):
+        if not self.index:
+            return None
+        return project_relpath(path, self.index.root)
+
+    def notify_changed(self, path):
+        relpath = self.relpath(path)
+        if relpath and self.ready:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return
+            self.index.touch(relpath, st.st_mtime_ns, st.st_size)
+            self.build_pending()
+
+    def notify_removed(self, path):
+        relpath = self.relpath(path)
+        if relpath and self.ready:
+            self.index.remove(relpath)
+
+    # --- 查询 ---
+    def cancel_query(self):
+        for future in self.query_futures:
+            future.cancel()
+        self.query_futures = []
+        self.query_remaining = 0
+
+    def search(self, pattern, regex=False, ignore_case=True):
+        self.run_query("grep", pattern, regex, ignore_case)
+
+    def preview(self, pattern, replacement, regex=False, ignore_case=True, overrides=None):
+        """替换预览；overrides 为已打开文件的 {绝对路径: 编辑器文本}"""
+        self.run_query("preview", pattern, regex, ignore_case, replacement, overrides or {})
+
+    def run_query(self, kind, pattern, regex, ignore_case, replacement=None, overrides=None):
+        if not self.index or not pattern:
+            return
+        try:
+            compile_query(pattern, regex, ignore_case)
+        except re.error as e:
+            self.status.emit(f"正则表达式有误：{e}")
+            return
+        self.cancel_query()
+        self.query_id += 1
+        self.query_kind = kind
+        self.query_count = 0
+        if not self.ready:
+            self.deferred_query = (kind, pattern, regex, ignore_case, replacement, overrides)
+            return
+        self.deferred_query = None
+        if time.monotonic() - self.last_scan > self.RESCAN_SECONDS:
+            self.refresh()
+        candidates = self.index.candidates(required_trigrams(pattern, regex, ignore_case))
+        if kind == "preview":
+            # 已打开的文件以编辑器内容为准，磁盘内容不匹配也要检查
+            opened = {}
+            for path, text in overrides.items():
+                relpath = self.relpath(path)
+                if relpath:
+                    opened[relpath] = text
+            candidates = [relpath for relpath in candidates if relpath not in opened] + list(opened)
+        self.status.emit(f"在 {len(candidates)} / {len(self.index.entries)} 个文件中查找…")
+        for start in range(0, len(candidates), self.GREP_BATCH):
+            batch = candidates[start:start + self.GREP_BATCH]
+            if kind == "grep":
+                future = process_pool().submit(grep_files, self.index.root, batch, pattern, regex, ignore_case)
+            else:
+                batch_overrides = {relpath: opened[relpath] for relpath in batch if relpath in opened}
+                future = process_pool().submit(preview_replace, self.index.root, batch, pattern, replacement,
+                                               regex, ignore_case, batch_overrides)
+            self.query_futures.append(self.watcher.watch(future, (kind, self.query_id)))
+        self.query_remaining = len(self.query_futures)
+        if not self.query_futures:
+            self.finish_query()
+
+    def finish_query(self):
+        self.query_futures = []
+        if self.query_kind == "preview":
+            self.status.emit(f"共 {self.query_count} 处可替换")
+        elif self.query_count < self.MAX_MATCHES:
+            self.status.emit(f"找到 {self.query_count} 处匹配")
+        else:
+            self.status.emit(f"匹配过多，只显示前 {self.MAX_MATCHES} 处")
+        self.finished.emit(self.query_count)
+
+    def on_finished(self, tag, result):
+        if tag[0] == "shard":
+            if tag[1] != self.generation:
+                return
+            self.building -= 1
+            self.index.add_shard(tag[2], result)
+            if not self.building:
+                self.index.save()
+                self.status.emit(f"索引已就绪（{len(self.index.entries)} 个文件）")
+        elif tag[1] == self.query_id:
+            if tag[0] == "preview":
+                # 替换预览不设上限，预览里的文件都会被替换
+                if result:
+                    self.query_count += sum(count for _, _, count, _ in result)
+                    self.previews.emit(result)
+            elif result and self.query_count < self.MAX_MATCHES:
+                result = result[:self.MAX_MATCHES - self.query_count]
+                self.query_count += len(result)
+                self.matches.emit(result)
+            self.query_remaining -= 1
+            if self.query_remaining <= 0:
+                self.finish_query()
+
+    def on_failed(self, tag, error):
+        if tag[0] == "shard" and tag[1] == self.generation:
+            self.building -= 1
+            self.status.emit(f"建立索引失败：{error}")
+        elif tag[0] != "shard" and tag[1] == self.query_id:
+            self.status.emit(f"查找失败：{error}")
+            self.query_remaining -= 1
+            if self.query_remaining <= 0:
+                self.finish_query()
+
+
+def replace_in_document(document, compiled, replacement, regex=False):
+    """在已打开的文档里逐行替换，只改动有匹配的块，整次替换合并为一步撤销；返回替换次数"""
+    repl = make_replacer(replacement, regex)
+    cursor = QTextCursor(document)
+    total = 0
+    cursor.beginEditBlock()
+    block = document.firstBlock()
+    while block.isValid():
+        new, count = compiled.subn(repl, block.text())
+        if count:
+            cursor.setPosition(block.position())
+            cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+            cursor.insertText(new)
+            total += count
+        block = block.next()
+    cursor.endEditBlock()
+    return total
+
+
+class SearchPanel(QWidget):
+    """在文件中查找/替换的结果面板，匹配按文件分组，随后台结果陆续加入"""
+    openRequested = Signal(str, int)  # (绝对路径, 行号从 0 开始)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.search = ProjectSearch(self)
+        self.file_items = {}
+        self.preview_mtimes = {}  # 预览结果中每个文件的 mtime_ns，编辑器内容生成的预览为 None
+        self.file_manager = None
+        # 返回已打开文件 {绝对路径: QTextDocument}，由主窗口设置
+        self.document_provider = dict
+        self.replace_query = None  # 生成当前预览时的 (查找, 替换为, 正则, 忽略大小写)
+        self.writer = None
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        bar = QHBoxLayout()
+        self.input = QLineEdit()
+        self.input.setPlaceholderText("在文件中查找")
+        self.input.returnPressed.connect(self.start_search)
+        self.regex_box = QCheckBox(".*")
+        self.regex_box.setToolTip("正则表达式")
+        self.case_box = QCheckBox("Aa")
+        self.case_box.setToolTip("区分大小写")
+        find_btn = QPushButton("查找")
+        find_btn.clicked.connect(self.start_search)
+        close_btn = QPushButton("×")
+        close_btn.setFixedWidth(28)
+        close_btn.clicked.connect(self.hide)
+        bar.addWidget(self.input)
+        bar.addWidget(self.regex_box)
+        bar.addWidget(self.case_box)
+        bar.addWidget(find_btn)
+        bar.addWidget(close_btn)
+        layout.addLayout(bar)
+        replace_bar = QHBoxLayout()
+        self.replace_input = QLineEdit()
+        self.replace_input.setPlaceholderText("替换为")
+        self.replace_input.returnPressed.connect(self.start_preview)
+        preview_btn = QPushButton("预览替换")
+        preview_btn.clicked.connect(self.start_preview)
+        self.apply_btn = QPushButton("全部替换")
+        self.apply_btn.setEnabled(False)
+        self.apply_btn.clicked.connect(self.apply_replace)
+        replace_bar.addWidget(self.replace_input)
+        replace_bar.addWidget(preview_btn)
+        replace_bar.addWidget(self.apply_btn)
+        layout.addLayout(replace_bar)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.results = QTreeWidget()
+        self.results.setHeaderHidden(True)
+        self.results.setUniformRowHeights(True)
+        self.results.itemActivated.connect(self.on_item_activated)
+        layout.addWidget(self.results)
+        self.search.status.connect(self.status_label.setText)
+        self.search.matches.connect(self.add_matches)
+        self.search.previews.connect(self.add_previews)
+        self.search.finished.connect(self.on_query_finished)
+
+    def set_root(self, root):
+        self.search.set_root(root)
+
+    def focus_input(self, text=""):
+        if text:
+            self.input.setText(text)
+        self.input.setFocus()
+        self.input.selectAll()
+
+    def clear_results(self):
+        self.results.clear()
+        self.file_items = {}
+        self.preview_mtimes = {}
+        self.replace_query = None
+        self.apply_btn.setEnabled(False)
+
+    def start_search(self):
+        self.clear_results()
+        self.search.search(self.input.text(), self.regex_box.isChecked(), not self.case_box.isChecked())
+
+    def start_preview(self):
+        if self.writer and self.writer.isRunning():
+            return
+        self.clear_results()
+        self.replace_query = (self.input.text(), self.replace_input.text(),
+                              self.regex_box.isChecked(), not self.case_box.isChecked())
+        overrides = {path: document.toPlainText() for path, document in self.document_provider().items()}
+        pattern, replacement, regex, ignore_case = self.replace_query
+        self.search.preview(pattern, replacement, regex, ignore_case, overrides)
+
+    def on_query_finished(self, count):
+        self.apply_btn.setEnabled(self.replace_query is not None and count > 0)
+
+    def add_previews(self, previews):
+        self.results.setUpdatesEnabled(False)
+        for relpath, mtime, count, samples in previews:
+            parent = QTreeWidgetItem(self.results, [f"{relpath}  ({count})"])
+            parent.setData(0, Qt.UserRole, (relpath, 0))
+            parent.setFlags(parent.flags() | Qt.ItemIsUserCheckable)
+            parent.setCheckState(0, Qt.Checked)
+            self.file_items[relpath] = parent
+            self.preview_mtimes[relpath] = mtime
+            for line, before, after in samples:
+                item = QTreeWidgetItem(parent, [f"{line + 1}: {before.strip()}  →  {after.strip()}"])
+                item.setData(0, Qt.UserRole, (relpath, line))
+        self.results.setUpdatesEnabled(True)
+
+    def apply_replace(self):
+        """打开着的文件直接改编辑器里的文档，其余文件交给后台线程原子写回"""
+        if not self.replace_query or not self.search.root:
+            return
+        pattern, replacement, regex, ignore_case = self.replace_query
+        compiled = compile_query(pattern, regex, ignore_case)
+        documents = {os.path.abspath(path): document for path, document in self.document_provider().items()}
+        paths = []
+        in_documents = 0
+        for relpath, item in self.file_items.items():
+            if item.checkState(0) != Qt.Checked:
+                continue
+            path = os.path.abspath(os.path.join(self.search.root, relpath))
+            document = documents.get(path)
+            if document is not None:
+                in_documents += replace_in_document(document, compiled, replacement, regex)
+            else:
+                # 预览时在编辑器中打开（mtime 为 None）、现在已关闭的文件，磁盘内容与预览不同，同样跳过
+                paths.append((path, self.preview_mtimes.get(relpath)))
+        self.apply_btn.setEnabled(False)
+        self.replace_query = None
+        self.status_label.setText(f"已在打开的文件中替换 {in_documents} 处，正在写入 {len(paths)} 个文件…")
+        self.writer = ReplaceWriter(self.file_manager, paths, pattern, replacement, regex, ignore_case, self)
+        self.writer.progress.connect(lambda done, total: self.status_label.setText(f"正在写入 {done} / {total} 个文件…"))
+        self.writer.fileFailed.connect(self.on_write_failed)
+        self.writer.written.connect(self.on_written)
+        self.writer.start()
+
+    def on_write_failed(self, path, error):
+        item = self.file_items.get(self.search.relpath(path))
+        if item is not None:
+            item.setText(0, f"{item.text(0)}  写入失败：{error}")
+
+    def on_written(self, paths):
+        for path in paths:
+            self.search.notify_changed(path)
+        self.status_label.setText(f"替换完成，已写入 {len(paths)} 个文件")
+
+    def add_matches(self, matches):
+        self.results.setUpdatesEnabled(False)
+        for relpath, line, column, length, text in matches:
+            parent = self.file_items.get(relpath)
+            if parent is None:
+                parent = self.file_items[relpath] = QTreeWidgetItem(self.results, [relpath])
+                parent.setData(0, Qt.UserRole, (relpath, 0))
+                parent.setExpanded(True)
+            item = QTreeWidgetItem(parent, [f"{line + 1}: {text.strip()}"])
+            item.setData(0, Qt.UserRole, (relpath, line))
+        self.results.setUpdatesEnabled(True)
+
+    def show_locations(self, title, matches):
+        """列出查找引用等非文本查找得到的位置，格式同 add_matches"""
+        self.clear_results()
+        self.status_label.setText(title)
+        self.add_matches(matches)
+
+    def on_item_activated(self, item, column):
+        relpath, line = item.data(0, Qt.UserRole)
+        if self.search.root:
+            self.openRequested.emit(os.path.join(self.search.root, relpath), line)
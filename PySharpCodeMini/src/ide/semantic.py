@@ -0,0 +1,132 @@
+import ast
+import zlib
+from array import array
+from .lexer import PARAMETER, LOCAL, GLOBAL, IMPORTED
+
+# 该模块不依赖 Qt，可以在后台进程中运行
+
+
+class _Scope:
+    def __init__(self, parent=None, is_class=False):
+        self.parent = parent
+        self.is_class = is_class
+        self.kinds = {}
+        self.declared_global = set()
+
+
+class _Resolver:
+    """两遍处理：先收集每个作用域绑定的名字，再按作用域链解析每处名字引用"""
+    def __init__(self, lines):
+        self.lines = lines
+        self.tokens = []
+        self.module = _Scope()
+        self.scopes = {}
+
+    # --- 第一遍：收集绑定 ---
+    def collect(self, node, scope):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+                if not isinstance(child, ast.Lambda):
+                    self.bind(scope, child.name, LOCAL if scope is not self.module else GLOBAL)
+                inner = _Scope(scope)
+                self.scopes[child] = inner
+                args = child.args
+                for arg in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg]:
+                    if arg is not None:
+                        inner.kinds[arg.arg] = PARAMETER
+                self.collect(child, inner)
+            elif isinstance(child, ast.ClassDef):
+                self.bind(scope, child.name, LOCAL if scope is not self.module else GLOBAL)
+                inner = _Scope(scope, is_class=True)
+                self.scopes[child] = inner
+                self.collect(child, inner)
+            else:
+                if isinstance(child, (ast.Import, ast.ImportFrom)):
+                    for alias in child.names:
+                        name = alias.asname or alias.name.split('.')[0]
+                        if name != '*':
+                            self.bind(scope, name, IMPORTED)
+                elif isinstance(child, (ast.Global, ast.Nonlocal)):
+                    scope.declared_global.update(child.names)
+                elif isinstance(child, ast.Name) and isinstance(child.ctx, (ast.Store, ast.Del)):
+                    self.bind(scope, child.id, LOCAL if scope is not self.module else GLOBAL)
+                self.collect(child, scope)
+
+    def bind(self, scope, name, kind):
+        if name in scope.declared_global:
+            scope = self.module
+            kind = GLOBAL if kind != IMPORTED else kind
+        scope.kinds.setdefault(name, kind)
+
+    # --- 第二遍：解析引用 ---
+    def resolve(self, node, scope):
+        for child in ast.iter_child_nodes(node):
+            if child in self.scopes:
+                inner = self.scopes[child]
+                if not inner.is_class:
+                    args = child.args
+                    for arg in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg]:
+                        if arg is not None:
+                            self.emit(arg.lineno, arg.col_offset, len(arg.arg), PARAMETER)
+                self.resolve(child, inner)
+            elif isinstance(child, ast.Name):
+                kind = self.lookup(scope, child.id)
+                if kind:
+                    self.emit(child.lineno, child.col_offset, len(child.id), kind)
+            else:
+                self.resolve(child, scope)
+
+    def lookup(self, scope, name):
+        first = True
+        while scope is not None:
+            if name in scope.declared_global:
+                scope = self.module
+            # 方法体内看不到外层类体中的名字
+            if first or not scope.is_class:
+                kind = scope.kinds.get(name)
+                if kind:
+                    return kind
+            first = False
+            scope = scope.parent
+        return None
+
+    def emit(self, lineno, col, length, kind):
+        # ast 的列号是 UTF-8 字节偏移，编辑器里需要字符偏移
+        line = self.lines[lineno - 1] if lineno - 1 < len(self.lines) else ""
+        if not line.isascii():
+            col = len(line.encode('utf-8')[:col].decode('utf-8', errors='ignore'))
+        self.tokens.append((lineno - 1, col, length, kind))
+
+
+def analyze_source(source):
+    """解析源码并返回 array('I') 的 (行号, 列, 长度, 类别) 四元组，语法错误时返回 None"""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+    resolver = _Resolver(source.split('\n'))
+    resolver.collect(tree, resolver.module)
+    resolver.resolve(tree, resolver.module)
+    packed = array('I')
+    for token in sorted(resolver.tokens):
+        packed.extend(token)
+    return packed
+
+
+def analyze_revision(source, revision):
+    """后台进程入口：按行分组 {行号: (行文本 crc32, array('I') 列/长度/类别)}
+
+    结果带上文档版本号，便于界面丢弃过期结果；行的 crc32 用于在行号错位时跳过该行。
+    """
+    packed = analyze_source(source)
+    if packed is None:
+        return revision, None
+    lines = source.split('\n')
+    by_line = {}
+    it = iter(packed)
+    for line, col, length, kind in zip(it, it, it, it):
+        entry = by_line.get(line)
+        if entry is None:
+            entry = by_line[line] = (zlib.crc32(lines[line].encode('utf-8')), array('I'))
+        entry[1].extend((col, length, kind))
+    return revision, by_line
@@ -0,0 +1,204 @@
+import ast
+import os
+import pickle
+from bisect import bisect_left
+from .csharp_index import CSHARP_EXTENSIONS, extract_csharp_symbols
+
+# 该模块不依赖 Qt，提取符号在后台进程中运行
+
+CLASS = "class"
+FUNCTION = "function"
+METHOD = "method"
+IMPORT = "import"
+VARIABLE = "variable"
+MODULE = "module"
+
+PYTHON_EXTENSIONS = ('.py', '.pyw')
+SOURCE_EXTENSIONS = PYTHON_EXTENSIONS + CSHARP_EXTENSIONS
+
+
+def _targets(node):
+    """赋值语句左侧绑定的名字"""
+    if isinstance(node, ast.Name):
+        yield node.id
+    elif isinstance(node, (ast.Tuple, ast.List)):
+        for element in node.elts:
+            yield from _targets(element)
+
+
+def _collect(body, symbols, container=""):
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append((node.name, METHOD if container else FUNCTION, node.lineno, container))
+        elif isinstance(node, ast.ClassDef):
+            symbols.append((node.name, CLASS, node.lineno, container))
+            if not container:
+                _collect(node.body, symbols, node.name)
+        elif container:
+            continue
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                symbols.append((alias.asname or alias.name.split('.')[0], IMPORT, node.lineno, ""))
+        elif isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                if alias.name != '*':
+                    symbols.append((alias.asname or alias.name, IMPORT, node.lineno, ""))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                for name in _targets(target):
+                    symbols.append((name, VARIABLE, node.lineno, ""))
+        elif isinstance(node, (ast.If, ast.Try, ast.With, ast.For, ast.While)):
+            # 模块顶层的条件导入、try/except 导入等
+            for field in ('body', 'orelse', 'finalbody'):
+                _collect(getattr(node, field, []), symbols)
+            for handler in getattr(node, 'handlers', []):
+                _collect(handler.body, symbols)
+
+
+def extract_symbols(source, module=""):
+    """返回 [(名字, 类别, 行号, 所属类名)]：类、函数、方法、导入和模块级变量；语法错误时返回 None"""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+    symbols = [(module, MODULE, 1, "")] if module.isidentifier() else []
+    _collect(tree.body, symbols)
+    return symbols
+
+
+def index_source_files(root, entries):
+    """后台进程入口：entries 为 [(相对路径, mtime_ns, 大小)]，返回 [(相对路径, mtime_ns, 大小, 符号列表)]
+
+    解析失败的文件符号列表为 None，调用方保留旧结果。
+    """
+    results = []
+    for relpath, mtime, size in entries:
+        try:
+            with open(os.path.join(root, relpath), 'rb') as f:
+                source = f.read()
+        except OSError:
+            continue
+        module, ext = os.path.splitext(os.path.basename(relpath))
+        extract = extract_csharp_symbols if ext.lower() in CSHARP_EXTENSIONS else extract_symbols
+        results.append((relpath, mtime, size, extract(source, module)))
+    return results
+
+
+class SymbolIndex:
+    """项目符号索引：按小写名字排序的数组，按名字查定义为一次二分查找
+
+    每项为 (小写名字, 名字, 类别, 文件序号, 行号, 所属类名)，同名符号相邻。
+    补全的候选名字取自 names，由 FuzzyMatcher 匹配排序，再到这里查定义。
+    文件序号只分配给有符号的文件，文件删除后序号回收给之后新增的文件。
+    """
+    VERSION = 2
+    BULK_RATIO = 100  # 一次新增的项超过总数的 1/100 时直接整体重排
+
+    def __init__(self, root, cache_dir):
+        self.root = root
+        self.cache_dir = cache_dir
+        self.files = {}       # 相对路径 -> (mtime_ns, 大小, 符号列表)
+        self.file_ids = {}    # 相对路径 -> 文件序号
+        self.paths = []       # 文件序号 -> 相对路径，已回收的序号为 None
+        self.free_ids = []    # 已回收、可以重新分配的文件序号
+        self.entries = []
+        self.names = {}       # 名字 -> 定义处数，供模糊匹配取不重复的名字
+        self.revision = 0     # 每次改动加一
+
+    def cache_path(self):
+        return os.path.join(self.cache_dir, 'symbols.pkl')
+
+    def load(self):
+        try:
+            with open(self.cache_path(), 'rb') as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, pickle.PickleError, ValueError):
+            return False
+        if data.get('version') != self.VERSION or data.get('root') != self.root:
+            return False
+        self.files = {}
+        self.set_files([(relpath, mtime, size, symbols) for relpath, (mtime, size, symbols) in data['files'].items()])
+        return True
+
+    def snapshot(self):
+        """要保存的内容；文件表只做浅拷贝（各项是不再修改的元组），之后可以在其它线程写盘"""
+        return {'version': self.VERSION, 'root': self.root, 'files': dict(self.files)}
+
+    def save(self, data=None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp = self.cache_path() + '.tmp'
+        with open(temp, 'wb') as f:
+            pickle.dump(data or self.snapshot(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, self.cache_path())
+
+    def stale(self, scanned):
+        """与目录扫描结果对比：删掉消失的文件，返回需要重新解析的 [(相对路径, mtime_ns, 大小)]"""
+        for relpath in [r for r in self.files if r not in scanned]:
+            self.remove_file(relpath)
+        return [(relpath, mtime, size) for relpath, (mtime, size) in scanned.items()
+                if self.files.get(relpath, (None, None))[:2] != (mtime, size)]
+
+    def file_id(self, relpath):
+        fid = self.file_ids.get(relpath)
+        if fid is None:
+            if self.free_ids:
+                fid = self.free_ids.pop()
+                self.paths[fid] = relpath
+            else:
+                fid = len(self.paths)
+                self.paths.append(relpath)
+            self.file_ids[relpath] = fid
+        return fid
+
+    def make_entries(self, relpath, symbols):
+        if not symbols:
+            return []
+        fid = self.file_id(relpath)
+        return [(name.lower(), name, kind, fid, line, container) for name, kind, line, container in symbols]
+
+    def remove_file(self, relpath):
+        old = self.files.pop(relpath, None)
+        if old and old[2]:
+            self.revision += 1
+            for entry in self.make_entries(relpath, old[2]):
+                i = bisect_left(self.entries, entry)
+                if i < len(self.entries) and self.entries[i] == entry:
+                    del self.entries[i]
+                    count = self.names.pop(entry[1]) - 1
+                    if count:
+                        self.names[entry[1]] = count
+        fid = self.file_ids.pop(relpath, None)
+        if fid is not None:
+            self.paths[fid] = None
+            self.free_ids.append(fid)
+
+    def set_files(self, results):
+        """登记解析结果 [(相对路径, mtime_ns, 大小, 符号列表)]，符号为 None（语法错误）时保留旧符号"""
+        added = []
+        for relpath, mtime, size, symbols in results:
+            if symbols is None:
+                old = self.files.get(relpath)
+                symbols = old[2] if old else []
+                self.files[relpath] = (mtime, size, symbols)
+                continue
+            self.remove_file(relpath)
+            self.files[relpath] = (mtime, size, symbols)
+            added.extend(self.make_entries(relpath, symbols))
+        self.revision += 1
+        for entry in added:
+            self.names[entry[1]] = self.names.get(entry[1], 0) + 1
+        if len(added) * self.BULK_RATIO > len(self.entries):
+            self.entries.extend(added)
+            self.entries.sort()
+        else:
+            for entry in added:
+                self.entries.insert(bisect_left(self.entries, entry), entry)
+
+    def definition(self, name):
+        """名字的第一处定义 (名字, 类别, 相对路径, 行号, 所属类名)，没有则返回 None"""
+        i = bisect_left(self.entries, (name.lower(), name))
+        if i < len(self.entries) and self.entries[i][1] == name:
+            lower, name, kind, fid, line, container = self.entries[i]
+            return name, kind, self.paths[fid], line, container
+        return None
@@ -0,0 +1,45 @@
+import atexit
+import os
+from concurrent.futures import ProcessPoolExecutor
+from PySide6.QtCore import QObject, Signal
+
+_pool = None
+
+
+def process_pool():
+    """整个进程共用的后台进程池，首次使用时创建，留一个核心给界面"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) - 1))
+        atexit.register(shutdown_pool)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+class FutureWatcher(QObject):
+    """把 concurrent.futures 的完成回调转成 Qt 信号，在界面线程里处理结果"""
+    finished = Signal(object, object)  # (tag, result)
+    failed = Signal(object, object)    # (tag, exception)
+
+    def watch(self, future, tag=None):
+        future.add_done_callback(lambda f: self._done(f, tag))
+        return future
+
+    def _done(self, future, tag):
+        if future.cancelled():
+            return
+        try:
+            error = future.exception()
+            if error is not None:
+                self.failed.emit(tag, error)
+            else:
+                self.finished.emit(tag, future.result())
+        except RuntimeError:
+            # 接收者已被销毁（标签页已关闭）
+            pass
@@ -0,0 +1,220 @@
+import hashlib
+import io
+import keyword
+import os
+import re
+import sqlite3
+import tokenize
+from array import array
+from .symbols import extract_symbols
+from .encoding import decode_text
+from .csharp_index import CSHARP_EXTENSIONS, extract_csharp_symbols, strip_noise
+
+# 该模块不依赖 Qt：解析在后台进程中运行，数据库读写在普通线程中进行
+
+_IDENTIFIER = re.compile(r'[A-Za-z_]\w*')
+CSHARP_KEYWORDS = frozenset(
+    'abstract as base bool break byte case catch char checked class const continue decimal default delegate do '
+    'double else enum event explicit extern false finally fixed float for foreach goto if implicit in int interface '
+    'internal is lock long namespace new null object operator out override params private protected public readonly '
+    'ref return sbyte sealed short sizeof stackalloc static string struct switch this throw true try typeof uint '
+    'ulong unchecked unsafe ushort using virtual void volatile while var'.split())
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _python_references(source):
+    """Python 源码中的标识符位置 [(名字, 行号从 1 开始, 列)]，跳过关键字、字符串和注释
+
+    与 usage_lines 用同一种方式解码，列号对应显示出来的行文本（GBK、UTF-16 文件也一样）。
+    """
+    text = decode_text(source)[0]
+    try:
+        return [(tok.string, tok.start[0], tok.start[1])
+                for tok in tokenize.generate_tokens(io.StringIO(text).readline)
+                if tok.type == tokenize.NAME and not keyword.iskeyword(tok.string)]
+    except (tokenize.TokenError, SyntaxError):
+        # 未写完的文件：退回按正则找标识符
+        return [(m.group(), number, m.start())
+                for number, line in enumerate(text.split('\n'), 1)
+                for m in _IDENTIFIER.finditer(line) if not keyword.iskeyword(m.group())]
+
+
+def _csharp_references(source):
+    text = strip_noise(decode_text(source)[0])
+    return [(m.group(), number, m.start())
+            for number, line in enumerate(text.split('\n'), 1)
+            for m in _IDENTIFIER.finditer(line) if m.group() not in CSHARP_KEYWORDS]
+
+
+def analyze_file(relpath, source):
+    """返回 (定义 [(名字, 行号, 类别, 所属类名)], 引用 {名字: 打包的 (行号, 列) 序列})
+
+    Python 文件有语法错误（通常是还没写完）时定义为 None，由调用方保留上次的定义；引用照常更新。
+    """
+    module, ext = os.path.splitext(os.path.basename(relpath))
+    if ext.lower() in CSHARP_EXTENSIONS:
+        symbols = extract_csharp_symbols(source, module)
+        references = _csharp_references(source)
+    else:
+        symbols = extract_symbols(source, module)
+        references = _python_references(source)
+    definitions = None if symbols is None else [
+        (name, line, kind, container) for name, kind, line, container in symbols if kind != "module"]
+    positions = {}
+    for name, line, column in references:
+        packed = positions.get(name)
+        if packed is None:
+            packed = positions[name] = array('I')
+        packed.append(line)
+        packed.append(column)
+    return definitions, {name: packed.tobytes() for name, packed in positions.items()}
+
+
+def index_xref_files(root, entries):
+    """后台进程入口：entries 为 [(相对路径, mtime_ns, 大小, 上次的内容哈希)]
+
+    内容哈希没变的文件不解析，返回 (相对路径, mtime_ns, 大小, 哈希, None, None)，只更新时间戳；
+    其余返回 (相对路径, mtime_ns, 大小, 哈希, 定义, 引用)，定义为 None 表示保留上次的定义。
+    """
+    results = []
+    for relpath, mtime, size, old_hash in entries:
+        try:
+            with open(os.path.join(root, relpath), 'rb') as f:
+                source = f.read()
+        except OSError:
+            continue
+        digest = content_hash(source)
+        if digest == old_hash:
+            results.append((relpath, mtime, size, digest, None, None))
+        else:
+            results.append((relpath, mtime, size, digest) + analyze_file(relpath, source))
+    return results
+
+
+def usage_lines(root, name, usages):
+    """后台进程入口：读出各处引用所在的行
+
+    usages 为 XrefDatabase.usages 的结果（已按文件排序），返回项目查找结果的格式
+    [(相对路径, 行号从 0 开始, 列, 长度, 行文本)]。
+    """
+    results = []
+    lines = None
+    current = None
+    for relpath, line, column in usages:
+        if relpath != current:
+            current = relpath
+            try:
+                with open(os.path.join(root, relpath), 'rb') as f:
+                    lines = decode_text(f.read())[0].split('\n')
+            except OSError:
+                lines = []
+        text = lines[line - 1][:500] if line <= len(lines) else ""
+        results.append((relpath, line - 1, column, len(name), text))
+    return results
+
+
+class XrefDatabase:
+    """交叉引用数据库（SQLite，WAL 模式，一个线程写、其它线程各自打开连接读）
+
+    同一文件里同一个名字的所有引用位置打包成一个 BLOB，行数比逐个引用存一行少一个数量级，
+    按名字查询只需一次索引查找。
+    """
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL,
+                                          mtime INTEGER, size INTEGER, hash TEXT);
+        CREATE TABLE IF NOT EXISTS names (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+        CREATE TABLE IF NOT EXISTS defs (name_id INTEGER, file_id INTEGER, line INTEGER, kind TEXT, container TEXT);
+        CREATE TABLE IF NOT EXISTS refs (name_id INTEGER, file_id INTEGER, positions BLOB);
+        CREATE INDEX IF NOT EXISTS defs_name ON defs (name_id);
+        CREATE INDEX IF NOT EXISTS defs_file ON defs (file_id);
+        CREATE INDEX IF NOT EXISTS refs_name ON refs (name_id);
+        CREATE INDEX IF NOT EXISTS refs_file ON refs (file_id);
+    '''
+    NAME_CHUNK = 500  # 一条 IN 查询最多带的参数个数
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(self.SCHEMA)
+        self.name_ids = {}
+
+    def close(self):
+        self.connection.close()
+
+    def file_states(self):
+        """{相对路径: (mtime_ns, 大小, 哈希)}"""
+        return {path: (mtime, size, digest)
+                for path, mtime, size, digest in self.connection.execute('SELECT path, mtime, size, hash FROM files')}
+
+    def _ids_for(self, names):
+        missing = [name for name in names if name not in self.name_ids]
+        if missing:
+            self.connection.executemany('INSERT OR IGNORE INTO names (name) VALUES (?)', ((n,) for n in missing))
+            for start in range(0, len(missing), self.NAME_CHUNK):
+                chunk = missing[start:start + self.NAME_CHUNK]
+                query = f'SELECT name, id FROM names WHERE name IN ({",".join("?" * len(chunk))})'
+                self.name_ids.update(self.connection.execute(query, chunk))
+        return self.name_ids
+
+    def _file_id(self, relpath):
+        row = self.connection.execute('SELECT id FROM files WHERE path = ?', (relpath,)).fetchone()
+        if row:
+            return row[0]
+        return self.connection.execute('INSERT INTO files (path) VALUES (?)', (relpath,)).lastrowid
+
+    def store(self, results):
+        """写入 index_xref_files 的结果，整批一个事务"""
+        with self.connection:
+            for relpath, mtime, size, digest, definitions, references in results:
+                file_id = self._file_id(relpath)
+                self.connection.execute('UPDATE files SET mtime = ?, size = ?, hash = ? WHERE id = ?',
+                                        (mtime, size, digest, file_id))
+                if references is None:
+                    continue
+                ids = self._ids_for(list({name for name, *_ in definitions or ()} | set(references)))
+                if definitions is not None:
+                    self.connection.execute('DELETE FROM defs WHERE file_id = ?', (file_id,))
+                    self.connection.executemany(
+                        'INSERT INTO defs (name_id, file_id, line, kind, container) VALUES (?, ?, ?, ?, ?)',
+                        [(ids[name], file_id, line, kind, container) for name, line, kind, container in definitions])
+                self.connection.execute('DELETE FROM refs WHERE file_id = ?', (file_id,))
+                self.connection.executemany(
+                    'INSERT INTO refs (name_id, file_id, positions) VALUES (?, ?, ?)',
+                    [(ids[name], file_id, packed) for name, packed in references.items()])
+
+    def remove(self, relpaths):
+        with self.connection:
+            for relpath in relpaths:
+                row = self.connection.execute('SELECT id FROM files WHERE path = ?', (relpath,)).fetchone()
+                if row:
+                    self.connection.execute('DELETE FROM defs WHERE file_id = ?', row)
+                    self.connection.execute('DELETE FROM refs WHERE file_id = ?', row)
+                    self.connection.execute('DELETE FROM files WHERE id = ?', row)
+
+    def definitions(self, name):
+        """[(相对路径, 行号从 1 开始, 类别, 所属类名)]"""
+        return self.connection.execute(
+            'SELECT files.path, defs.line, defs.kind, defs.container FROM names '
+            'JOIN defs ON defs.name_id = names.id JOIN files ON files.id = defs.file_id '
+            'WHERE names.name = ? ORDER BY files.path, defs.line', (name,)).fetchall()
+
+    def usages(self, name, limit=5000):
+        """[(相对路径, 行号从 1 开始, 列)]，最多 limit 处"""
+        usages = []
+        rows = self.connection.execute(
+            'SELECT files.path, refs.positions FROM names '
+            'JOIN refs ON refs.name_id = names.id JOIN files ON files.id = refs.file_id '
+            'WHERE names.name = ? ORDER BY files.path', (name,))
+        for relpath, blob in rows:
+            packed = array('I')
+            packed.frombytes(blob)
+            usages.extend((relpath, packed[i], packed[i + 1]) for i in range(0, len(packed), 2))
+            if len(usages) >= limit:
+                return usages[:limit]
+        return usages
@@ -1,5 +1,6 @@
 import sys
 import logging
+import multiprocessing
 from PySide6.QtWidgets import QApplication
 from PySide6.QtCore import QLoggingCategory
 from ide.mainwindow import MainWindow
@@ -21,6 +22,8 @@ QLoggingCategory.setFilterRules("*.debug=false\n*.info=false")
 logging.getLogger("AdSyncNamespace").setLevel(logging.CRITICAL)
 
 if __name__ == "__main__":
+    # 打包后的程序启动后台进程池时需要
+    multiprocessing.freeze_support()
     # 禁用 Qt 未测试版本警告
     if sys.platform == "win32":
         os.environ["QT_LOGGING_RULES"] = "qt.*=false"
@@ -0,0 +1,36 @@
+using System;  // => System:import:
+using Json = System.Text.Json;  // => Json:import:
+
+// 声明的对照样例：行尾 "// =>" 后列出该行应提取的符号（名字:类别:所属类型），没有标注的行不应提取到符号
+namespace PySharp.Samples.Declarations  // => PySharp.Samples.Declarations:module:
+{
+    public enum Kind { A, B = 2, C }  // => Kind:class: A:variable:Kind B:variable:Kind C:variable:Kind
+
+    [Flags]
+    internal enum Access : byte  // => Access:class:
+    {
+        None = 0,  // => None:variable:Access
+        Read = 1 << 0, Write = 1 << 1,  // => Read:variable:Access Write:variable:Access
+        ReadWrite = Read | Write  // => ReadWrite:variable:Access
+    }
+
+    enum Empty { }  // => Empty:class:
+
+    public class Fields  // => Fields:class:
+    {
+        private int a, b;  // => a:variable:Fields b:variable:Fields
+        private int first = 1, second = Math.Max(2, 3), third;  // => first:variable:Fields second:variable:Fields third:variable:Fields
+        private readonly Dictionary<int, string> names = new Dictionary<int, string>(), aliases;  // => names:variable:Fields aliases:variable:Fields
+        private int[] values = { 1, 2 }, more;  // => values:variable:Fields more:variable:Fields
+        public const string Prefix = "a, b", Suffix = "c";  // => Prefix:variable:Fields Suffix:variable:Fields
+        public event EventHandler Opened, Closed;  // => Opened:variable:Fields Closed:variable:Fields
+        public int Count { get; set; }  // => Count:variable:Fields
+        private enum State { Idle, Busy }  // => State:class:Fields Idle:variable:State Busy:variable:State
+
+        public int Sum(int x, int y)  // => Sum:method:Fields
+        {
+            int local = x, other = y;
+            return local + other + a + b;
+        }
+    }
+}
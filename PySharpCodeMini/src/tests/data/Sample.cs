@@ -0,0 +1,93 @@
+using System;
+using System.Collections.Generic;
+using System.IO;
+
+namespace PySharp.Samples
+{
+    // 示例：常见的 C# 语法，供词法器对照测试使用
+    public class Inventory
+    {
+        private Dictionary<string, int> counts = new Dictionary<string, int>();
+        private string path = @"C:\data\inventory.txt";
+        public int Total { get; private set; }
+
+        public Inventory(string path)
+        {
+            this.path = path;
+        }
+
+        public void Add(string name, int count)
+        {
+            if (counts.ContainsKey(name))
+            {
+                counts[name] += count;
+            }
+            else
+            {
+                counts.Add(name, count);
+            }
+            Total += count;
+        }
+
+        public bool Remove(string name)
+        {
+            return counts.Remove(name);
+        }
+
+        /* 多行注释
+           里面的 class Foo 和 Call() 不应被染色 */
+        public int Count(string name)
+        {
+            int value;
+            return counts.TryGetValue(name, out value) ? value : 0;
+        }
+
+        public string Describe()
+        {
+            var lines = new List<string>();
+            foreach (var pair in counts)
+            {
+                lines.Add(string.Format("{0}: {1}", pair.Key, pair.Value));
+            }
+            return string.Join("\n", lines);
+        }
+
+        public void Save()
+        {
+            using (var writer = new StreamWriter(path))
+            {
+                writer.Write(Describe()); // 写入 "全部" 内容
+            }
+        }
+
+        private static bool IsValid(string name) => !string.IsNullOrEmpty(name);
+
+        public void Load()
+        {
+            foreach (var line in File.ReadAllLines(path))
+            {
+                var parts = line.Split(':');
+                if (parts.Length == 2 && IsValid(parts[0]))
+                {
+                    Add(parts[0].Trim(), int.Parse(parts[1]));
+                }
+            }
+        }
+    }
+
+    public class Program
+    {
+        public static void Main(string[] args)
+        {
+            var inventory = new Inventory("inventory.txt");
+            inventory.Add("apple", 3);
+            inventory.Add("pear", 5);
+            Console.WriteLine(inventory.Describe());
+            while (inventory.Total > 0)
+            {
+                inventory.Remove("apple");
+                break;
+            }
+        }
+    }
+}
@@ -0,0 +1,71 @@
+"""C# 符号提取按标注对照；向上查找 .csproj：结果缓存，且不越过工作区根目录"""
+import os
+import re
+
+from ide.csharp_index import extract_csharp_symbols, find_csproj
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+_EXPECTED = re.compile(r'// => (.*)$')
+
+
+def annotated(path):
+    """行尾 "// => 名字:类别:所属类型 ..." 标注的期望结果 [(名字, 类别, 行号, 所属类型)]"""
+    expected = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            m = _EXPECTED.search(line)
+            if m:
+                for item in m.group(1).split():
+                    name, kind, container = item.split(':')
+                    expected.append((name, kind, number, container))
+    return expected
+
+
+def test_declarations_match_annotations():
+    path = os.path.join(DATA_DIR, "Declarations.cs")
+    with open(path, 'rb') as f:
+        symbols = extract_csharp_symbols(f.read(), "Declarations")
+    assert symbols == annotated(path)
+
+
+def test_sample_corpus():
+    with open(os.path.join(DATA_DIR, "Sample.cs"), 'rb') as f:
+        symbols = extract_csharp_symbols(f.read(), "Sample")
+    assert [(name, kind, container) for name, kind, _, container in symbols] == [
+        ("System", "import", ""), ("System.Collections.Generic", "import", ""), ("System.IO", "import", ""),
+        ("PySharp.Samples", "module", ""), ("Inventory", "class", ""),
+        ("counts", "variable", "Inventory"), ("path", "variable", "Inventory"), ("Total", "variable", "Inventory"),
+        ("Inventory", "method", "Inventory"), ("Add", "method", "Inventory"), ("Remove", "method", "Inventory"),
+        ("Count", "method", "Inventory"), ("Describe", "method", "Inventory"), ("Save", "method", "Inventory"),
+        ("IsValid", "method", "Inventory"), ("Load", "method", "Inventory"),
+        ("Program", "class", ""), ("Main", "method", "Program"),
+    ]
+
+
+def make_tree(tmp_path):
+    workspace = tmp_path / "workspace"
+    source = workspace / "App" / "Models"
+    source.mkdir(parents=True)
+    (workspace / "App" / "App.csproj").write_text("<Project />")
+    (workspace / "Scripts").mkdir()
+    return workspace
+
+
+def test_finds_nearest_project_and_caches_the_walk(tmp_path):
+    workspace = make_tree(tmp_path)
+    cache = {}
+    models = str(workspace / "App" / "Models")
+    expected = str(workspace / "App" / "App.csproj")
+    assert find_csproj(models, cache, str(workspace)) == expected
+    assert cache == {models: expected, str(workspace / "App"): expected}
+
+
+def test_walk_stops_at_root(tmp_path):
+    workspace = make_tree(tmp_path)
+    (tmp_path / "Outer.csproj").write_text("<Project />")
+    cache = {}
+    scripts = str(workspace / "Scripts")
+    assert find_csproj(scripts, cache, str(workspace)) is None
+    assert set(cache) == {scripts, str(workspace)}
+    # 没有根目录限制时会一直找到上层的项目
+    assert find_csproj(scripts, {}) == os.path.join(str(tmp_path), "Outer.csproj")
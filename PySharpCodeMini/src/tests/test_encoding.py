@@ -0,0 +1,44 @@
+"""编码探测与按原编码写回：带 BOM 的 UTF-16/32 保持原来的字节序"""
+import codecs
+
+import pytest
+
+from ide.encoding import detect_encoding, read_text, read_exact
+
+TEXT = "第一行 line\n第二行 𝄞\n"
+
+
+@pytest.mark.parametrize("bom, base, encoding", [
+    (codecs.BOM_UTF8, 'utf-8', 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le', 'utf-16-le-sig'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be', 'utf-16-be-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32-le', 'utf-32-le-sig'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be', 'utf-32-be-sig'),
+])
+def test_bom_round_trip_keeps_byte_order(tmp_path, bom, base, encoding):
+    data = bom + TEXT.replace('\n', '\r\n').encode(base)
+    path = tmp_path / "bom.txt"
+    path.write_bytes(data)
+    assert detect_encoding(data) == encoding
+
+    text, detected, newline = read_text(str(path))
+    assert (text, detected, newline) == (TEXT, encoding, '\r\n')
+    # 与 FileManager.write_atomic 相同的写法
+    with open(path, 'w', encoding=detected, newline=newline) as f:
+        f.write(text)
+    assert path.read_bytes() == data
+
+    text, detected = read_exact(str(path))
+    assert text == TEXT.replace('\n', '\r\n')
+    assert text.encode(detected) == data
+
+
+def test_sig_codec_incremental_decoding_splits_bom():
+    data = codecs.BOM_UTF16_BE + "abc".encode('utf-16-be')
+    decoder = codecs.getincrementaldecoder('utf-16-be-sig')()
+    assert "".join(decoder.decode(data[i:i + 1]) for i in range(len(data))) + decoder.decode(b"", True) == "abc"
+
+
+def test_text_without_bom_is_not_given_one():
+    assert detect_encoding("plain".encode('utf-16-le')) == 'utf-16-le'
+    assert detect_encoding("中文".encode('gbk'), complete=True) == 'gb18030'
@@ -0,0 +1,59 @@
+"""原子写入：权限、符号链接、按原编码替换（FileManager 所在模块依赖 PySide6）"""
+import os
+import re
+import stat
+import sys
+
+import pytest
+
+pytest.importorskip("PySide6.QtWidgets")
+
+from ide.filemanager import FileManager
+
+
+@pytest.fixture
+def manager():
+    return FileManager(None)
+
+
+def mode_of(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="POSIX 权限")
+def test_new_file_gets_default_permissions(manager, tmp_path):
+    reference = tmp_path / "reference.txt"
+    reference.write_text("x")
+    target = tmp_path / "new.txt"
+    manager.write_atomic(str(target), "text")
+    assert target.read_text() == "text"
+    assert mode_of(target) == mode_of(reference)
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="POSIX 权限")
+def test_existing_file_keeps_permissions(manager, tmp_path):
+    target = tmp_path / "script.sh"
+    target.write_text("old")
+    os.chmod(target, 0o750)
+    manager.write_atomic(str(target), "new")
+    assert target.read_text() == "new"
+    assert mode_of(target) == 0o750
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink') or sys.platform == 'win32', reason="需要符号链接")
+def test_symlink_is_preserved(manager, tmp_path):
+    real = tmp_path / "real.txt"
+    real.write_text("old")
+    link = tmp_path / "link.txt"
+    link.symlink_to(real)
+    manager.write_atomic(str(link), "new")
+    assert link.is_symlink()
+    assert real.read_text() == "new"
+
+
+@pytest.mark.parametrize("encoding", ["gb18030", "utf-16", "utf-8-sig", "utf-16-be-sig", "utf-32-be-sig"])
+def test_replace_keeps_encoding_and_newlines(manager, tmp_path, encoding):
+    target = tmp_path / "a.txt"
+    target.write_bytes("名称 = 旧值\r\n其它\n".encode(encoding))
+    assert manager.replace_in_file(str(target), re.compile("旧值"), "新值") == 1
+    assert target.read_bytes() == "名称 = 新值\r\n其它\n".encode(encoding)
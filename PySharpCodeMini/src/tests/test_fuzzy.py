@@ -0,0 +1,46 @@
+"""模糊匹配：字符索引与逐行判断对照，以及各档次的排序"""
+import random
+
+import pytest
+
+from ide.fuzzy import CharIndex, FuzzyMatcher
+
+random.seed(7)
+# 少数常见字符加上大量只出现在少数行的汉字，位图和行号数组两种存法都会用到
+COMMON = "abcdefg_./"
+RARE = [chr(0x4e00 + i) for i in range(400)]
+LINES = ["".join(random.choice(COMMON) if random.random() < 0.6 else random.choice(RARE)
+                 for _ in range(random.randint(1, 12))) for _ in range(3000)]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return CharIndex("\n" + "\n".join(LINES) + "\n")
+
+
+def test_common_and_rare_characters_use_different_storage(index):
+    assert "a" in index.dense
+    assert RARE[0] in index.sparse
+    assert "z" not in index
+
+
+@pytest.mark.parametrize("needle", ["a", "ab_", RARE[3], RARE[3] + RARE[4], "a" + RARE[5], "g./" + RARE[6], "z"])
+def test_containing_matches_brute_force(index, needle):
+    expected = [row for row, line in enumerate(LINES) if set(needle) <= set(line)]
+    assert list(index.containing(needle)) == expected
+
+
+def test_match_tiers():
+    matcher = FuzzyMatcher(["getUserName", "user_name", "gun", "target_unit_name", "解析文件", "文件解析器"])
+    assert [name for _, name in matcher.match("gun")][:2] == ["gun", "getUserName"]
+    assert [name for _, name in matcher.match("文件")] == ["文件解析器", "解析文件"]
+    assert matcher.match("xyz") == []
+
+
+def test_matcher_survives_pickling():
+    # 补全的匹配器在进程池中建好后传回界面进程
+    import pickle
+    matcher = FuzzyMatcher(LINES)
+    copy = pickle.loads(pickle.dumps(matcher))
+    for query in ("ab", RARE[3], "g" + RARE[5]):
+        assert copy.match(query) == matcher.match(query)
@@ -0,0 +1,71 @@
+"""换配色只换格式表，不重新分词（需要 PySide6，在无界面平台上运行）"""
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtGui = pytest.importorskip("PySide6.QtGui")
+
+from ide.highlighter import PythonHighlighter
+from ide.lexer import SpanCache
+
+SOURCE = '''import os
+
+class Cache(object):
+    """文档字符串
+    跨越多行"""
+    def get(self, key):
+        return self.items.get(key)  # 注释
+'''
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtGui.QGuiApplication.instance() or QtGui.QGuiApplication([])
+
+
+@pytest.fixture
+def highlighted(app, monkeypatch):
+    document = QtGui.QTextDocument()
+    document.setPlainText(SOURCE * 20)
+    highlighter = PythonHighlighter(document)
+    # 预算为 0 的缓存：任何一行都不在缓存里，分词必然调用到 Grammar.tokenize
+    highlighter.span_cache = SpanCache(budget_bytes=0)
+    calls = []
+    original = highlighter.grammar.tokenize
+    monkeypatch.setattr(highlighter.grammar, "tokenize",
+                        lambda text, state=0: calls.append(text) or original(text, state))
+    highlighter.rehighlight()
+    assert calls
+    calls.clear()
+    yield document, highlighter, calls
+    highlighter.setDocument(None)
+
+
+def test_recolor_makes_no_tokenizer_calls(highlighted):
+    document, highlighter, calls = highlighted
+    before = highlighter.formats
+    highlighter.set_dark_mode(True)
+    assert highlighter.formats is not before
+    assert calls == []
+    block = document.firstBlock()
+    while block.isValid():
+        assert block.userData().generation == highlighter.palette_generation
+        block = block.next()
+
+
+def test_edited_block_is_tokenized_again(highlighted):
+    document, highlighter, calls = highlighted
+    cursor = QtGui.QTextCursor(document.findBlockByNumber(2))
+    cursor.insertText("x = 1  ")
+    assert calls and calls[0].startswith("x = 1  class Cache")
+
+
+def test_long_line_end_state_uses_whole_line(app):
+    document = QtGui.QTextDocument()
+    document.setPlainText('x = """' + "x" * 5000 + '"""\ndef f(): pass\n')
+    highlighter = PythonHighlighter(document)
+    highlighter.rehighlight()
+    assert document.firstBlock().userState() == 0
+    assert document.findBlockByNumber(1).userState() == 0
+    highlighter.setDocument(None)
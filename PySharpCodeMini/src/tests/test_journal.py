@@ -0,0 +1,39 @@
+"""恢复日志：重放编辑，按进程号区分其它实例正在使用的日志"""
+import os
+import subprocess
+import sys
+
+from ide.journal import JournalFile, journal_pid, process_alive, read_journal
+
+
+def test_replay_snapshot_and_edits(tmp_path):
+    journal = JournalFile(str(tmp_path / f"{os.getpid()}-0.journal"))
+    meta = {"path": "a.py", "encoding": "utf-8", "newline": "\n"}
+    journal.write_snapshot(meta, "hello 世界")
+    for i, ch in enumerate("!!"):
+        journal.add_edit(8 + i, 0, ch)
+    journal.add_edit(0, 5, "bye")
+    journal.flush()
+    assert read_journal(journal.path) == (meta, "bye 世界!!")
+
+
+def test_journal_pid():
+    assert journal_pid("1234-7.journal") == 1234
+    assert journal_pid("notes.journal") is None
+
+
+def test_process_alive():
+    assert process_alive(os.getpid())
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    assert not process_alive(child.pid)
+
+
+def test_replay_whole_document_replace(tmp_path):
+    # 全选后粘贴：Qt 报告的删除长度包含文档末尾的段落分隔符，比文本多 1
+    journal = JournalFile(str(tmp_path / f"{os.getpid()}-0.journal"))
+    meta = {"path": None, "encoding": "utf-8", "newline": "\n"}
+    journal.write_snapshot(meta, "old\ntext")
+    journal.add_edit(0, len("old\ntext") + 1, "new\n文本")
+    journal.flush()
+    assert read_journal(journal.path) == (meta, "new\n文本")
@@ -0,0 +1,178 @@
+"""合并正则的词法器与原来逐条规则染色的高亮器对照
+
+OLD_PYTHON_RULES / OLD_CSHARP_RULES 照搬改写前 highlighter.py 中的规则和顺序：
+每条规则各自 finditer，整段匹配依次 setFormat，后面的规则覆盖前面的。
+两者在规则互相重叠的地方本来就不同（新词法器有意让注释、字符串优先，def/class 关键字保留自己的格式），
+对照时只允许这几类差异，其余位置必须逐字符一致。
+"""
+import glob
+import os
+import re
+
+import pytest
+
+from ide.lexer import (PYTHON_GRAMMAR, CSHARP_GRAMMAR, PYTHON_KEYWORDS, CSHARP_KEYWORDS,
+                       KEYWORD, STRING, COMMENT, FUNCTION, CLASS, CALL)
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(SRC_DIR, "tests", "data")
+
+
+def _keyword_rules(keywords):
+    return [(re.compile(r'\b' + word + r'\b'), KEYWORD) for word in keywords]
+
+
+OLD_PYTHON_RULES = _keyword_rules(PYTHON_KEYWORDS) + [
+    (re.compile(r'".*?"'), STRING),
+    (re.compile(r"'.*?'"), STRING),
+    (re.compile(r'#.*'), COMMENT),
+    (re.compile(r'\bdef\s+(\w+)\b'), FUNCTION),
+    (re.compile(r'\bclass\s+(\w+)\b'), CLASS),
+    (re.compile(r'\b\w+(?=\()'), CALL),
+]
+
+OLD_CSHARP_RULES = _keyword_rules(CSHARP_KEYWORDS) + [
+    (re.compile(r'".*?"'), STRING),
+    (re.compile(r'//.*'), COMMENT),
+    (re.compile(r'\b(?:void|int|string|bool)\s+(\w+)\s*\('), FUNCTION),
+    (re.compile(r'\bclass\s+(\w+)\b'), CLASS),
+    (re.compile(r'\b\w+(?=\()'), CALL),
+]
+
+
+def old_formats(rules, text):
+    """原高亮器的结果：每个字符最终的格式（0 表示未设置）"""
+    formats = [0] * len(text)
+    for pattern, token in rules:
+        for m in pattern.finditer(text):
+            start, end = m.span()
+            formats[start:end] = [token] * (end - start)
+    return formats
+
+
+def new_formats(grammar, text, state):
+    formats = [0] * len(text)
+    spans, state = grammar.tokenize(text, state)
+    for start, length, token in spans:
+        formats[start:start + length] = [token] * length
+    return formats, state
+
+
+def runs(formats):
+    """逐字符格式合并成 (start, length, format) 区间，便于比较和报错"""
+    spans = []
+    for i, token in enumerate(formats):
+        if spans and spans[-1][2] == token and spans[-1][0] + spans[-1][1] == i:
+            spans[-1][1] += 1
+        else:
+            spans.append([i, 1, token])
+    return [tuple(span) for span in spans if span[2]]
+
+
+def run_bounds(formats, i, tokens=None):
+    """包含 i、格式都属于 tokens（默认与 i 相同）的最长连续区间"""
+    tokens = tokens or (formats[i],)
+    start = i
+    while start > 0 and formats[start - 1] in tokens:
+        start -= 1
+    end = i
+    while end + 1 < len(formats) and formats[end + 1] in tokens:
+        end += 1
+    return start, end
+
+
+def explained(old, new, i):
+    """old[i] != new[i] 是否属于两种实现规则重叠时的已知差异"""
+    if new[i] in (STRING, COMMENT):
+        return True  # 注释、字符串（含跨行区域）内部不再被关键字、调用等规则染色
+    if new[i] in (KEYWORD, FUNCTION, CLASS) and old[i] == CALL:
+        return True  # if( / def name( 中的名字原来被调用规则覆盖
+    if old[i] in (FUNCTION, CLASS):
+        # 原规则把整段 "def name" / "void Name(" 染成名字的颜色（名字随后可能又被调用规则覆盖），新词法器只染名字
+        start, end = run_bounds(old, i, (FUNCTION, CLASS, CALL))
+        return any(new[k] in (FUNCTION, CLASS) for k in range(start, end + 1))
+    start, end = run_bounds(old, i)
+    if old[i] in (STRING, COMMENT):
+        # 原规则从字符串或注释里的引号、# 开始另算一段
+        return new[start] in (STRING, COMMENT)
+    return False
+
+
+def compare(grammar, rules, lines):
+    state = 0
+    identical = 0
+    for number, text in enumerate(lines, 1):
+        old = old_formats(rules, text)
+        new, state = new_formats(grammar, text, state)
+        if runs(old) == runs(new):
+            identical += 1
+            continue
+        for i in range(len(text)):
+            if old[i] != new[i]:
+                assert explained(old, new, i), (
+                    f"line {number} col {i}: {text!r}\nold {runs(old)}\nnew {runs(new)}")
+    return identical
+
+
+def corpus(pattern):
+    lines = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding='utf-8') as f:
+            lines.extend(f.read().split('\n'))
+    return lines
+
+
+def test_python_corpus_matches_old_rules():
+    lines = corpus(os.path.join(SRC_DIR, "ide", "*.py"))
+    assert len(lines) > 1000
+    identical = compare(PYTHON_GRAMMAR, OLD_PYTHON_RULES, lines)
+    # 大多数行没有规则重叠，结果完全相同；其余是字符串、文档字符串里含关键字或调用的行
+    assert identical > 0.8 * len(lines)
+
+
+def test_csharp_corpus_matches_old_rules():
+    lines = corpus(os.path.join(DATA_DIR, "*.cs"))
+    identical = compare(CSHARP_GRAMMAR, OLD_CSHARP_RULES, lines)
+    assert identical > 0.85 * len(lines)
+
+
+@pytest.mark.parametrize("grammar, rules, text", [
+    (PYTHON_GRAMMAR, OLD_PYTHON_RULES, "for item in items:"),
+    (PYTHON_GRAMMAR, OLD_PYTHON_RULES, "    return compute(x) and not done  # 注释"),
+    (PYTHON_GRAMMAR, OLD_PYTHON_RULES, "from os import path as p"),
+    (PYTHON_GRAMMAR, OLD_PYTHON_RULES, "value = 'text' + \"more\""),
+    (CSHARP_GRAMMAR, OLD_CSHARP_RULES, "using System.IO;"),
+    (CSHARP_GRAMMAR, OLD_CSHARP_RULES, "    if (ok) return Parse(\"42\"); // done"),
+])
+def test_non_overlapping_lines_are_identical(grammar, rules, text):
+    assert runs(new_formats(grammar, text, 0)[0]) == runs(old_formats(rules, text))
+
+
+def test_known_overlaps_resolved_in_favour_of_strings_and_comments():
+    text = 'print("# not a comment")  # call() in comment'
+    new = runs(new_formats(PYTHON_GRAMMAR, text, 0)[0])
+    assert new == [(0, 5, CALL), (6, 17, STRING), (26, 19, COMMENT)]
+    text = "def name(self):"
+    assert runs(new_formats(PYTHON_GRAMMAR, text, 0)[0]) == [(0, 3, KEYWORD), (4, 4, FUNCTION)]
+
+
+def test_end_state_matches_tokenizer_on_corpus():
+    for grammar, pattern in ((PYTHON_GRAMMAR, os.path.join(SRC_DIR, "ide", "*.py")),
+                             (CSHARP_GRAMMAR, os.path.join(DATA_DIR, "*.cs"))):
+        state = 0
+        for text in corpus(pattern):
+            end = grammar.tokenize(text, state)[1]
+            assert grammar.end_state(text, state) == end, text
+            state = end
+
+
+@pytest.mark.parametrize("grammar, head, tail", [
+    (PYTHON_GRAMMAR, 'x = """', 'still a string""" + "# not a comment" # """'),
+    (PYTHON_GRAMMAR, "s = '#' + '''", "'''"),
+    (CSHARP_GRAMMAR, 'var s = "/*"; /*', "*/ // /*"),
+])
+def test_end_state_of_long_line_closed_after_the_cut(grammar, head, tail):
+    text = head + "x" * 5000 + tail
+    assert grammar.tokenize(text[:4000], 0)[1] != 0
+    assert grammar.end_state(text, 0) == 0
+    assert grammar.end_state(head + "x" * 5000, 0) == grammar.tokenize(head, 0)[1] != 0
@@ -0,0 +1,68 @@
+"""片段表的插入、删除和行定位"""
+import re
+from array import array
+
+import pytest
+
+from ide.piece_table import PieceTable
+
+
+class BytesFile:
+    """代替 MappedFile：原文放在内存里，行索引一次建好"""
+
+    def __init__(self, data, encoding='utf-8'):
+        self.mm = data
+        self.size = len(data)
+        self.encoding = encoding
+        self.offsets = array('Q', [0] + [m.end() for m in re.finditer(rb'\n', data)])
+        self.indexed = True
+
+    def close(self):
+        pass
+
+
+def text_of(table):
+    return table.read(0, table.length()).decode(table.encoding)
+
+
+def lines_of(table):
+    return [table.line(n) for n in range(table.line_count())]
+
+
+def backspace_at_line_start(table, line):
+    """与 LargeFileView.delete_char 在第 0 列退格时的做法相同"""
+    offset = table.break_offset(line - 1)
+    table.delete(offset, table.line_start(line) - offset)
+
+
+def test_insert_and_delete_across_pieces():
+    table = PieceTable(BytesFile(b'alpha\nbeta\ngamma'))
+    table.insert(6, 'new\n')
+    table.insert(table.length(), '\ndelta')
+    assert lines_of(table) == ['alpha', 'new', 'beta', 'gamma', 'delta']
+    table.delete(3, 8)
+    assert text_of(table) == 'alpeta\ngamma\ndelta'
+    assert table.line_of_offset(7) == 1
+    assert table.line_bounds(1) == (7, 12)
+
+
+@pytest.mark.parametrize("data, line, expected", [
+    (b'\nsecond', 1, 'second'),                 # 上一行是空的首行，行尾偏移为 0
+    (b'\r\nsecond', 1, 'second'),
+    (b'first\n\nthird', 2, 'first\nthird'),
+    (b'first\r\n\r\nthird', 2, 'first\r\nthird'),
+    (b'first\r\nsecond', 1, 'firstsecond'),
+])
+def test_backspace_joins_previous_line(data, line, expected):
+    table = PieceTable(BytesFile(data))
+    backspace_at_line_start(table, line)
+    assert text_of(table) == expected
+
+
+def test_backspace_after_inserted_empty_first_line():
+    table = PieceTable(BytesFile(b'text'))
+    table.insert(0, '\n')
+    assert table.break_offset(0) == 0
+    backspace_at_line_start(table, 1)
+    assert text_of(table) == 'text'
+    assert table.read(-1, 2) == b'te'
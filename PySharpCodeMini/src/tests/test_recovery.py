@@ -0,0 +1,49 @@
+"""恢复日志记录文档改动（需要 PySide6，在无界面平台上运行）"""
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtGui = pytest.importorskip("PySide6.QtGui")
+
+from ide.journal import JournalFile, read_journal
+from ide.recovery import RecoveryJournal
+
+
+class Editor:
+    encoding = 'utf-8'
+    newline = '\n'
+
+    def __init__(self, document):
+        self._document = document
+
+    def document(self):
+        return self._document
+
+    def isReadOnly(self):
+        return False
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtGui.QGuiApplication.instance() or QtGui.QGuiApplication([])
+
+
+def test_whole_document_replace_is_replayed(app, tmp_path):
+    document = QtGui.QTextDocument()
+    document.setPlainText("old\ntext")
+    editor = Editor(document)
+    recovery = RecoveryJournal(lambda e: None)
+    journal = JournalFile(str(tmp_path / f"{os.getpid()}-0.journal"))
+    journal.write_snapshot(recovery.meta_for(editor), document.toPlainText())
+    recovery.journals[editor] = journal
+    recovery.revisions[editor] = document.revision()
+    recovery.watch(editor)
+
+    cursor = QtGui.QTextCursor(document)
+    cursor.select(QtGui.QTextCursor.Document)
+    cursor.insertText("new\n文本")
+    cursor.movePosition(QtGui.QTextCursor.End)
+    cursor.insertText("!")
+    recovery.flush_all()
+    assert read_journal(journal.path)[1] == document.toPlainText() == "new\n文本!"
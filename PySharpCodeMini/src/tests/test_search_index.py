@@ -0,0 +1,98 @@
+"""正则查询的三字节组筛选与逐文件暴力匹配对照：筛选只能多放候选，不能漏掉真正匹配的文件"""
+import os
+import re
+
+import pytest
+
+from ide.search_index import (_literal_runs, compile_query, file_trigrams, preview_replace, project_relpath,
+                              required_trigrams)
+
+TEXTS = [
+    "ABC = 0x41bc",
+    "value = 'Abc' + chr(65)",
+    "path\\to\\file.txt",
+    "tab\there and\nnewline",
+    "中文标识符 = 1",
+    "é accent and é combining",
+    "foo(bar, baz) foofoo",
+    "octal \x07 bell and \x00 nul",
+    "  def name(self): return name",
+    "aaa-bbb aaab",
+]
+
+PATTERNS = [
+    r"\x41bc",
+    r"\x41\x42C",
+    r"中文",
+    r"\U00004e2d文",
+    r"\N{LATIN SMALL LETTER E WITH ACUTE} accent",
+    r"\101bc",
+    r"\0nul",
+    r"octal \07 bell",
+    r"(foo)\1",
+    r"(\w+)\(self\): return \1",
+    r"tab\there",
+    r"new\nline",
+    r"path\\to",
+    r"def\s+name",
+    r"\bname\b",
+    r"aa\x61?-b{2}",
+    r"0x[0-9a-f]+bc",
+]
+
+
+def matching_files(pattern, ignore_case):
+    compiled = compile_query(pattern, True, ignore_case)
+    return {n for n, text in enumerate(TEXTS) if compiled.search(text)}
+
+
+def candidate_files(pattern, ignore_case):
+    grams = required_trigrams(pattern, True, ignore_case)
+    return {n for n, text in enumerate(TEXTS) if grams <= set(file_trigrams(text.encode('utf-8')))}
+
+
+@pytest.mark.parametrize("ignore_case", [True, False])
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_trigram_filter_never_drops_a_match(pattern, ignore_case):
+    assert matching_files(pattern, ignore_case) <= candidate_files(pattern, ignore_case)
+
+
+@pytest.mark.parametrize("pattern, runs", [
+    (r"\x41bc", ["Abc"]),
+    (r"中文", ["中文"]),
+    (r"\N{LATIN SMALL LETTER E WITH ACUTE} accent", ["é accent"]),
+    (r"\101bc", ["Abc"]),
+    (r"\0nul", ["\0nul"]),
+    (r"(foo)\1", []),
+    (r"(x)abc\1def", ["abc", "def"]),
+    (r"tab\there", ["tab\there"]),
+    (r"abc\wdef", ["abc", "def"]),
+    (r"ab\x63?d", ["ab", "d"]),
+    (r"a|b", []),
+])
+def test_escapes_decode_to_literal_runs(pattern, runs):
+    re.compile(pattern)
+    assert _literal_runs(pattern) == runs
+
+
+@pytest.mark.parametrize("encoding", ["gb18030", "utf-16", "utf-8-sig"])
+def test_preview_replace_reads_detected_encoding(tmp_path, encoding):
+    (tmp_path / "a.txt").write_bytes("名称 = 旧值\r\n其它\r\n".encode(encoding))
+    results = preview_replace(str(tmp_path), ["a.txt"], "旧值", "新值")
+    assert [(path, count, samples) for path, _, count, samples in results] == [
+        ("a.txt", 1, [(0, "名称 = 旧值", "名称 = 新值")])]
+
+
+def test_project_relpath(tmp_path):
+    root = str(tmp_path / "project")
+    assert project_relpath(os.path.join(root, "pkg", "a.py"), root) == os.path.join("pkg", "a.py")
+    assert project_relpath(os.path.join(root, "..foo.py"), root) == "..foo.py"
+    assert project_relpath(str(tmp_path / "other.py"), root) is None
+    assert project_relpath(str(tmp_path), root) is None
+
+
+def test_project_relpath_on_another_drive(monkeypatch):
+    def relpath(path, start):
+        raise ValueError("path is on mount 'D:', start on mount 'C:'")
+    monkeypatch.setattr(os.path, "relpath", relpath)
+    assert project_relpath("D:\\code\\a.py", "C:\\project") is None
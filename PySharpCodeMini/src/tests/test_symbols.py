@@ -0,0 +1,52 @@
+"""符号索引的增删：定义查找、名字计数和文件序号回收"""
+from ide.symbols import SymbolIndex, CLASS, FUNCTION
+
+
+def make_index(tmp_path):
+    return SymbolIndex(str(tmp_path), str(tmp_path / "cache"))
+
+
+def test_definition_follows_file_changes(tmp_path):
+    index = make_index(tmp_path)
+    index.set_files([("a.py", 1, 10, [("Parser", CLASS, 3, ""), ("parse", FUNCTION, 9, "")]),
+                     ("b.py", 1, 10, [("parse", FUNCTION, 1, "")])])
+    assert index.definition("Parser") == ("Parser", CLASS, "a.py", 3, "")
+    assert index.names == {"Parser": 1, "parse": 2}
+    index.set_files([("a.py", 2, 12, [("parse", FUNCTION, 4, "")])])
+    assert index.definition("Parser") is None
+    assert index.names == {"parse": 2}
+    index.remove_file("b.py")
+    assert index.definition("parse") == ("parse", FUNCTION, "a.py", 4, "")
+
+
+def test_syntax_error_keeps_previous_symbols(tmp_path):
+    index = make_index(tmp_path)
+    index.set_files([("a.py", 1, 10, [("Parser", CLASS, 3, "")])])
+    index.set_files([("a.py", 2, 11, None)])
+    assert index.definition("Parser") == ("Parser", CLASS, "a.py", 3, "")
+
+
+def test_file_ids_are_reused_after_removal(tmp_path):
+    index = make_index(tmp_path)
+    for n in range(20):
+        # 新文件登记后，上一轮的文件在扫描中消失
+        relpath = f"module{n}.py"
+        index.set_files([(relpath, 1, 10, [(f"name{n}", FUNCTION, 0, "")])])
+        index.stale({relpath: (1, 10)})
+    assert len(index.paths) == 2
+    assert list(index.file_ids) == ["module19.py"]
+    assert index.definition("name19") == ("name19", FUNCTION, "module19.py", 0, "")
+    index.set_files([("empty.py", 1, 0, [])])
+    assert "empty.py" not in index.file_ids
+
+
+def test_snapshot_is_saved_as_taken(tmp_path):
+    index = make_index(tmp_path)
+    index.set_files([("a.py", 1, 10, [("Parser", CLASS, 3, "")])])
+    data = index.snapshot()
+    index.set_files([("b.py", 1, 10, [("other", FUNCTION, 1, "")])])  # 快照之后的改动不写进去
+    index.save(data)
+    loaded = make_index(tmp_path)
+    assert loaded.load()
+    assert list(loaded.files) == ["a.py"]
+    assert loaded.definition("Parser") == ("Parser", CLASS, "a.py", 3, "")
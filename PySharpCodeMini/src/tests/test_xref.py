@@ -0,0 +1,44 @@
+"""交叉引用：解析结果写入数据库，查找引用时读出所在行"""
+from ide.xref import XrefDatabase, analyze_file, content_hash, usage_lines
+
+GOOD = b"class Parser:\n    def parse(self):\n        return helper()\n"
+BROKEN = b"class Parser:\n    def parse(self):\n        return helper(\n\nhelper\n"
+
+
+def store(database, relpath, source, mtime=1):
+    database.store([(relpath, mtime, len(source), content_hash(source)) + analyze_file(relpath, source)])
+
+
+def test_syntax_error_keeps_previous_definitions(tmp_path):
+    database = XrefDatabase(str(tmp_path / "xref.sqlite3"))
+    store(database, "a.py", GOOD)
+    assert database.definitions("Parser") == [("a.py", 1, "class", "")]
+    assert analyze_file("a.py", BROKEN)[0] is None
+    store(database, "a.py", BROKEN, mtime=2)
+    assert database.definitions("Parser") == [("a.py", 1, "class", "")]
+    assert database.definitions("parse") == [("a.py", 2, "method", "Parser")]
+    # 引用按新内容更新
+    assert [line for _, line, _ in database.usages("helper")] == [3, 5]
+    database.close()
+
+
+def test_usage_lines_reads_each_file_once(tmp_path):
+    (tmp_path / "a.py").write_bytes(GOOD)
+    usages = [("a.py", 1, 6), ("a.py", 3, 15), ("missing.py", 2, 0)]
+    assert usage_lines(str(tmp_path), "Parser", usages) == [
+        ("a.py", 0, 6, 6, "class Parser:"),
+        ("a.py", 2, 15, 6, "        return helper()"),
+        ("missing.py", 1, 0, 6, ""),
+    ]
+
+
+def test_gbk_and_utf16_files_are_decoded(tmp_path):
+    source = "# 解析器\nclass 解析器:\n    pass\n"
+    (tmp_path / "gbk.py").write_bytes(source.encode('gbk'))
+    (tmp_path / "wide.cs").write_bytes("// 注释\nclass Parser { } // 解析器\n".encode('utf-16'))
+    references = analyze_file("gbk.py", source.encode('gbk'))[1]
+    assert set(references) == {"解析器"}
+    assert set(analyze_file("wide.cs", (tmp_path / "wide.cs").read_bytes())[1]) == {"Parser"}
+    assert usage_lines(str(tmp_path), "解析器", [("gbk.py", 2, 6)]) == [("gbk.py", 1, 6, 3, "class 解析器:")]
+    assert usage_lines(str(tmp_path), "Parser", [("wide.cs", 2, 6)]) == [
+        ("wide.cs", 1, 6, 6, "class Parser { } // 解析器")]